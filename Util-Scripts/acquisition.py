@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from serial_protocol import SAMPLE_DTYPE, make_decoder
+
+DEFAULT_CAPACITY = 1 << 20
+READ_SIZE = 4096
+MAX_SPREAD = 0.5  # s; a chunk arriving after a longer gap is not spread back over it
+
+
+class SampleRing:
+    """
+    Fixed-size ring buffer of decoded samples.
+
+    Storage is preallocated once; writes copy whole chunks in at most two
+    slices and overwrite the oldest samples when full. Positions are absolute
+    sample counts, so readers keep their own cursor and can tell how much
+    they missed after falling behind.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, dtype=SAMPLE_DTYPE):
+        self.capacity = int(capacity)
+        self.data = np.zeros(self.capacity, dtype=dtype)
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    @property
+    def oldest(self):
+        """Absolute position of the oldest sample still held."""
+        return max(0, self.total - self.capacity)
+
+    def write(self, samples):
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+        with self._lock:
+            start = (self.total + n - len(samples)) % self.capacity
+            first = min(len(samples), self.capacity - start)
+            self.data[start:start + first] = samples[:first]
+            self.data[:len(samples) - first] = samples[first:]
+            self.total += n
+
+    def _copy(self, start, stop):
+        first, last = start % self.capacity, stop % self.capacity
+        if stop - start == 0:
+            return self.data[:0].copy()
+        if first < last:
+            return self.data[first:last].copy()
+        return np.concatenate([self.data[first:], self.data[:last]])
+
+    def read_since(self, position):
+        """
+        Samples written since absolute position, as (samples, new_position,
+        missed) where missed counts samples overwritten before they were read.
+        """
+        with self._lock:
+            start = max(position, self.oldest)
+            return self._copy(start, self.total), self.total, start - position
+
+    def latest(self, n):
+        """Copy of the newest n samples (fewer if the buffer holds less)."""
+        with self._lock:
+            return self._copy(max(self.oldest, self.total - n), self.total)
+
+    def latest_from(self, field, value):
+        """
+        Copy of the samples from the first one whose field is >= value on, for
+        a field that never decreases (timestamps). Found with a binary search
+        of the two stored slices, so only the samples returned are copied.
+        """
+        with self._lock:
+            start = self.oldest
+            first = start % self.capacity
+            head = self.data[field][first:first + len(self)]
+            position = int(np.searchsorted(head, value))
+            if position == len(head):
+                position += int(np.searchsorted(self.data[field][:len(self) - len(head)], value))
+            return self._copy(start + position, self.total)
+
+
+class AcquisitionEngine:
+    """
+    Reads a serial port on a background thread in bulk chunks, decodes them
+    and writes the samples into a SampleRing. Decoded text goes to a queue
+    that the UI drains on its own schedule, and sinks (exporters, capture
+    files) get every chunk on the acquisition thread as it arrives.
+
+    The port can be any object with pyserial's read()/in_waiting interface.
+    """
+
+    def __init__(self, port, protocol='text', capacity=DEFAULT_CAPACITY, read_size=READ_SIZE,
+                 max_spread=MAX_SPREAD):
+        self.port = port
+        self.decoder = make_decoder(protocol)
+        self.ring = SampleRing(capacity)
+        self.read_size = read_size
+        self.max_spread = max_spread
+        self.sinks = []
+        self.bytes_read = 0
+        self.error = None
+        self._text = deque()
+        self._cursor = 0
+        self._last_timestamp = None
+        self._running = False
+        self._thread = None
+
+    def add_sink(self, sink):
+        """sink.write(samples, text) is called for every decoded chunk."""
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def process(self, data, timestamp=None):
+        """Decode one chunk of bytes and hand it to the ring, the text queue and the sinks."""
+        self.bytes_read += len(data)
+        timestamp = time.time() if timestamp is None else timestamp
+        samples, text = self.decoder.feed(data, timestamp)
+        self._spread_timestamps(samples, timestamp)
+        self.ring.write(samples)
+        if text:
+            self._text.append(text)
+        for sink in list(self.sinks):
+            sink.write(samples, text)
+        return samples
+
+    def _spread_timestamps(self, samples, timestamp):
+        """
+        Every sample of a chunk shares its receive time; space them evenly back
+        to the previous chunk instead, so plots and rate estimates get a
+        usable time axis.
+        """
+        n = len(samples)
+        if n == 0:
+            return
+        start = self._last_timestamp
+        if start is None or not 0 <= timestamp - start < self.max_spread:
+            start = timestamp
+        samples['timestamp'] = start + (timestamp - start) * np.arange(1, n + 1) / n
+        self._last_timestamp = timestamp
+
+    def _run(self):
+        while self._running:
+            try:
+                data = self.port.read(min(max(self.port.in_waiting, 1), self.read_size))
+            except Exception as e:
+                if self._running:
+                    self.error = e
+                break
+            if data:
+                self.process(data)
+        self._running = False
+
+    def drain(self, max_text=None):
+        """
+        Everything acquired since the last drain, as (samples, text, missed).
+        Meant to be called from the UI thread at a fixed cadence.
+        """
+        samples, self._cursor, missed = self.ring.read_since(self._cursor)
+        chunks = []
+        while self._text:
+            chunks.append(self._text.popleft())
+        text = ''.join(chunks)
+        if max_text is not None and len(text) > max_text:
+            text = text[text.find('\n', len(text) - max_text) + 1:]
+        return samples, text, missed
@@ -0,0 +1,302 @@
+"""
+NumPy reference model of the firmware's current ranging.
+
+Mirrors the autoSetRange() / predictiveSetRange() /
+calculateCurrentSensitivity() / calculateCurrent() chain of
+arduino_as_an_oscilloscope.ino for arrays of true shunt currents: which channel loop() ends up on, the A4 code it reads,
+the current it reports, the quantization error of that reading and how many
+channel probes (setInputChannel + analogRead in autoSetRange) each sample
+cost. Runs in chunks, so millions of samples can be modelled offline.
+Raw burst captures decode back to amps in bulk the same way, through
+unpack_burst_words() and scale_current() in serial_protocol.py.
+
+    python autorange_model.py [n_samples]
+
+compares the cost and accuracy of the scanning and predictive strategies
+on simulated waveforms.
+"""
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from serial_protocol import (CHANNEL_GAINS, HYSTERESIS_MAX_VOLTAGE, HYSTERESIS_MIN_VOLTAGE, MAX_MAPPING_VALUE,
+                             MAX_VOLTAGE, RANGE_MAX_VOLTAGE, RANGE_MIN_VOLTAGE, RSHUNT, scale_current)
+
+START_CHANNEL = 0
+CHUNK_SIZE = 1 << 20  # samples modelled at once
+
+
+def adc_codes(volts, noise=0.0, rng=None):
+    """10-bit analogRead() codes for input voltages, with Gaussian noise in LSB."""
+    codes = np.asarray(volts, dtype=float) * MAX_MAPPING_VALUE / MAX_VOLTAGE
+    if noise:
+        codes = codes + rng.normal(0.0, noise, codes.shape)
+    return np.clip(np.floor(codes), 0, MAX_MAPPING_VALUE - 1).astype(np.int32)
+
+
+def current_sensitivity(gains=CHANNEL_GAINS):
+    """Amps per ADC code of each channel, like calculateCurrentSensitivity()."""
+    return (MAX_VOLTAGE / MAX_MAPPING_VALUE) / (np.asarray(gains, dtype=float) * RSHUNT)
+
+
+def channel_codes(current, noise=0.0, rng=None, gains=CHANNEL_GAINS):
+    """The A4 code every channel would read for each current, shape (channels, n)."""
+    shunt = np.asarray(current, dtype=float) * RSHUNT
+    return adc_codes(np.outer(gains, shunt), noise, rng)
+
+
+def in_band(codes, low, high):
+    volts = codes * MAX_VOLTAGE / MAX_MAPPING_VALUE
+    return (volts >= low) & (volts <= high)
+
+
+def next_outside(inside):
+    """next_outside(inside)[c, i]: first sample at or after i with inside[c] False (n if none)."""
+    n = inside.shape[1]
+    positions = np.where(inside, n, np.arange(n))
+    return np.minimum.accumulate(positions[:, ::-1], axis=1)[:, ::-1]
+
+
+def range_scan(codes):
+    """
+    What autoSetRange() does for every sample, given the A4 code each channel
+    would read (shape (channels, n)): the first channel in range (-1 if
+    none), the channel the multiplexer is left on, and the per-channel
+    in-range mask. The scan probes channels up to and including the one it
+    is left on.
+    """
+    volts = codes * MAX_VOLTAGE / MAX_MAPPING_VALUE
+    in_range = in_band(codes, RANGE_MIN_VOLTAGE, RANGE_MAX_VOLTAGE)
+    n_channels, n = codes.shape
+    result = np.full(n, -1, dtype=np.int8)
+    last = np.full(n, n_channels - 1, dtype=np.int8)
+    scanning = np.ones(n, dtype=bool)
+    for channel in range(n_channels):
+        found = scanning & in_range[channel]
+        too_low = scanning & ~in_range[channel] & (volts[channel] < RANGE_MAX_VOLTAGE)  # the scan breaks
+        result[found] = channel
+        last[found | too_low] = channel
+        scanning &= ~(found | too_low)
+    return result, last, in_range
+
+
+class ScanRanging:
+    """
+    loop() with autoSetRange(), its state carried across chunks: the channel
+    the multiplexer is on (selectedChannel) and the channel whose gain is in
+    currentGain. They differ after a scan that found no channel, which
+    leaves the multiplexer on the last channel probed but keeps the old gain.
+    """
+    name = 'scan'
+
+    def __init__(self, channel=START_CHANNEL):
+        self.mux = channel
+        self.gain_channel = channel
+        self.channel_changes = 0
+
+    def step(self, codes):
+        """
+        Ranging for consecutive samples given their per-channel codes.
+        Returns (mux, gain_channel, in_range, probes) arrays. The state only
+        changes when a reading leaves the range of the current channel, so
+        in-range runs are filled in bulk and the Python loop only visits
+        the samples that trigger a scan.
+        """
+        n = codes.shape[1]
+        result, last, in_range = range_scan(codes)
+        next_bad = next_outside(in_range)
+
+        mux = np.empty(n, dtype=np.int8)
+        gain_channel = np.empty(n, dtype=np.int8)
+        ok = np.ones(n, dtype=bool)
+        probes = np.zeros(n, dtype=np.int8)
+        position = 0
+        while position < n:
+            end = int(next_bad[self.mux, position])
+            mux[position:end] = self.mux
+            gain_channel[position:end] = self.gain_channel
+            if end == n:
+                break
+            found = int(result[end])
+            if found >= 0:
+                self.channel_changes += found != self.mux
+                self.mux = self.gain_channel = found
+            else:
+                self.mux = int(last[end])
+                ok[end] = False
+            mux[end] = self.mux
+            gain_channel[end] = self.gain_channel
+            probes[end] = last[end] + 1
+            position = end + 1
+        return mux, gain_channel, ok, probes
+
+
+def predict_channel(channel, code, gains=CHANNEL_GAINS):
+    """
+    predictChannel() in the firmware: the highest-gain channel that keeps a
+    reading of code on channel below RANGE_MAX_VOLTAGE.
+    """
+    shunt_voltage = max(int(code), 1) * MAX_VOLTAGE / MAX_MAPPING_VALUE / gains[channel]
+    for candidate, gain in enumerate(gains):
+        if shunt_voltage * gain <= RANGE_MAX_VOLTAGE:
+            return candidate
+    return len(gains) - 1
+
+
+class PredictiveRanging:
+    """
+    loop() with PREDICTIVE_RANGING: the channel is kept while readings stay
+    inside the hysteresis band, and on leaving it predictiveSetRange() jumps
+    to the channel predicted from the reading, probing again only if that
+    lands outside the band. Same interface and state as ScanRanging.
+
+    A range change costs one probe unless the reading that triggered it was
+    saturated or zero, which only bounds the current; each further probe
+    moves at least one channel on, so the worst case is len(CHANNEL_GAINS) - 1
+    probes against the scan's len(CHANNEL_GAINS).
+    """
+    name = 'predictive'
+
+    def __init__(self, channel=START_CHANNEL):
+        self.mux = channel
+        self.gain_channel = channel
+        self.channel_changes = 0
+
+    def _set_range(self, column):
+        """predictiveSetRange() for one sample's per-channel codes: (channel or -1, probes)."""
+        channel = self.mux
+        code = column[channel]
+        for probe in range(len(column)):
+            next_channel = predict_channel(channel, code)
+            if next_channel == channel:
+                return -1, probe
+            channel = next_channel
+            self.mux = channel
+            code = column[channel]
+            volts = code * MAX_VOLTAGE / MAX_MAPPING_VALUE
+            if HYSTERESIS_MIN_VOLTAGE <= volts <= HYSTERESIS_MAX_VOLTAGE:
+                return channel, probe + 1
+        return -1, len(column)
+
+    def step(self, codes):
+        n = codes.shape[1]
+        next_bad = next_outside(in_band(codes, HYSTERESIS_MIN_VOLTAGE, HYSTERESIS_MAX_VOLTAGE))
+
+        mux = np.empty(n, dtype=np.int8)
+        gain_channel = np.empty(n, dtype=np.int8)
+        ok = np.ones(n, dtype=bool)
+        probes = np.zeros(n, dtype=np.int8)
+        position = 0
+        while position < n:
+            end = int(next_bad[self.mux, position])
+            mux[position:end] = self.mux
+            gain_channel[position:end] = self.gain_channel
+            if end == n:
+                break
+            previous = self.mux
+            found, probes[end] = self._set_range(codes[:, end])
+            if found >= 0:
+                self.channel_changes += found != previous
+                self.gain_channel = found
+            else:
+                ok[end] = False
+            mux[end] = self.mux
+            gain_channel[end] = self.gain_channel
+            position = end + 1
+        return mux, gain_channel, ok, probes
+
+
+RANGINGS = {
+    ScanRanging.name: ScanRanging,
+    PredictiveRanging.name: PredictiveRanging,
+}
+
+
+@dataclass
+class AutorangeResult:
+    true_current: np.ndarray   # A
+    channel: np.ndarray        # channel the multiplexer was on for the reading
+    gain_channel: np.ndarray   # channel whose gain scaled it (currentGain)
+    codes: np.ndarray          # A4 code read
+    current: np.ndarray        # A, as calculateCurrent() reports it
+    in_range: np.ndarray       # False where autoSetRange() found no channel
+    probes: np.ndarray         # autoSetRange() probes spent on the sample
+
+    @property
+    def error(self):
+        """Quantization error of the reported current (A)."""
+        return self.current - self.true_current
+
+    def summary(self):
+        ok = self.in_range
+        relative = np.abs(self.error[ok]) / np.maximum(np.abs(self.true_current[ok]), 1e-12)
+        return {
+            'samples': len(self.current),
+            'probes_per_sample': float(self.probes.mean()) if len(self.probes) else 0.0,
+            'max_probes': int(self.probes.max()) if len(self.probes) else 0,
+            'scans': int((self.probes > 0).sum()),
+            'channel_changes': int((np.diff(self.channel) != 0).sum()),
+            'out_of_range': float(1 - ok.mean()) if len(ok) else 0.0,
+            'rms_error': float(np.sqrt(np.mean(self.error[ok] ** 2))) if ok.any() else 0.0,
+            'median_relative_error': float(np.median(relative)) if ok.any() else 0.0,
+        }
+
+
+def model_autorange(current, noise=0.0, seed=None, ranging=None, chunk_size=CHUNK_SIZE) -> AutorangeResult:
+    """
+    Run the firmware's ranging over an array of true currents (A).
+    ranging is 'scan' (autoSetRange(), the default), 'predictive', or a
+    ranging object carrying its state between calls; noise is ADC noise in
+    LSB rms.
+    """
+    current = np.asarray(current, dtype=float)
+    ranging = RANGINGS[ranging or 'scan']() if ranging is None or isinstance(ranging, str) else ranging
+    rng = np.random.default_rng(seed)
+    n = len(current)
+    channel = np.empty(n, dtype=np.int8)
+    gain_channel = np.empty(n, dtype=np.int8)
+    codes = np.empty(n, dtype=np.int32)
+    in_range = np.empty(n, dtype=bool)
+    probes = np.empty(n, dtype=np.int8)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        per_channel = channel_codes(current[start:stop], noise, rng)
+        mux, gains, ok, cost = ranging.step(per_channel)
+        channel[start:stop], gain_channel[start:stop] = mux, gains
+        in_range[start:stop], probes[start:stop] = ok, cost
+        codes[start:stop] = per_channel[mux, np.arange(stop - start)]
+    return AutorangeResult(current, channel, gain_channel, codes, scale_current(codes, gain_channel),
+                           in_range, probes)
+
+
+def comparison_signals(n, rate=10000.0, seed=0):
+    """Test currents (A) at rate samples/s for comparing ranging strategies."""
+    from serial_simulator import FirmwareSimulator
+
+    t = np.arange(n) / rate
+    signals = {waveform: FirmwareSimulator(waveform=waveform, frequency=5.0).signal(t)[1]
+               for waveform in ('dc', 'sine', 'steps')}
+    # Sits on channel 0's upper limit: noise sends the scan to coarser channel 1, the hysteresis band stays.
+    signals['boundary'] = np.full(n, RANGE_MAX_VOLTAGE / (CHANNEL_GAINS[0] * RSHUNT))
+    # Sweeps 1 mA to 1 A and back 20 times a second, crossing every range.
+    signals['sweep'] = 10 ** (-1.5 + 1.5 * np.sin(2 * np.pi * 20 * t))
+    # Random walk over three decades.
+    walk = np.cumsum(np.random.default_rng(seed).normal(0, 0.002, n))
+    signals['walk'] = 10 ** (-1.5 + 1.5 * np.sin(walk))
+    return signals
+
+
+if __name__ == "__main__":
+    n = int(float(sys.argv[1])) if len(sys.argv) > 1 else 2_000_000
+    print(f"{'signal':<10}{'ranging':<12}{'probes/sample':>14}{'max':>5}{'scans':>9}{'changes':>9}"
+          f"{'out of range':>14}{'median rel err':>16}{'Msamples/s':>12}")
+    for name, current in comparison_signals(n).items():
+        for ranging in RANGINGS:
+            start = time.perf_counter()
+            summary = model_autorange(current, noise=0.5, seed=0, ranging=ranging).summary()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<10}{ranging:<12}{summary['probes_per_sample']:>14.4f}{summary['max_probes']:>5}"
+                  f"{summary['scans']:>9}{summary['channel_changes']:>9}{summary['out_of_range']:>14.2%}"
+                  f"{summary['median_relative_error']:>16.2%}{n / elapsed / 1e6:>12.2f}")
@@ -0,0 +1,207 @@
+"""
+Headless benchmark suite for the design engine and sweeps.
+
+Times CurrentMeasurementDesign.design(), every DesignSweep.sweep_* method,
+the to_dict/from_json round trip and SweepPlotter rendering on the Agg
+backend. Each case records the best wall time over a few repeats, the
+throughput and the peak traced memory, and can be compared with a stored
+baseline JSON to catch regressions.
+
+    python benchmark_design.py                       # run and print
+    python benchmark_design.py --save-baseline       # store the results as the baseline
+    python benchmark_design.py --check               # fail on regressions against it
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from parameters_optimizer_v2 import CurrentMeasurementDesign, DesignSweep
+from ui_utils import (SweepPlotter, get_n_channels_spec, get_overlap_spec, get_pin1_spec,
+                      get_r_spec, get_rmes_spec, get_vos_spec)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+NOISE_FLOOR = 1e-3  # slowdowns smaller than this many seconds are timer noise
+
+BASE_PARAMS = {
+    'vos': 50e-6,
+    'pin1': 0.2,
+    'rmes': 0.1,
+    'delta_ic1': 2.5e-3,
+    'kp': 0.0048828,
+    'von_min': 0.024414,
+    'k': 0.8,
+    'r': 10.0,
+    'n_channels': 4
+}
+
+SWEEP_VALUES = {
+    'rmes': lambda n: np.linspace(0.01, 1.0, n),
+    'k': lambda n: np.logspace(np.log10(0.5), np.log10(0.95), n),
+    'r': lambda n: np.logspace(np.log10(2.0), np.log10(20.0), n),
+    'pin1': lambda n: np.logspace(-2, 0, n),
+    'vos': lambda n: np.linspace(1.0, 100.0, n),
+    'n_channels': lambda n: np.arange(n) % 12 + 1,
+}
+
+PLOT_SPECS = {
+    'rmes': get_rmes_spec,
+    'k': get_overlap_spec,
+    'r': get_r_spec,
+    'pin1': get_pin1_spec,
+    'vos': get_vos_spec,
+    'n_channels': get_n_channels_spec,
+}
+
+
+def measure(func, points, repeats):
+    """Best wall time of func() over repeats, plus one traced run for peak memory."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds': best,
+        'points': points,
+        'throughput': points / best if best > 0 else float('inf'),
+        'peak_bytes': peak,
+    }
+
+
+def design_cases(repeats):
+    def run():
+        for _ in range(1000):
+            design = CurrentMeasurementDesign(**BASE_PARAMS)
+            design.design()
+    yield 'design/x1000', measure(run, 1000, repeats)
+
+
+def sweep_cases(sizes, repeats):
+    sweep = DesignSweep()
+    for name, values in SWEEP_VALUES.items():
+        method = getattr(sweep, f'sweep_{name}')
+        for size in sizes:
+            swept = values(size)
+            yield f'sweep_{name}/{size}', measure(lambda: method(BASE_PARAMS, swept), size, repeats)
+
+
+def serialization_cases(repeats):
+    design = CurrentMeasurementDesign(**{**BASE_PARAMS, 'n_channels': 8})
+    design.design()
+
+    def run():
+        for _ in range(1000):
+            CurrentMeasurementDesign.from_json(json.dumps(design.to_dict()))
+    yield 'to_dict_from_json/x1000', measure(run, 1000, repeats)
+
+
+def plot_cases(size, repeats):
+    sweep = DesignSweep()
+    plotter = SweepPlotter()
+    fig = plt.figure(figsize=(6, 4))
+    try:
+        for name, values in SWEEP_VALUES.items():
+            results = getattr(sweep, f'sweep_{name}')(BASE_PARAMS, values(size))
+            spec = PLOT_SPECS[name]()
+
+            def run():
+                fig.clear()
+                plotter.plot(fig.add_subplot(1, 1, 1), results, spec)
+                fig.canvas.draw()
+            yield f'plot_{name}/{size}', measure(run, size, repeats)
+    finally:
+        plt.close(fig)
+
+
+def run_benchmarks(max_points=10 ** 6, repeats=3, plot_points=1000, only=None):
+    sizes = [10 ** e for e in range(2, 7) if 10 ** e <= max_points]
+    groups = [
+        ('design', lambda: design_cases(repeats)),
+        ('sweep', lambda: sweep_cases(sizes, repeats)),
+        ('serialization', lambda: serialization_cases(repeats)),
+        ('plot', lambda: plot_cases(plot_points, repeats)),
+    ]
+    results = {}
+    for group, cases in groups:
+        if only and group not in only:
+            continue
+        for name, result in cases():
+            results[name] = result
+            print(f"{name:<28} {result['seconds'] * 1e3:>10.3f} ms  "
+                  f"{result['throughput']:>14,.0f} pts/s  {result['peak_bytes'] / 1e6:>9.2f} MB")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Cases slower than the baseline by more than tolerance, as (name, ratio) pairs."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        ratio = result['seconds'] / previous['seconds']
+        if ratio > 1 + tolerance and result['seconds'] - previous['seconds'] > NOISE_FLOOR:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the current measurement design engine.")
+    parser.add_argument('--max-points', type=int, default=10 ** 6, help="largest sweep size (powers of ten from 100)")
+    parser.add_argument('--repeats', type=int, default=3, help="timed repeats per case, the best one is kept")
+    parser.add_argument('--plot-points', type=int, default=1000, help="points per rendered sweep plot")
+    parser.add_argument('--only', nargs='+', choices=['design', 'sweep', 'serialization', 'plot'])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--check', action='store_true', help="exit with an error on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before a case regresses")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.max_points, args.repeats, args.plot_points, args.only)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(),
+                'python': sys.version.split()[0],
+                'numpy': np.__version__,
+                'machine': platform.platform(),
+                'results': results
+            }, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for name, ratio in regressions:
+        print(f"REGRESSION {name}: {ratio:.2f}x slower than baseline")
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 1 if regressions and args.check else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Headless benchmarks for the serial decoding pipeline.
+
+Compares the block text parser with the per-line regex parsing it replaced
+and times the binary frame and raw-ADC burst decoders, feeding both in serial-sized chunks so
+partial lines and frames are carried across every chunk boundary.
+
+    python benchmark_serial.py                       # run and print
+    python benchmark_serial.py --save-baseline       # store the results as the baseline
+    python benchmark_serial.py --check               # fail on regressions against it
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from benchmark_design import compare, measure
+from serial_protocol import (TEXT_LINE, BinaryFrameDecoder, BurstDecoder, TextLineDecoder, encode_bursts,
+                             encode_frames, format_samples, pack_burst_words)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_serial_baseline.json")
+CHUNK_SIZE = 4096
+
+
+def text_stream(n):
+    """n lines in the firmware's text format."""
+    rng = np.random.default_rng(0)
+    samples = np.zeros(n, dtype=[('voltage', 'f8'), ('current', 'f8')])
+    samples['voltage'] = rng.uniform(-5, 5, n)
+    samples['current'] = rng.uniform(0, 0.2, n)
+    return format_samples(samples).replace('\n', '\r\n').encode()
+
+
+def binary_stream(n):
+    rng = np.random.default_rng(0)
+    return encode_frames(np.arange(n), rng.integers(0, 4, n), rng.integers(0, 1024, n),
+                         rng.integers(0, 1024, n), rng.integers(0, 1024, n))
+
+
+def burst_stream(n):
+    """The readings of binary_stream(n) in burst mode."""
+    rng = np.random.default_rng(0)
+    channel, v_plus, v_minus, current = (rng.integers(0, 4, n), rng.integers(0, 1024, n),
+                                         rng.integers(0, 1024, n), rng.integers(0, 1024, n))
+    return encode_bursts(pack_burst_words(channel, v_plus, v_minus, current), period_us=350)
+
+
+def chunks(data, size=CHUNK_SIZE):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def parse_per_line(stream):
+    """The previous approach: split into lines and regex each one."""
+    voltage, current = [], []
+    pending = b''
+    for chunk in stream:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            match = TEXT_LINE.search(line)
+            if match:
+                try:
+                    v, i = float(match.group(1)), float(match.group(2))
+                except ValueError:
+                    continue
+                voltage.append(v)
+                current.append(i)
+    return np.array(voltage), np.array(current)
+
+
+def decode_all(decoder_class, stream):
+    decoder = decoder_class()
+    return np.concatenate([decoder.feed(chunk, 0.0)[0] for chunk in stream])
+
+
+def run_benchmarks(sizes, repeats):
+    results = {}
+    for n in sizes:
+        text = chunks(text_stream(n))
+        binary = chunks(binary_stream(n))
+        bursts = chunks(burst_stream(n))
+        cases = {
+            f'text_per_line/{n}': lambda: parse_per_line(text),
+            f'text_block/{n}': lambda: decode_all(TextLineDecoder, text),
+            f'binary/{n}': lambda: decode_all(BinaryFrameDecoder, binary),
+            f'burst/{n}': lambda: decode_all(BurstDecoder, bursts),
+        }
+        for name, func in cases.items():
+            result = measure(func, n, repeats)
+            results[name] = result
+            print(f"{name:<24} {result['seconds'] * 1e3:>10.3f} ms  {result['throughput']:>14,.0f} lines/s  "
+                  f"{result['peak_bytes'] / 1e6:>9.2f} MB")
+        speedup = results[f'text_per_line/{n}']['seconds'] / results[f'text_block/{n}']['seconds']
+        print(f"{'':<24} block parser {speedup:.1f}x faster than per-line")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark serial decoding.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10 ** 4, 10 ** 5, 10 ** 6], help="lines per case")
+    parser.add_argument('--repeats', type=int, default=3, help="timed repeats per case, the best one is kept")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--check', action='store_true', help="exit with an error on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before a case regresses")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeats)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for name, ratio in regressions:
+        print(f"REGRESSION {name}: {ratio:.2f}x slower than baseline")
+    return 1 if regressions and args.check else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Capture files for serial sessions.
+
+A capture is a 64 byte header followed by fixed-size little-endian records
+of CAPTURE_DTYPE, so it can be opened with numpy.memmap and sliced without
+reading it. A sidecar "<path>.idx" holds the timestamp of every
+index_stride-th record; a time window is located with a binary search over
+that sparse index plus one over a single stride of records.
+"""
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from serial_protocol import SAMPLE_DTYPE
+
+MAGIC = b'ARDCAP01'
+HEADER = struct.Struct('<8sIIId')  # magic, header size, record size, index stride, created
+HEADER_SIZE = 64
+INDEX_STRIDE = 4096
+FLUSH_INTERVAL = 1.0
+
+CAPTURE_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('channel', 'i1'),
+    ('voltage', '<f8'),
+    ('current', '<f8'),
+])
+
+
+def _index_path(path):
+    return path + '.idx'
+
+
+def as_samples(records):
+    """Capture records as SAMPLE_DTYPE samples, the layout the live pipeline uses."""
+    samples = np.zeros(len(records), dtype=SAMPLE_DTYPE)
+    samples['sequence'] = -1
+    for name in CAPTURE_DTYPE.names:
+        samples[name] = records[name]
+    return samples
+
+
+class CaptureWriter:
+    """Records decoded samples into a capture file; usable as an AcquisitionEngine sink."""
+
+    def __init__(self, path, index_stride=INDEX_STRIDE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.index_stride = index_stride
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'wb')
+        self._index = open(_index_path(path), 'wb')
+        header = HEADER.pack(MAGIC, HEADER_SIZE, CAPTURE_DTYPE.itemsize, index_stride, time.time())
+        self._file.write(header.ljust(HEADER_SIZE, b'\0'))
+        self._last_flush = time.monotonic()
+
+    def write(self, samples, text=''):
+        n = len(samples)
+        if n == 0:
+            return
+        records = np.empty(n, dtype=CAPTURE_DTYPE)
+        for name in CAPTURE_DTYPE.names:
+            records[name] = samples[name]
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(records.tobytes())
+            # Index entries for every multiple of the stride inside this chunk.
+            first = -(-self.count // self.index_stride) * self.index_stride
+            indexed = np.arange(first, self.count + n, self.index_stride) - self.count
+            self._index.write(records['timestamp'][indexed].astype('<f8').tobytes())
+            self.count += n
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._index.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._index.close()
+                self._file = None
+
+
+class Capture:
+    """
+    Read-only, zero-copy view of a capture file. records is a numpy.memmap,
+    and window() and the column accessors return views into it, so plotting
+    or reducing a slice only touches the pages it covers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, header_size, record_size, stride, created = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or record_size != CAPTURE_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a capture file")
+        self.index_stride = stride
+        self.created = created
+        count = (os.path.getsize(path) - header_size) // record_size
+        if count:
+            self.records = np.memmap(path, dtype=CAPTURE_DTYPE, mode='r', offset=header_size, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=CAPTURE_DTYPE)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        expected = -(-len(self.records) // self.index_stride)
+        index_path = _index_path(self.path)
+        if os.path.exists(index_path):
+            index = np.fromfile(index_path, dtype='<f8')
+            if len(index) >= expected:
+                return index[:expected]
+        # Missing or truncated index (e.g. after a crash): rebuild it with a strided read.
+        return np.array(self.records['timestamp'][::self.index_stride])
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def timestamps(self):
+        return self.records['timestamp']
+
+    @property
+    def voltage(self):
+        return self.records['voltage']
+
+    @property
+    def current(self):
+        return self.records['current']
+
+    @property
+    def start_time(self):
+        return float(self.records['timestamp'][0]) if len(self) else float('nan')
+
+    @property
+    def end_time(self):
+        return float(self.records['timestamp'][-1]) if len(self) else float('nan')
+
+    def locate(self, t):
+        """Position of the first record with a timestamp >= t."""
+        block = max(0, int(np.searchsorted(self.index, t, side='left')) - 1)
+        lo = block * self.index_stride
+        hi = min(len(self), lo + 2 * self.index_stride)
+        return lo + int(np.searchsorted(self.records['timestamp'][lo:hi], t, side='left'))
+
+    def window(self, start=None, stop=None):
+        """Records with start <= timestamp < stop, as a view into the file."""
+        i = 0 if start is None else self.locate(start)
+        j = len(self) if stop is None else self.locate(stop)
+        return self.records[i:max(i, j)]
+
+    def chunks(self, size=1 << 16, start=None, stop=None):
+        """Successive views of at most size records, for streaming analysis."""
+        records = self.window(start, stop)
+        for offset in range(0, len(records), size):
+            yield records[offset:offset + size]
+
+    def replay(self, sink, size=4096, start=None, stop=None, speed=None):
+        """
+        Feed the capture into a sink (an exporter, a trigger, a plot) chunk by
+        chunk, as live samples would arrive. speed=None replays as fast as
+        possible, 1.0 in real time.
+        """
+        t0 = wall0 = None
+        for chunk in self.chunks(size, start, stop):
+            if speed:
+                if t0 is None:
+                    t0, wall0 = float(chunk['timestamp'][0]), time.monotonic()
+                delay = (float(chunk['timestamp'][-1]) - t0) / speed - (time.monotonic() - wall0)
+                if delay > 0:
+                    time.sleep(delay)
+            sink.write(as_samples(chunk), '')
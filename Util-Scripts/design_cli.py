@@ -0,0 +1,173 @@
+"""
+Headless batch runner for designs and sweeps.
+
+    python -m design_cli run config.json [--output DIR] [--plot]
+
+The config file (JSON, or TOML on Python 3.11+) holds a "parameters" table
+with the base design in SI units (a file saved by the designer UI works too)
+and any of these optional sections:
+
+    "sweeps":  {"rmes": {"min": 0.01, "max": 1, "steps": 50, "spacing": "log"},
+                "n_channels": [2, 3, 4, 5]}
+    "grid":    {"rmes": {...}, "k": [...], "r": {...}}
+    "options": {"chunk_size": 16384, "executor": "process", "max_workers": 8,
+                "pareto": true}
+
+1-D sweeps use the designer's units (vos in uV), grid sweeps use SI units.
+tkinter is never imported and matplotlib only with --plot.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from parameters_optimizer_v2 import CurrentMeasurementDesign, DesignSweep, PARAM_NAMES
+
+SWEEPS = ('rmes', 'k', 'r', 'pin1', 'vos', 'n_channels')
+
+
+def load_config(path):
+    if path.endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:
+            raise SystemExit("TOML configs need Python 3.11 or newer; use JSON instead")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    with open(path) as f:
+        return json.load(f)
+
+
+def sweep_values(name, spec):
+    """Values from an explicit list or a {min, max, steps, spacing} table."""
+    if isinstance(spec, dict):
+        if spec.get('spacing', 'linear') == 'log':
+            values = np.logspace(np.log10(spec['min']), np.log10(spec['max']), int(spec['steps']))
+        else:
+            values = np.linspace(spec['min'], spec['max'], int(spec['steps']))
+    else:
+        values = np.asarray(spec, dtype=float)
+    if name == 'n_channels':
+        values = values.astype(int)
+    return values
+
+
+def base_parameters(config):
+    params = config.get('parameters', config)
+    missing = [name for name in PARAM_NAMES if name not in params]
+    if missing:
+        raise SystemExit(f"Missing design parameters: {', '.join(missing)}")
+    return {name: params[name] for name in PARAM_NAMES}
+
+
+def run_design(base_params, output):
+    design = CurrentMeasurementDesign(**base_params)
+    design.design()
+    with open(os.path.join(output, 'design.json'), 'w') as f:
+        f.write(design.default())
+    design.print_summary()
+    return design
+
+
+def run_sweeps(sweep, base_params, sweeps, output, plot):
+    results = {}
+    for name, spec in sweeps.items():
+        if name not in SWEEPS:
+            raise SystemExit(f"Unknown sweep parameter: {name}")
+        start = time.perf_counter()
+        result = getattr(sweep, f'sweep_{name}')(base_params, sweep_values(name, spec))
+        result.to_csv(os.path.join(output, f'sweep_{name}.csv'))
+        with open(os.path.join(output, f'sweep_{name}.json'), 'w') as f:
+            json.dump(result.to_dict(), f)
+        print(f"sweep {name}: {len(result)} points in {time.perf_counter() - start:.3f} s")
+        results[name] = result
+
+    if plot and results:
+        plot_sweeps(results, output)
+    return results
+
+
+def run_grid(sweep, base_params, grid, options, output):
+    """Stream the grid sweep to CSV chunk by chunk, optionally keeping the Pareto front."""
+    grid = {name: sweep_values(name, spec) for name, spec in grid.items()}
+    front = None
+    if options.get('pareto'):
+        from pareto import ParetoFront
+        front = ParetoFront()
+
+    start = time.perf_counter()
+    total = 0
+    header = list(PARAM_NAMES) + ['ic_min1', 'dynamic_range', 'max_voltage', 'gain_range']
+    with open(os.path.join(output, 'grid.csv'), 'w') as f:
+        f.write(','.join(header) + '\n')
+        for batch in sweep.sweep_grid(base_params, grid, options.get('chunk_size', DesignSweep.DEFAULT_CHUNK_SIZE)):
+            columns = [batch.params[name] for name in PARAM_NAMES]
+            columns += [batch.ic_min1, batch.dynamic_range(), batch.max_voltage(), batch.gain_range()]
+            np.savetxt(f, np.column_stack(columns), delimiter=',', fmt='%.10g')
+            if front is not None:
+                front.update(batch)
+            total += len(batch)
+    print(f"grid: {total} points in {time.perf_counter() - start:.3f} s")
+
+    if front is not None and len(front):
+        front.result().to_csv(os.path.join(output, 'pareto.csv'))
+        print(f"pareto: {len(front)} non-dominated designs")
+
+
+def plot_sweeps(results, output):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import ui_utils
+
+    specs = {
+        'rmes': ui_utils.get_rmes_spec,
+        'k': ui_utils.get_overlap_spec,
+        'r': ui_utils.get_r_spec,
+        'pin1': ui_utils.get_pin1_spec,
+        'vos': ui_utils.get_vos_spec,
+        'n_channels': ui_utils.get_n_channels_spec,
+    }
+    plotter = ui_utils.SweepPlotter()
+    for name, result in results.items():
+        fig = plt.figure(figsize=(8, 5))
+        plotter.plot(fig.add_subplot(1, 1, 1), result, specs[name]())
+        fig.tight_layout()
+        fig.savefig(os.path.join(output, f'sweep_{name}.png'), dpi=150)
+        plt.close(fig)
+
+
+def run(args):
+    config = load_config(args.config)
+    base_params = base_parameters(config)
+    options = config.get('options', {})
+    output = args.output or os.path.splitext(os.path.basename(args.config))[0] + '_results'
+    os.makedirs(output, exist_ok=True)
+
+    run_design(base_params, output)
+    with DesignSweep(options.get('executor', 'serial'), options.get('max_workers')) as sweep:
+        run_sweeps(sweep, base_params, config.get('sweeps', {}), output, args.plot)
+        if config.get('grid'):
+            run_grid(sweep, base_params, config['grid'], options, output)
+    print(f"Results written to {output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='design_cli', description="Run designs and sweeps without the UI.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="run the design, sweeps and grid of a config file")
+    run_parser.add_argument('config', help="JSON or TOML parameter file")
+    run_parser.add_argument('--output', '-o', help="results directory (default: <config>_results)")
+    run_parser.add_argument('--plot', action='store_true', help="also render sweep plots as PNG")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        run(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
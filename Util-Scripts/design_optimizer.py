@@ -0,0 +1,230 @@
+import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from parameters_optimizer_v2 import CurrentMeasurementDesign
+
+GOLDEN = (math.sqrt(5) - 1) / 2
+GRID_STEPS = 20  # points per swept axis, the designer UI's default sweep resolution
+
+
+@dataclass
+class DesignTargets:
+    i_min: float                      # smallest current that must be measurable (A)
+    i_max: float                      # largest current that must be measurable (A)
+    v_rail: float = 5.0               # every channel's V_on_max must stay below the ADC rail (V)
+    min_gain: float = 1.0             # smallest realizable amplifier gain (1 for AD620)
+    max_gain: Optional[float] = 1000  # largest realizable amplifier gain, None for no limit
+
+
+@dataclass
+class DesignBounds:
+    rmes: Tuple[float, float] = (0.01, 10.0)
+    k: Tuple[float, float] = (0.5, 0.95)
+    r: Tuple[float, float] = (2.0, 20.0)
+    n_channels: Tuple[int, int] = (2, 8)
+
+
+@dataclass
+class OptimizationResult:
+    design: Optional[CurrentMeasurementDesign]
+    feasible: bool
+    evaluations: int       # designs evaluated by the optimizer
+    grid_evaluations: int  # designs a GRID_STEPS-per-axis rmes x k x r grid needs over the n_channels bounds
+    message: str
+
+
+def _bisect(f, lo, hi, xtol):
+    """Smallest x in [lo, hi] with f(x) >= 0 for a non-decreasing f, or None."""
+    if f(hi) < 0:
+        return None
+    if f(lo) >= 0:
+        return lo
+    while hi - lo > xtol:
+        mid = 0.5 * (lo + hi)
+        if f(mid) >= 0:
+            hi = mid
+        else:
+            lo = mid
+    return hi
+
+
+def _golden_section(f, lo, hi, xtol):
+    """Minimize a unimodal f on [lo, hi], returning (x, f(x))."""
+    a, b = lo, hi
+    c = b - GOLDEN * (b - a)
+    d = a + GOLDEN * (b - a)
+    fc, fd = f(c), f(d)
+    while b - a > xtol:
+        if fc <= fd:
+            b, d, fd = d, c, fc
+            c = b - GOLDEN * (b - a)
+            fc = f(c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + GOLDEN * (b - a)
+            fd = f(d)
+    candidates = [(f(lo), lo), (fc, c), (fd, d), (f(hi), hi)]
+    best_f, best_x = min(candidates)
+    return best_x, best_f
+
+
+class DesignOptimizer:
+    """
+    Solve for rmes, k, r and n_channels meeting a set of DesignTargets.
+
+    Uses the closed-form relations of CurrentMeasurementDesign.design():
+    rmes follows directly from I_c_min1 = V_os / (P_in1 * R_mes), the
+    smallest r that reaches the total range is found by bisection, and k is
+    chosen by bounded golden-section minimization of the peak output voltage.
+    Channel counts are tried from the smallest up.
+    """
+
+    def __init__(self, base_params, targets: DesignTargets, bounds: DesignBounds = None, tol=1e-4):
+        """
+        base_params (dict): vos, pin1, delta_ic1, kp and von_min of the design;
+            rmes, k, r and n_channels are solved for.
+        tol (float): Resolution of the solved parameters as a fraction of their bounds.
+        """
+        self.base_params = base_params
+        self.targets = targets
+        self.bounds = bounds or DesignBounds()
+        self.tol = tol
+        self.evaluations = 0
+
+    def evaluate(self, rmes, k, r, n_channels):
+        self.evaluations += 1
+        params = {name: self.base_params[name] for name in ('vos', 'pin1', 'delta_ic1', 'kp', 'von_min')}
+        design = CurrentMeasurementDesign(rmes=rmes, k=k, r=r, n_channels=n_channels, **params)
+        design.design()
+        return design
+
+    def _xtol(self, bounds):
+        return (bounds[1] - bounds[0]) * self.tol
+
+    def grid_evaluations(self, steps=GRID_STEPS):
+        """
+        Points a brute-force rmes x k x r grid of `steps` points per axis needs
+        for every channel count in the bounds. The default is the resolution
+        the designer UI sweeps at, which is far coarser than tol: a grid
+        resolving tol would need about (1 / tol) ** 3 points per channel count.
+        """
+        n_lo, n_hi = self.bounds.n_channels
+        return (n_hi - n_lo + 1) * steps ** 3
+
+    def solve_rmes(self):
+        """Smallest shunt whose I_c_min1 reaches the minimum current target."""
+        rmes = self.base_params['vos'] / (self.base_params['pin1'] * self.targets.i_min)
+        lo, hi = self.bounds.rmes
+        if rmes > hi:
+            return None
+        return max(lo, rmes)
+
+    def solve_r(self, rmes, k, n_channels):
+        """Smallest range ratio whose last channel reaches the maximum current target."""
+        def reaches(r):
+            return self.evaluate(rmes, k, r, n_channels).get_total_range()[1] - self.targets.i_max
+        return _bisect(reaches, *self.bounds.r, self._xtol(self.bounds.r))
+
+    def peak_voltage(self, design):
+        return design.max_voltage()
+
+    def violations(self, design):
+        targets = self.targets
+        problems = []
+        min_current, max_current = design.get_total_range()
+        if min_current > targets.i_min * (1 + 1e-9):
+            problems.append(f"I_min {min_current:.3g} A above target {targets.i_min:.3g} A")
+        if max_current < targets.i_max * (1 - 1e-9):
+            problems.append(f"I_max {max_current:.3g} A below target {targets.i_max:.3g} A")
+        peak = self.peak_voltage(design)
+        if peak > targets.v_rail:
+            problems.append(f"V_on_max {peak:.3g} V above the {targets.v_rail} V rail")
+        gains = design.channel_array('ad_rmes') / design.rmes
+        if targets.max_gain is not None and gains.max() > targets.max_gain:
+            problems.append(f"gain {gains.max():.4g} above {targets.max_gain}")
+        if gains.min() < targets.min_gain:
+            problems.append(f"gain {gains.min():.4g} below {targets.min_gain}")
+        return problems
+
+    def optimize_channels(self, rmes, n_channels):
+        """Best design with a fixed channel count, or None if the range is unreachable."""
+        k_lo, k_hi = self.bounds.k
+        r_hi = self.bounds.r[1]
+
+        # Larger k never shrinks the range, so the feasible k form an interval [k_min, k_hi].
+        def reaches(k):
+            return self.evaluate(rmes, k, r_hi, n_channels).get_total_range()[1] - self.targets.i_max
+        k_min = _bisect(reaches, k_lo, k_hi, self._xtol(self.bounds.k))
+        if k_min is None:
+            return None
+
+        def peak(k):
+            r = self.solve_r(rmes, k, n_channels)
+            return self.peak_voltage(self.evaluate(rmes, k, r, n_channels))
+
+        k, _ = _golden_section(peak, k_min, k_hi, self._xtol(self.bounds.k))
+        return self.evaluate(rmes, k, self.solve_r(rmes, k, n_channels), n_channels)
+
+    def optimize(self, objective='channels') -> OptimizationResult:
+        """
+        objective (str): 'channels' returns the feasible design with the fewest
+            channels, 'max_voltage' the one with the lowest peak output voltage
+            over every channel count in the bounds.
+        """
+        if objective not in ('channels', 'max_voltage'):
+            raise ValueError(f"Unknown objective: {objective}")
+        self.evaluations = 0
+
+        rmes = self.solve_rmes()
+        if rmes is None:
+            return self._result(None, "Minimum current target needs R_mes above its upper bound")
+
+        best = None
+        closest = None
+        n_lo, n_hi = self.bounds.n_channels
+        for n_channels in range(n_lo, n_hi + 1):
+            design = self.optimize_channels(rmes, n_channels)
+            if design is None:
+                continue
+            closest = design
+            if self.violations(design):
+                continue
+            if best is None or self.peak_voltage(design) < self.peak_voltage(best):
+                best = design
+            if objective == 'channels':
+                break
+
+        if best is not None:
+            return self._result(best, f"Feasible {best.n_channels}-channel design")
+        if closest is not None:
+            return self._result(closest, "No feasible design: " + "; ".join(self.violations(closest)))
+        return self._result(None, "Maximum current target is out of reach within the bounds")
+
+    def _result(self, design, message):
+        feasible = design is not None and not self.violations(design)
+        return OptimizationResult(design, feasible, self.evaluations, self.grid_evaluations(), message)
+
+
+def optimize_design(base_params, targets: DesignTargets, bounds: DesignBounds = None,
+                    tol=1e-4, objective='channels') -> OptimizationResult:
+    """Convenience wrapper around DesignOptimizer.optimize()."""
+    return DesignOptimizer(base_params, targets, bounds, tol).optimize(objective)
+
+
+if __name__ == "__main__":
+    base_params = {
+        'vos': 50e-6,
+        'pin1': 0.2,
+        'delta_ic1': 2.25e-3,
+        'kp': 0.0048828,
+        'von_min': 0.23,
+    }
+    optimizer_tol = 1e-4
+    result = optimize_design(base_params, DesignTargets(i_min=250e-6, i_max=160e-3), tol=optimizer_tol)
+    print(result.message)
+    print(f"Evaluations: {result.evaluations} (a {GRID_STEPS}-point-per-axis grid, as the designer UI sweeps, "
+          f"needs {result.grid_evaluations:,} and resolves each parameter to 1/{GRID_STEPS - 1} of its bounds "
+          f"instead of {optimizer_tol:g})")
+    if result.design:
+        result.design.print_summary()
@@ -0,0 +1,157 @@
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+DEFAULT_VISIBLE_LINES = 2000
+
+
+class LogHistory:
+    """
+    Append-only on-disk copy of the serial log with a line offset index.
+
+    Works as an AcquisitionEngine sink: text is appended as it arrives and
+    the byte offset of every line start is recorded, so any window of lines
+    can be read back with a single seek without scanning the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w+b')
+        self._offsets = np.zeros(1024, dtype=np.int64)  # _offsets[i] = start of line i
+        self._lines = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Number of lines, counting an unterminated last line."""
+        return self._lines + (self._size > self._line_start(self._lines))
+
+    def _line_start(self, index):
+        return int(self._offsets[index])
+
+    def append(self, text):
+        if not text:
+            return
+        data = text.encode('utf-8')
+        newlines = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 10)
+        with self._lock:
+            ends = newlines + self._size + 1
+            needed = self._lines + len(ends) + 1
+            if needed > len(self._offsets):
+                self._offsets = np.resize(self._offsets, max(needed, 2 * len(self._offsets)))
+            self._offsets[self._lines + 1:self._lines + 1 + len(ends)] = ends
+            self._lines += len(ends)
+            self._file.seek(self._size)
+            self._file.write(data)
+            self._size += len(data)
+
+    def write(self, samples, text):
+        self.append(text)
+
+    def flush(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def read_lines(self, start, count):
+        """Lines start .. start + count - 1 as one string."""
+        start = max(0, min(start, len(self)))
+        stop = min(len(self), start + count)
+        if stop <= start:
+            return ''
+        with self._lock:
+            begin = self._line_start(start)
+            end = self._line_start(stop) if stop <= self._lines else self._size
+            if self._file.closed:
+                with open(self.path, 'rb') as f:
+                    f.seek(begin)
+                    data = f.read(end - begin)
+            else:
+                self._file.flush()
+                self._file.seek(begin)
+                data = self._file.read(end - begin)
+        return data.decode('utf-8', errors='replace')
+
+
+class BoundedLog:
+    """
+    Keeps a Text widget at no more than max_lines lines. Each append deletes
+    the overflow from the top in one call, so the widget's memory and insert
+    cost stay flat however long the session runs.
+    """
+
+    def __init__(self, widget, max_lines=DEFAULT_VISIBLE_LINES):
+        self.widget = widget
+        self.max_lines = max_lines
+
+    def append(self, text):
+        self.widget.insert(tk.END, text)
+        lines = int(self.widget.index('end-1c').split('.')[0])
+        if lines > self.max_lines:
+            self.widget.delete('1.0', f'{lines - self.max_lines + 1}.0')
+        self.widget.see(tk.END)
+
+    def clear(self):
+        self.widget.delete('1.0', tk.END)
+
+
+class HistoryViewer:
+    """
+    Scrollback window over a LogHistory. Only the page of lines on screen is
+    read from disk; the scrollbar and mouse wheel move that page through the
+    whole file.
+    """
+
+    def __init__(self, master, history: LogHistory, page_lines=50):
+        self.history = history
+        self.page_lines = page_lines
+        self.first = max(0, len(history) - page_lines)
+
+        self.window = tk.Toplevel(master)
+        self.window.title(f"Log History - {history.path}")
+        self.text = tk.Text(self.window, wrap=tk.NONE, width=100, height=page_lines)
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ttk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.status = ttk.Label(self.window)
+        self.status.grid(row=1, column=0, columnspan=2, sticky="w", padx=5)
+        self.window.rowconfigure(0, weight=1)
+        self.window.columnconfigure(0, weight=1)
+
+        self.text.bind("<MouseWheel>", lambda e: self.scroll_lines(-3 if e.delta > 0 else 3))
+        self.text.bind("<Button-4>", lambda e: self.scroll_lines(-3))
+        self.text.bind("<Button-5>", lambda e: self.scroll_lines(3))
+        self.text.bind("<Prior>", lambda e: self.scroll_lines(-self.page_lines))
+        self.text.bind("<Next>", lambda e: self.scroll_lines(self.page_lines))
+        self.text.bind("<End>", lambda e: self.show(len(self.history)))
+        self.show(self.first)
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.show(int(float(amount) * len(self.history)))
+        elif action == 'scroll':
+            step = self.page_lines if unit == 'pages' else 1
+            self.scroll_lines(int(amount) * step)
+
+    def scroll_lines(self, lines):
+        self.show(self.first + lines)
+        return "break"
+
+    def show(self, first):
+        total = len(self.history)
+        self.first = max(0, min(first, total - self.page_lines))
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', self.history.read_lines(self.first, self.page_lines))
+        self.text.configure(state=tk.DISABLED)
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + self.page_lines) / total))
+        last = min(total, self.first + self.page_lines)
+        self.status.configure(text=f"Lines {self.first + 1}-{last} of {total}")
@@ -0,0 +1,185 @@
+"""
+asyncio backend that reads several serial ports from one event loop.
+
+Each port gets its own decoder and ring buffer (an AcquisitionEngine driven
+by the loop instead of a thread). On POSIX the loop watches the port file
+descriptors with add_reader(), so a port is only read when it has data;
+elsewhere every port is polled without blocking. merged() interleaves all
+ports into one stream ordered by host timestamp.
+"""
+import asyncio
+import threading
+import time
+
+import numpy as np
+from serial import Serial, SerialException
+
+from acquisition import DEFAULT_CAPACITY, READ_SIZE, AcquisitionEngine
+from serial_protocol import SAMPLE_DTYPE
+
+POLL_INTERVAL = 0.005  # s between reads when the loop cannot watch file descriptors
+MAX_LATENCY = 0.1      # s merged() waits for a quiet port before moving past it
+
+MERGED_DTYPE = np.dtype(SAMPLE_DTYPE.descr + [('port', 'u1')])
+
+
+class PortStream:
+    """One port of a MultiPortReader: the port, its engine and its merge state."""
+
+    def __init__(self, index, name, port, protocol='text', capacity=DEFAULT_CAPACITY, max_spread=MAX_LATENCY):
+        self.index = index
+        self.name = name
+        self.port = port
+        # A chunk must not be spread back past a watermark merged() has already
+        # moved beyond, so spreading is limited to the merge latency.
+        self.engine = AcquisitionEngine(port, protocol, capacity, max_spread=max_spread)
+        self.error = None
+        self.last_timestamp = None
+        # A chunk's receive time is taken and its samples stored under the lock,
+        # so merged() never sees a timestamp whose samples it has not collected.
+        self._lock = threading.Lock()
+        self._cursor = 0
+        self._pending = np.empty(0, dtype=MERGED_DTYPE)
+
+    def read_available(self):
+        """Read and decode whatever the port has, without blocking."""
+        try:
+            data = self.port.read(max(READ_SIZE, self.port.in_waiting))
+        except (SerialException, OSError) as e:
+            self.error = e
+            return False
+        if data:
+            with self._lock:
+                samples = self.engine.process(data)
+                if len(samples):
+                    self.last_timestamp = float(samples['timestamp'][-1])
+        return True
+
+    def collect(self):
+        """Move samples acquired since the last merge into the pending queue; the last one's timestamp."""
+        with self._lock:
+            samples, self._cursor, _ = self.engine.ring.read_since(self._cursor)
+            last_timestamp = self.last_timestamp
+        if len(samples):
+            tagged = np.empty(len(samples), dtype=MERGED_DTYPE)
+            for name in SAMPLE_DTYPE.names:
+                tagged[name] = samples[name]
+            tagged['port'] = self.index
+            self._pending = np.concatenate([self._pending, tagged])
+        return last_timestamp
+
+    def take_until(self, watermark):
+        split = np.searchsorted(self._pending['timestamp'], watermark, side='right')
+        ready, self._pending = self._pending[:split], self._pending[split:]
+        return ready
+
+
+class MultiPortReader:
+    """
+    Services any number of serial ports concurrently from a single asyncio
+    event loop running on one background thread.
+
+    Ports are pyserial Serial objects (opened with timeout=0) or anything with
+    the same read()/in_waiting/fileno() interface; add_port() also accepts a
+    device path and opens it.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL, max_latency=MAX_LATENCY):
+        self.poll_interval = poll_interval
+        self.max_latency = max_latency
+        self.streams = {}
+        self.loop = None
+        self._stop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def add_port(self, name, port, baud=115200, protocol='text', capacity=DEFAULT_CAPACITY):
+        if self.loop is not None:
+            raise RuntimeError("Ports must be added before the reader starts")
+        if isinstance(port, str):
+            port = Serial(port, baud, timeout=0)
+        stream = PortStream(len(self.streams), name, port, protocol, capacity, self.max_latency)
+        self.streams[name] = stream
+        return stream
+
+    def __getitem__(self, name):
+        return self.streams[name]
+
+    async def run(self):
+        """Read every port until stop() is called."""
+        self.loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        watched, polled = [], []
+        for stream in self.streams.values():
+            try:
+                self.loop.add_reader(stream.port.fileno(), self._on_readable, stream)
+                watched.append(stream)
+            except (NotImplementedError, AttributeError, ValueError):
+                polled.append(stream)
+        poller = asyncio.ensure_future(self._poll(polled)) if polled else None
+        self._ready.set()
+        try:
+            await self._stop.wait()
+        finally:
+            for stream in watched:
+                self.loop.remove_reader(stream.port.fileno())
+            if poller is not None:
+                poller.cancel()
+
+    def _on_readable(self, stream):
+        if not stream.read_available():
+            self.loop.remove_reader(stream.port.fileno())
+
+    async def _poll(self, streams):
+        while True:
+            for stream in streams:
+                if stream.error is None and stream.port.in_waiting:
+                    stream.read_available()
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Run the event loop on a background thread."""
+        self._ready.clear()
+        self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self, close_ports=True):
+        if self.loop is not None and self._stop is not None:
+            self.loop.call_soon_threadsafe(self._stop.set)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.loop = None
+        if close_ports:
+            for stream in self.streams.values():
+                stream.port.close()
+
+    def merged(self, now=None):
+        """
+        Samples from every port since the last call, ordered by timestamp and
+        tagged with their port index. A port that has gone quiet holds the
+        stream back for at most max_latency, so ordering stays correct across
+        ports without one idle board stalling the rest.
+        """
+        now = time.time() if now is None else now
+        floor = now - self.max_latency
+        watermark = now
+        for stream in self.streams.values():
+            last_timestamp = stream.collect()
+            if stream.error is None:
+                watermark = min(watermark, max(last_timestamp or floor, floor))
+        ready = [stream.take_until(watermark) for stream in self.streams.values()]
+        merged = np.concatenate(ready) if ready else np.empty(0, dtype=MERGED_DTYPE)
+        return merged[np.argsort(merged['timestamp'], kind='stable')]
+
+    def stats(self):
+        return {
+            name: {
+                'bytes': stream.engine.bytes_read,
+                'samples': stream.engine.ring.total,
+                'error': None if stream.error is None else str(stream.error),
+            }
+            for name, stream in self.streams.items()
+        }
+
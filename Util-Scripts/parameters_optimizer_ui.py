@@ -8,19 +8,25 @@ import json
 import os
 from datetime import datetime
 
-from parameters_optimizer_v2 import  CurrentMeasurementDesign ,DesignSweep
-from ui_utils import get_n_channels_spec ,get_overlap_spec ,get_pin1_spec,get_r_spec,get_rmes_spec,get_vos_spec ,SweepPlotter
+from parameters_optimizer_v2 import  DesignSweep ,DesignCache ,SweepResult
+from ui_utils import get_n_channels_spec ,get_overlap_spec ,get_pin1_spec,get_r_spec,get_rmes_spec,get_vos_spec ,get_pareto_spec ,SweepPlotter
+from pareto import pareto_front
+
+
+DESIGN_CACHE_SIZE = 4096
 
 
 class ModernCurrentMeasurementUI:
-    def __init__(self, root):
+    def __init__(self, root, cache_size=DESIGN_CACHE_SIZE):
         self.root = root
         self.root.title("Current Measurement System Designer")
         self.root.geometry("1600x1000")
         
-        self.design_sweep :DesignSweep = DesignSweep()
+        self.design_cache = DesignCache(maxsize=cache_size)
+        self.design_sweep :DesignSweep = DesignSweep(cache=self.design_cache)
         self.current_design = None
         self.sweep_results = {}
+        self.pareto_results = None
         
         self.fig_design = plt.Figure(figsize=(12, 8))
         self.fig_sweep = plt.Figure(figsize=(12, 8))
@@ -149,6 +155,8 @@ class ModernCurrentMeasurementUI:
         
         ttk.Button(sweep_group, text="Run Sweep", 
                   command=self.run_sweep).pack(pady=5)
+        ttk.Button(sweep_group, text="Pareto Front", 
+                  command=self.run_pareto).pack(pady=5)
     
     def create_results_panel(self, parent):
         notebook = ttk.Notebook(parent)
@@ -217,6 +225,14 @@ class ModernCurrentMeasurementUI:
         
         self.canvas_analysis = FigureCanvasTkAgg(self.fig_analysis, master=plot_frame)
         self.canvas_analysis.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        
+        control_frame = ttk.Frame(plot_frame)
+        control_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Button(control_frame, text="Export Pareto CSV", 
+                  command=self.export_pareto).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Save Plot", 
+                  command=lambda: self.save_plot(self.fig_analysis)).pack(side=tk.LEFT, padx=5)
     
     def save_design(self):
         if not self.current_design:
@@ -229,7 +245,9 @@ class ModernCurrentMeasurementUI:
                 'timestamp': datetime.now().isoformat(),
                 'parameters': self.get_input_parameters(),
                 'design_results': {},
-                'sweep_results': self.sweep_results
+                'sweep_results': {
+                    param: results.to_dict() for param, results in self.sweep_results.items()
+                }
             }
         
             for n, ch in self.current_design.channels.items():
@@ -278,7 +296,10 @@ class ModernCurrentMeasurementUI:
 
             if 'sweep_results' in data:
                 
-                self.sweep_results = data['sweep_results']
+                self.sweep_results = {
+                    param: SweepResult.from_dict(results, param)
+                    for param, results in data['sweep_results'].items()
+                }
                 self.plot_sweep_analysis()
             
             messagebox.showinfo("Success", f"Design loaded from:\n{filepath}")
@@ -321,6 +342,39 @@ class ModernCurrentMeasurementUI:
         except Exception as e:
             messagebox.showerror("Sweep Error", str(e))
     
+    def run_pareto(self):
+        """Extract the non-dominated designs of every sweep that carries channel data."""
+        batches = [results.batch for results in self.sweep_results.values()
+                   if getattr(results, 'batch', None) is not None]
+        if not batches:
+            messagebox.showwarning("Warning", "No sweep results to analyse. Please run a sweep first.")
+            return
+        
+        try:
+            self.pareto_results = pareto_front(batches)
+            self.fig_analysis.clear()
+            ax = self.fig_analysis.add_subplot(1, 1, 1)
+            self.plotter.plot(ax, self.pareto_results, get_pareto_spec())
+            self.fig_analysis.tight_layout()
+            self.canvas_analysis.draw()
+        except Exception as e:
+            messagebox.showerror("Pareto Error", str(e))
+    
+    def export_pareto(self):
+        if self.pareto_results is None:
+            messagebox.showwarning("Warning", "No Pareto front to export. Please compute one first.")
+            return
+        
+        filepath = filedialog.asksaveasfilename(
+            initialdir=self.data_dir,
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        
+        if filepath:
+            self.pareto_results.to_csv(filepath)
+            messagebox.showinfo("Success", f"Pareto front saved to:\n{filepath}")
+    
     def plot_design(self):
         if not self.current_design:
             return
@@ -333,8 +387,8 @@ class ModernCurrentMeasurementUI:
         axes = self.fig_design.subplots(2, 3)
         
         # Plot 1: Current ranges (log scale)
-        min_currents = [design.channels[n]['ic_min']*1e6 for n in channels]
-        max_currents = [design.channels[n]['ic_max']*1e6 for n in channels]
+        min_currents = design.channel_array('ic_min')*1e6
+        max_currents = design.channel_array('ic_max')*1e6
         axes[0,0].semilogy(channels, min_currents, 'bo-', label='I_min', markersize=6)
         axes[0,0].semilogy(channels, max_currents, 'ro-', label='I_max', markersize=6)
         axes[0,0].set_xlabel('Channel Number')
@@ -344,8 +398,8 @@ class ModernCurrentMeasurementUI:
         axes[0,0].grid(True, alpha=0.3)
         
         # Plot 2: Voltage requirements
-        von_max = [design.channels[n]['von_max'] for n in channels]
-        delta_von = [design.channels[n]['delta_von'] for n in channels]
+        von_max = design.channel_array('von_max')
+        delta_von = design.channel_array('delta_von')
         axes[0,1].plot(channels, von_max, 'g^-', label='V_max', markersize=6)
         axes[0,1].plot(channels, delta_von, 'mv-', label='ΔV_on', markersize=6)
         axes[0,1].set_xlabel('Channel Number')
@@ -355,7 +409,7 @@ class ModernCurrentMeasurementUI:
         axes[0,1].grid(True, alpha=0.3)
         
         # Plot 3: Amplifier gains (log scale)
-        gains = [design.channels[n]['ad_rmes']/design.rmes for n in channels]
+        gains = design.channel_array('ad_rmes')/design.rmes
         axes[0,2].semilogy(channels, gains, 's-', color='purple', markersize=6)
         axes[0,2].set_xlabel('Channel Number')
         axes[0,2].set_ylabel('Amplifier Gain')
@@ -363,7 +417,7 @@ class ModernCurrentMeasurementUI:
         axes[0,2].grid(True, alpha=0.3)
         
         # Plot 4: Input precision (log scale)
-        pin_values = [design.channels[n]['pin'] for n in channels]
+        pin_values = design.channel_array('pin')
         axes[1,0].semilogy(channels, pin_values, 'd-', color='orange', markersize=6)
         axes[1,0].set_xlabel('Channel Number')
         axes[1,0].set_ylabel('Input Precision')
@@ -371,7 +425,7 @@ class ModernCurrentMeasurementUI:
         axes[1,0].grid(True, alpha=0.3)
         
         # Plot 5: Current sensitivity
-        kc_values = [design.channels[n]['kc']*1e6 for n in channels]
+        kc_values = design.channel_array('kc')*1e6
         axes[1,1].semilogy(channels, kc_values, '*-', color='brown', markersize=6)
         axes[1,1].set_xlabel('Channel Number')
         axes[1,1].set_ylabel('Sensitivity (μA/step)')
@@ -414,8 +468,7 @@ class ModernCurrentMeasurementUI:
         """Calculate the current design based on input parameters."""
         try:
             params = self.get_input_parameters()
-            self.current_design = CurrentMeasurementDesign(**params)
-            self.current_design.design()
+            self.current_design = self.design_cache.get(**params)
             self.update_results_table()
             self.update_summary()
             self.plot_design()
@@ -443,14 +496,14 @@ class ModernCurrentMeasurementUI:
             
             values = (
                 str(n),
-                f"{ch['ic_min']*1e6:.2f}",
-                f"{ch['ic_max']*1e6:.2f}",
-                f"{ch['kc']*1e6:.4f}",
-                f"{ch['von_min']:.3f}",
-                f"{ch['von_max']:.3f}",
-                f"{ch['delta_von']:.3f}",
-                f"{ch['ad_rmes']:.1f}",
-                f"{ch['pin']:.3f}",
+                f"{ch.ic_min*1e6:.2f}",
+                f"{ch.ic_max*1e6:.2f}",
+                f"{ch.kc*1e6:.4f}",
+                f"{ch.von_min:.3f}",
+                f"{ch.von_max:.3f}",
+                f"{ch.delta_von:.3f}",
+                f"{ch.ad_rmes:.1f}",
+                f"{ch.pin:.3f}",
                 f"{gain_ratio:.3f}" if not math.isnan(gain_ratio) else "N/A"
             )
             
@@ -465,9 +518,10 @@ class ModernCurrentMeasurementUI:
         min_current, max_current = design.get_total_range()
         
         # Calculate additional metrics
-        max_voltage = max(ch['von_max'] for ch in design.channels.values())
-        min_voltage = min(ch['von_min'] for ch in design.channels.values())
-        gain_range = design.channels[1]['ad_rmes'] / design.channels[design.n_channels]['ad_rmes']
+        max_voltage = design.max_voltage()
+        min_voltage = min(ch.von_min for ch in design.channels.values())
+        gain_range = design.channels[1].ad_rmes / design.channels[design.n_channels].ad_rmes
+        cache_stats = self.design_cache.stats()
         
         summary = f"""CURRENT MEASUREMENT SYSTEM DESIGN SUMMARY
             {'='*60}
@@ -488,10 +542,13 @@ class ModernCurrentMeasurementUI:
             • Dynamic Range: {max_current/min_current:.0f}:1 ({20*math.log10(max_current/min_current):.1f} dB)
             • Output Precision: {design.precision:.4%}
             • Output Accuracy: {design.accuracy:.4%}
-            • Channel 1 Gain (A_d1): {design.channels[1]['ad_rmes']/design.rmes:.1f}
+            • Channel 1 Gain (A_d1): {design.channels[1].ad_rmes/design.rmes:.1f}
             • Overall Gain Range: {gain_range:.1f}:1
             • Voltage Range: {min_voltage:.3f} V to {max_voltage:.3f} V
 
+            DESIGN CACHE:
+            • {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%}), {cache_stats['size']}/{cache_stats['maxsize']} designs, {cache_stats['points']}/{cache_stats['sweep_maxsize']} sweep points
+
             CHANNEL TRANSITIONS:
             """
         
@@ -1,7 +1,78 @@
 import math
 import json 
+import csv
+import os
+import time
+import warnings
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from itertools import compress, repeat
 from typing import Dict ,Any
 
+import numpy as np
+
+CHANNEL_FIELDS = ('ic_min', 'ic_max', 'delta_ic', 'kc', 'von_min', 'von_max',
+                  'delta_von', 'ad_rmes', 'pin', 'precision', 'accuracy')
+PARAM_NAMES = ('vos', 'pin1', 'rmes', 'delta_ic1', 'kp', 'von_min', 'k', 'r', 'n_channels')
+
+
+class Channel(Mapping):
+    """
+    Parameters of one measurement channel.
+
+    A slotted record read through attributes (ch.ic_min) that still behaves
+    like the dict it replaces: ch['ic_min'], ch.items(), dict(ch) and
+    comparison with plain dicts all work.
+    """
+    __slots__ = CHANNEL_FIELDS
+
+    def __init__(self, ic_min, ic_max, delta_ic, kc, von_min, von_max, delta_von,
+                 ad_rmes, pin, precision, accuracy):
+        self.ic_min = ic_min
+        self.ic_max = ic_max
+        self.delta_ic = delta_ic
+        self.kc = kc
+        self.von_min = von_min
+        self.von_max = von_max
+        self.delta_von = delta_von
+        self.ad_rmes = ad_rmes
+        self.pin = pin
+        self.precision = precision
+        self.accuracy = accuracy
+
+    def __getitem__(self, key):
+        if key not in CHANNEL_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in CHANNEL_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(CHANNEL_FIELDS)
+
+    def __len__(self):
+        return len(CHANNEL_FIELDS)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in CHANNEL_FIELDS)
+        return f"Channel({fields})"
+
+    def astuple(self):
+        return tuple(getattr(self, name) for name in CHANNEL_FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in CHANNEL_FIELDS}
+
+
+CHANNEL_DTYPE = np.dtype([(name, float) for name in CHANNEL_FIELDS])
+
+
 class CurrentMeasurementDesign:
     def __init__(self, vos, pin1, rmes, delta_ic1, kp, von_min, k=0.8, r=10, n_channels=4):
         """
@@ -47,19 +118,19 @@ class CurrentMeasurementDesign:
         ad_rmes1 = self.von_min / self.ic_min1
         pin1 = self.vos / (self.ic_min1 * self.rmes)  
         
-        self.channels[1] = {
-            'ic_min': self.ic_min1,
-            'ic_max': ic_max1,
-            'delta_ic': self.delta_ic1,
-            'kc': kc1,
-            'von_min': self.von_min,
-            'von_max': von_max1,
-            'delta_von': von_max1 - self.von_min,
-            'ad_rmes': ad_rmes1,
-            'pin': pin1,
-            'precision': self.precision,
-            'accuracy': self.accuracy
-        }
+        self.channels[1] = Channel(
+            ic_min=self.ic_min1,
+            ic_max=ic_max1,
+            delta_ic=self.delta_ic1,
+            kc=kc1,
+            von_min=self.von_min,
+            von_max=von_max1,
+            delta_von=von_max1 - self.von_min,
+            ad_rmes=ad_rmes1,
+            pin=pin1,
+            precision=self.precision,
+            accuracy=self.accuracy
+        )
         
         prev_ic_max = ic_max1
         ad_rmes_prev= ad_rmes1
@@ -74,19 +145,19 @@ class CurrentMeasurementDesign:
             ad_rmes_n = self.von_min / ic_min_n
             pin_n = self.vos / (ic_min_n * self.rmes)
             
-            self.channels[n] = {
-                'ic_min': ic_min_n,
-                'ic_max': ic_max_n,
-                'delta_ic': delta_ic_n,
-                'kc': kc_n,
-                'von_min': self.von_min,
-                'von_max': von_max_n,
-                'delta_von': von_max_n - self.von_min,
-                'ad_rmes': ad_rmes_n,
-                'pin': pin_n,
-                'precision': self.precision,
-                'accuracy': self.accuracy
-            }
+            self.channels[n] = Channel(
+                ic_min=ic_min_n,
+                ic_max=ic_max_n,
+                delta_ic=delta_ic_n,
+                kc=kc_n,
+                von_min=self.von_min,
+                von_max=von_max_n,
+                delta_von=von_max_n - self.von_min,
+                ad_rmes=ad_rmes_n,
+                pin=pin_n,
+                precision=self.precision,
+                accuracy=self.accuracy
+            )
             
      
             if n > 1:
@@ -99,6 +170,21 @@ class CurrentMeasurementDesign:
     def verify_calculations(self):
         pass 
 
+    def channel_array(self, field):
+        """Values of one channel field for channels 1..n_channels as a NumPy array."""
+        return np.array([getattr(self.channels[n], field) for n in range(1, self.n_channels + 1)])
+
+    def channel_table(self):
+        """All channels as a structured array with one record per channel."""
+        return np.array([self.channels[n].astuple() for n in range(1, self.n_channels + 1)],
+                        dtype=CHANNEL_DTYPE)
+
+    def gain_ratio_array(self):
+        return np.array([self.gain_ratios[n] for n in range(1, self.n_channels)])
+
+    def max_voltage(self):
+        return max(ch.von_max for ch in self.channels.values())
+
     
     def print_summary(self):
         """Print a formatted summary of the design."""
@@ -130,15 +216,13 @@ class CurrentMeasurementDesign:
             else:
                 gain_ratio_str = "N/A"
                 
-            print(f"{n:<3} {ch['ic_min']*1e6:<12.2f} {ch['ic_max']*1e6:<12.2f} "
-                  f"{ch['kc']*1e6:<15.4f} {ch['von_max']:<10.3f} {ch['ad_rmes']:<12.1f} "
-                  f"{ch['pin']:<10.3f} {gain_ratio_str:<12}")
+            print(f"{n:<3} {ch.ic_min*1e6:<12.2f} {ch.ic_max*1e6:<12.2f} "
+                  f"{ch.kc*1e6:<15.4f} {ch.von_max:<10.3f} {ch.ad_rmes:<12.1f} "
+                  f"{ch.pin:<10.3f} {gain_ratio_str:<12}")
     
     def get_total_range(self):
         """Get the total current range covered by the system."""
-        first_ch = self.channels[1]
-        last_ch = self.channels[self.n_channels]
-        return first_ch['ic_min'], last_ch['ic_max']
+        return self.channels[1].ic_min, self.channels[self.n_channels].ic_max
     
     def get_channel_parameters(self, channel):
         """Get parameters for a specific channel."""
@@ -161,7 +245,7 @@ class CurrentMeasurementDesign:
                 'precision': self.precision,
                 'accuracy': self.accuracy
             },
-            'channels': self.channels,
+            'channels': {n: ch.to_dict() for n, ch in self.channels.items()},
             'gain_ratios': self.gain_ratios
         }
 
@@ -191,7 +275,7 @@ class CurrentMeasurementDesign:
         design.ic_min1 = metadata['ic_min1']
         design.precision = metadata['precision']
         design.accuracy = metadata['accuracy']
-        design.channels = data['channels']
+        design.channels = {n: Channel(**ch) for n, ch in data['channels'].items()}
         design.gain_ratios = data['gain_ratios']
         
         return design
@@ -208,105 +292,748 @@ class CurrentMeasurementDesign:
         return cls.from_dict(data)
 
 
+CHANNEL_ARRAYS = ('ic_min', 'ic_max', 'delta_ic', 'kc', 'von_max', 'ad_rmes', 'pin', 'gain_ratios')
+BATCH_ARRAYS = ('ic_min1', 'precision', 'accuracy') + CHANNEL_ARRAYS
+
+
+@dataclass
+class BatchDesign:
+    """
+    Channel parameters for many designs, one row per parameter set.
+
+    Per-channel arrays have shape (n_points, max_channels); the columns past a
+    row's own n_channels are NaN. gain_ratios has one column less, column n-1
+    holding the ratio between channel n and n+1 like CurrentMeasurementDesign.
+    """
+    params: Dict[str, np.ndarray]
+    ic_min1: np.ndarray
+    precision: np.ndarray
+    accuracy: np.ndarray
+    ic_min: np.ndarray
+    ic_max: np.ndarray
+    delta_ic: np.ndarray
+    kc: np.ndarray
+    von_max: np.ndarray
+    ad_rmes: np.ndarray
+    pin: np.ndarray
+    gain_ratios: np.ndarray
+    offset: int = 0  # index of the first row within the sweep it came from
+
+    def __len__(self):
+        return self.ic_min1.shape[0]
+
+    @property
+    def n_channels(self):
+        return self.params['n_channels']
+
+    @property
+    def channel_mask(self):
+        """Boolean (n_points, max_channels) array of the channels each row uses."""
+        return np.arange(self.ic_min.shape[1]) < self.n_channels[:, None]
+
+    def channel_field(self, name):
+        """Return any of CHANNEL_FIELDS as a (n_points, max_channels) array."""
+        if name in ('von_min', 'precision', 'accuracy'):
+            column = self.params['von_min'] if name == 'von_min' else getattr(self, name)
+            return np.where(self.channel_mask, column[:, None], np.nan)
+        if name == 'delta_von':
+            return self.von_max - self.params['von_min'][:, None]
+        return getattr(self, name)
+
+    def _last_channel(self, array):
+        return array[np.arange(len(self)), self.n_channels - 1]
+
+    def total_range(self):
+        """Minimum and maximum measurable current of every design."""
+        return self.ic_min[:, 0], self._last_channel(self.ic_max)
+
+    def dynamic_range(self):
+        min_current, max_current = self.total_range()
+        return max_current / min_current
+
+    def max_voltage(self):
+        return np.nanmax(self.von_max, axis=1)
+
+    def gain_range(self):
+        return self.ad_rmes[:, 0] / self._last_channel(self.ad_rmes)
+
+    def ad1(self):
+        return self.ad_rmes[:, 0] / self.params['rmes']
+
+    def to_design(self, index):
+        """Materialize row `index` as a designed CurrentMeasurementDesign."""
+        params = {name: self.params[name][index].item() for name in PARAM_NAMES}
+        design = CurrentMeasurementDesign(**params)
+        von_min = params['von_min']
+        for c in range(params['n_channels']):
+            von_max = self.von_max[index, c].item()
+            design.channels[c + 1] = Channel(
+                ic_min=self.ic_min[index, c].item(),
+                ic_max=self.ic_max[index, c].item(),
+                delta_ic=self.delta_ic[index, c].item(),
+                kc=self.kc[index, c].item(),
+                von_min=von_min,
+                von_max=von_max,
+                delta_von=von_max - von_min,
+                ad_rmes=self.ad_rmes[index, c].item(),
+                pin=self.pin[index, c].item(),
+                precision=design.precision,
+                accuracy=design.accuracy
+            )
+            if c > 0:
+                design.gain_ratios[c] = self.gain_ratios[index, c - 1].item()
+        return design
+
+    def design_dict(self, index) -> Dict[str, Any]:
+        return self.to_design(index).to_dict()
+
+    def take(self, indices):
+        """New batch holding only the given rows."""
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        # ndarray.take copies whole rows far faster than fancy indexing does for 2-D arrays.
+        return BatchDesign(
+            params={name: values.take(indices, axis=0) for name, values in self.params.items()},
+            **{name: getattr(self, name).take(indices, axis=0) for name in BATCH_ARRAYS}
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain lists for JSON serialization; unused channel slots stay NaN."""
+        data = {name: getattr(self, name).tolist() for name in BATCH_ARRAYS}
+        data['params'] = {name: values.tolist() for name, values in self.params.items()}
+        data['offset'] = self.offset
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]):
+        n_points = len(data['ic_min1'])
+        fields = {}
+        for name in BATCH_ARRAYS:
+            array = np.asarray(data[name], dtype=float)
+            fields[name] = array.reshape(n_points, -1) if name in CHANNEL_ARRAYS else array
+        params = {name: np.asarray(data['params'][name], dtype=int if name == 'n_channels' else float)
+                  for name in PARAM_NAMES}
+        return cls(params=params, offset=data.get('offset', 0), **fields)
+
+    @classmethod
+    def from_designs(cls, designs):
+        """Stack already designed CurrentMeasurementDesign objects into a batch."""
+        designs = list(designs)
+        width = max(design.n_channels for design in designs)
+
+        def columns(field):
+            array = np.full((len(designs), width), np.nan)
+            for i, design in enumerate(designs):
+                for n in range(1, design.n_channels + 1):
+                    array[i, n - 1] = getattr(design.channels[n], field)
+            return array
+
+        gain_ratios = np.full((len(designs), width - 1), np.nan)
+        for i, design in enumerate(designs):
+            for n, ratio in design.gain_ratios.items():
+                gain_ratios[i, n - 1] = ratio
+
+        return cls(
+            params={
+                name: np.array([getattr(design, name) for design in designs],
+                               dtype=int if name == 'n_channels' else float)
+                for name in PARAM_NAMES
+            },
+            ic_min1=np.array([design.ic_min1 for design in designs]),
+            precision=np.array([design.precision for design in designs]),
+            accuracy=np.array([design.accuracy for design in designs]),
+            ic_min=columns('ic_min'),
+            ic_max=columns('ic_max'),
+            delta_ic=columns('delta_ic'),
+            kc=columns('kc'),
+            von_max=columns('von_max'),
+            ad_rmes=columns('ad_rmes'),
+            pin=columns('pin'),
+            gain_ratios=gain_ratios
+        )
+
+    @classmethod
+    def concatenate(cls, batches):
+        """Stack batches row-wise, padding narrower channel arrays with NaN."""
+        batches = list(batches)
+        width = max(batch.ic_min.shape[1] for batch in batches)
+
+        def stack(name, columns):
+            arrays = []
+            for batch in batches:
+                array = getattr(batch, name)
+                missing = columns - array.shape[1]
+                if missing > 0:
+                    array = np.pad(array, ((0, 0), (0, missing)), constant_values=np.nan)
+                arrays.append(array)
+            return np.concatenate(arrays)
+
+        return cls(
+            params={name: np.concatenate([batch.params[name] for batch in batches]) for name in PARAM_NAMES},
+            ic_min1=np.concatenate([batch.ic_min1 for batch in batches]),
+            precision=np.concatenate([batch.precision for batch in batches]),
+            accuracy=np.concatenate([batch.accuracy for batch in batches]),
+            ic_min=stack('ic_min', width),
+            ic_max=stack('ic_max', width),
+            delta_ic=stack('delta_ic', width),
+            kc=stack('kc', width),
+            von_max=stack('von_max', width),
+            ad_rmes=stack('ad_rmes', width),
+            pin=stack('pin', width),
+            gain_ratios=stack('gain_ratios', width - 1),
+            offset=batches[0].offset
+        )
+
+
+class SweepResult:
+    """
+    Columnar result of a sweep: one array per scalar metric plus the
+    BatchDesign holding the (n_points, n_channels) channel arrays.
+
+    Indexing with a column name returns that array, indexing with an integer
+    returns the row as a dict, and design(i) materializes a single
+    CurrentMeasurementDesign only when it is actually needed.
+    """
+
+    def __init__(self, parameter, columns: Dict[str, np.ndarray], batch: BatchDesign = None):
+        self.parameter = parameter
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        self.batch = batch
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return {name: values[key].item() for name, values in self.columns.items()}
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def keys(self):
+        return self.columns.keys()
+
+    def column(self, name):
+        return self.columns[name]
+
+    def channel_field(self, name):
+        """Per-channel values of every point, see BatchDesign.channel_field."""
+        return self.batch.channel_field(name)
+
+    def design(self, index):
+        if self.batch is None:
+            raise ValueError("This sweep result was loaded without channel data")
+        return self.batch.to_design(index)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'parameter': self.parameter,
+            'columns': {name: values.tolist() for name, values in self.columns.items()},
+            'batch': self.batch.to_dict() if self.batch is not None else None
+        }
+
+    def to_csv(self, filepath):
+        """Write the metric columns, one row per point."""
+        with open(filepath, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns.keys())
+            writer.writerows(zip(*(values.tolist() for values in self.columns.values())))
+
+    @classmethod
+    def from_dict(cls, data, parameter=None):
+        """Rebuild a result saved by to_dict(), or by the older row-per-point format."""
+        if isinstance(data, list):
+            keys = [key for key in (data[0] if data else {parameter: None}) if key != 'design']
+            return cls(parameter, {key: [row[key] for row in data] for key in keys})
+        batch = data.get('batch')
+        return cls(data['parameter'], data['columns'],
+                   BatchDesign.from_dict(batch) if batch is not None else None)
+
+
+def design_batch(vos, pin1, rmes, delta_ic1, kp, von_min, k=0.8, r=10, n_channels=4) -> BatchDesign:
+    """
+    Vectorized counterpart of CurrentMeasurementDesign.design().
+
+    Every argument may be a scalar or an array. They are broadcast to a single
+    1-D set of parameter points and each channel is computed as one column
+    operation over all points, so no per-point objects or dicts are created.
+    """
+    *floats, n_channels = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (vos, pin1, rmes, delta_ic1, kp, von_min, k, r)),
+        np.asarray(n_channels).astype(int)
+    )
+    vos, pin1, rmes, delta_ic1, kp, von_min, k, r = (np.ravel(a) for a in floats)
+    n_channels = np.ravel(n_channels)
+
+    n_points = n_channels.shape[0]
+    if n_points and n_channels.min() < 1:
+        raise ValueError("n_channels must be at least 1")
+    max_channels = int(n_channels.max()) if n_points else 1
+
+    ic_min1 = vos / (pin1 * rmes)
+    precision = kp / von_min
+    accuracy = 1 - precision
+
+    shape = (n_points, max_channels)
+    ic_min = np.empty(shape)
+    ic_max = np.empty(shape)
+    delta_ic = np.empty(shape)
+    ic_min[:, 0] = ic_min1
+    delta_ic[:, 0] = delta_ic1
+    ic_max[:, 0] = ic_min1 + delta_ic1
+    for n in range(2, max_channels + 1):
+        ic_min[:, n - 1] = k * ic_max[:, n - 2]
+        delta_ic[:, n - 1] = delta_ic1 * (r ** (n - 1))
+        ic_max[:, n - 1] = ic_min[:, n - 1] + delta_ic[:, n - 1]
+
+    unused = np.arange(max_channels) >= n_channels[:, None]
+    for array in (ic_min, ic_max, delta_ic):
+        array[unused] = np.nan
+
+    von_max = von_min[:, None] * (ic_max / ic_min)
+    ad_rmes = von_min[:, None] / ic_min
+
+    return BatchDesign(
+        params={
+            'vos': vos, 'pin1': pin1, 'rmes': rmes, 'delta_ic1': delta_ic1, 'kp': kp,
+            'von_min': von_min, 'k': k, 'r': r, 'n_channels': n_channels
+        },
+        ic_min1=ic_min1,
+        precision=precision,
+        accuracy=accuracy,
+        ic_min=ic_min,
+        ic_max=ic_max,
+        delta_ic=delta_ic,
+        kc=precision[:, None] * ic_min,
+        von_max=von_max,
+        ad_rmes=ad_rmes,
+        pin=vos[:, None] / (ic_min * rmes[:, None]),
+        gain_ratios=ad_rmes[:, :-1] / ad_rmes[:, 1:]
+    )
+
+
+class DesignCache:
+    """
+    Bounded LRU cache of designed CurrentMeasurementDesign objects.
+
+    Entries are keyed on the normalized parameter tuple, so the same design
+    requested twice is only computed once. Sweep points are cached too, in a
+    second LRU of up to sweep_maxsize points keyed the same way, so sweeps
+    that share points (overlapping ranges, re-runs after changing another
+    input) only evaluate the ones they miss. Their rows stay columnar: each
+    batch of misses is kept as the BatchDesign it was computed as, and the
+    LRU maps a point to its row. Cached designs and rows are shared between
+    callers and must be treated as read-only.
+    """
+    DEFAULTS = {'k': 0.8, 'r': 10, 'n_channels': 4}
+
+    def __init__(self, maxsize=1024, sweep_maxsize=65536):
+        if maxsize < 0 or sweep_maxsize < 0:
+            raise ValueError("maxsize must not be negative")
+        self.maxsize = maxsize
+        self.sweep_maxsize = sweep_maxsize
+        self.hits = 0
+        self.misses = 0
+        self._designs = OrderedDict()
+        self._rows = OrderedDict()  # point key -> block id << 32 | row
+        self._blocks = {}           # block id -> [BatchDesign, live rows]
+        self._stored_rows = 0       # rows held by blocks, live or evicted
+        self._next_block = 0
+
+    def __len__(self):
+        return len(self._designs)
+
+    @classmethod
+    def key(cls, params):
+        params = {**cls.DEFAULTS, **params}
+        return tuple(float(params[name]) for name in PARAM_NAMES[:-1]) + (int(params['n_channels']),)
+
+    def lookup(self, params):
+        """Return the cached design for params or None, updating the counters."""
+        key = self.key(params)
+        design = self._designs.get(key)
+        if design is None:
+            self.misses += 1
+            return None
+        self._designs.move_to_end(key)
+        self.hits += 1
+        return design
+
+    def store(self, params, design):
+        if self.maxsize == 0:
+            return
+        key = self.key(params)
+        self._designs[key] = design
+        self._designs.move_to_end(key)
+        while len(self._designs) > self.maxsize:
+            self._designs.popitem(last=False)
+
+    @classmethod
+    def point_keys(cls, base_params, name, values):
+        """Keys of base_params with `name` set to each of values: the raw bytes of the normalized parameter rows."""
+        params = {**cls.DEFAULTS, **base_params}
+        rows = np.empty((len(values), len(PARAM_NAMES)))
+        for column, param in enumerate(PARAM_NAMES):
+            rows[:, column] = values if param == name else params[param]
+        rows[:, -1] = rows[:, -1].astype(int)
+        rows += 0.0  # -0.0 and 0.0 are the same point
+        return rows.view(np.dtype((np.void, rows.itemsize * rows.shape[1]))).ravel().tolist()
+
+    def lookup_points(self, keys):
+        """
+        Cached rows for keys as (batch, hit): batch holds the rows of the keys
+        with hit set, in key order, or is None when nothing hit.
+        """
+        locations = np.fromiter(map(self._rows.get, keys, repeat(-1)), np.int64, len(keys))
+        hit = locations >= 0
+        n_hits = int(hit.sum())
+        self.hits += n_hits
+        self.misses += len(keys) - n_hits
+        if not n_hits:
+            return None, hit
+        deque(map(self._rows.move_to_end, compress(keys, hit)), maxlen=0)
+        return self._gather(locations[hit]), hit
+
+    def _gather(self, locations):
+        """The rows at locations as one batch, in that order."""
+        blocks, rows = locations >> 32, locations & 0xFFFFFFFF
+        if blocks[0] == blocks[-1] and (blocks == blocks[0]).all():
+            return self._blocks[int(blocks[0])][0].take(rows)
+        order = np.argsort(blocks, kind='stable')
+        bounds = np.flatnonzero(np.diff(blocks[order])) + 1
+        parts = [self._blocks[int(blocks[group[0]])][0].take(rows[group]) for group in np.split(order, bounds)]
+        batch = parts[0] if len(parts) == 1 else BatchDesign.concatenate(parts)
+        return batch.take(np.argsort(order))
+
+    def store_points(self, keys, batch):
+        """Cache the rows of batch under keys, one key per row."""
+        if self.sweep_maxsize == 0 or not keys:
+            return
+        block = self._next_block
+        self._next_block += 1
+        self._blocks[block] = [batch, 0]
+        self._stored_rows += len(batch)
+        existing = {key for key in keys if key in self._rows}
+        for key in existing:
+            self._release(self._rows[key] >> 32)
+        before = len(self._rows) - len(existing)
+        self._rows.update(zip(keys, ((block << 32) + np.arange(len(keys))).tolist()))
+        deque(map(self._rows.move_to_end, existing), maxlen=0)
+        self._blocks[block][1] = len(self._rows) - before  # duplicate keys keep their last row
+        self._evict()
+
+    def _release(self, block):
+        entry = self._blocks[block]
+        entry[1] -= 1
+        if entry[1] == 0:
+            self._stored_rows -= len(entry[0])
+            del self._blocks[block]
+
+    def _evict(self):
+        while len(self._rows) > self.sweep_maxsize:
+            _, location = self._rows.popitem(last=False)
+            self._release(location >> 32)
+        if self._stored_rows > 2 * len(self._rows) + 1024:
+            self._compact()
+
+    def _compact(self):
+        """Copy the live rows into one block so evicted rows stop holding memory."""
+        if not self._rows:
+            self._blocks.clear()
+            self._stored_rows = 0
+            return
+        batch = self._gather(np.fromiter(self._rows.values(), np.int64, len(self._rows)))
+        block = self._next_block
+        self._next_block += 1
+        self._blocks = {block: [batch, len(batch)]}
+        self._stored_rows = len(batch)
+        for row, key in enumerate(self._rows):
+            self._rows[key] = block << 32 | row
+
+    def get(self, **params):
+        """Return the design for params, computing and caching it on a miss."""
+        design = self.lookup(params)
+        if design is None:
+            design = CurrentMeasurementDesign(**params)
+            design.design()
+            self.store(params, design)
+        return design
+
+    def resize(self, maxsize, sweep_maxsize=None):
+        """Change the eviction limits, dropping least recently used entries if needed."""
+        if maxsize < 0 or (sweep_maxsize is not None and sweep_maxsize < 0):
+            raise ValueError("maxsize must not be negative")
+        self.maxsize = maxsize
+        while len(self._designs) > maxsize:
+            self._designs.popitem(last=False)
+        if sweep_maxsize is not None:
+            self.sweep_maxsize = sweep_maxsize
+            self._evict()
+
+    def clear(self):
+        self._designs.clear()
+        self._rows.clear()
+        self._blocks.clear()
+        self._stored_rows = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._designs),
+            'maxsize': self.maxsize,
+            'points': len(self._rows),
+            'sweep_maxsize': self.sweep_maxsize,
+            'hit_rate': self.hits / requests if requests else 0.0
+        }
+
+
+def _batch_from_params(params):
+    return design_batch(**params)
+
+
+def _grid_chunk(base_params, grid, start, stop):
+    """Evaluate flat indices [start, stop) of the grid; runs in worker processes too."""
+    names = list(grid)
+    axes = [np.asarray(grid[name]) for name in names]
+    shape = tuple(len(axis) for axis in axes)
+    params = base_params.copy()
+    if names:  # an empty grid is the single base point, which design_batch evaluates as is
+        for name, axis, index in zip(names, axes, np.unravel_index(np.arange(start, stop), shape)):
+            params[name] = axis[index]
+    batch = design_batch(**params)
+    batch.offset = start
+    return batch
+
+
 class DesignSweep:
-    def __init__(self):
+    DEFAULT_CHUNK_SIZE = 16384
+    EXECUTORS = ('serial', 'process')
+
+    def __init__(self, executor='serial', max_workers=None, parallel_min_points=50000, cache=None):
+        """
+        executor (str): 'serial' evaluates in the calling process, 'process'
+            splits sweeps across a ProcessPoolExecutor and merges in order.
+        max_workers (int): Worker processes, defaults to the CPU count.
+        parallel_min_points (int): Sweeps smaller than this stay serial since
+            they finish faster than the workers can be fed.
+        cache (DesignCache): Optional point cache for the 1-D sweeps; the
+            points it misses are evaluated together in one batch.
+        """
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"executor must be one of {self.EXECUTORS}, got {executor!r}")
         self.designs = []
         self.sweep_results = {}
-    
-    def sweep_rmes(self, base_params, rmes_values):
-        results = []
-        for rmes in rmes_values:
-            params = base_params.copy()
-            params['rmes'] = rmes
-            design = CurrentMeasurementDesign(**params)
-            design.design()
-            results.append({
-                'rmes': rmes,
-                'design': design.to_dict(),
-                'ic_min1': design.ic_min1,
-                'ad1': design.channels[1]['ad_rmes'] / rmes,
-                'pin1': design.pin1,
-                'dynamic_range': design.get_total_range()[1] / design.get_total_range()[0]
+        self.executor = executor
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_min_points = parallel_min_points
+        self.cache = cache
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _use_pool(self, n_points):
+        return (self.executor == 'process' and self.max_workers > 1
+                and n_points >= self.parallel_min_points)
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def _fallback_to_serial(self, error):
+        warnings.warn(f"Process pool unavailable ({error}), falling back to serial sweeps.", RuntimeWarning,
+                      stacklevel=3)
+        self.shutdown()
+        self.executor = 'serial'
+
+    def _evaluate(self, base_params, name, values, scale=1):
+        """Evaluate base_params with `name` swept over `values` in one batch."""
+        values = np.asarray(values) * scale if scale != 1 else np.asarray(values)
+        if self.cache is None or len(values) == 0:
+            return self._evaluate_values(base_params, name, values)
+
+        keys = self.cache.point_keys(base_params, name, values)
+        cached, hit = self.cache.lookup_points(keys)
+        if cached is not None and hit.all():
+            return cached
+        missing = np.flatnonzero(~hit)
+        fresh = self._evaluate_values(base_params, name, values[missing])
+        self.cache.store_points([keys[i] for i in missing], fresh)
+        if cached is None:
+            return fresh
+        # Cached rows first, then the fresh ones; put them back in sweep order.
+        positions = np.concatenate([np.flatnonzero(hit), missing])
+        return BatchDesign.concatenate([cached, fresh]).take(np.argsort(positions))
+
+    def _evaluate_values(self, base_params, name, values):
+        if self._use_pool(len(values)):
+            chunks = []
+            for part in np.array_split(values, self.max_workers):
+                params = base_params.copy()
+                params[name] = part
+                chunks.append(params)
+            try:
+                return BatchDesign.concatenate(self._get_pool().map(_batch_from_params, chunks))
+            except (OSError, BrokenProcessPool) as e:
+                self._fallback_to_serial(e)
+
+        params = base_params.copy()
+        params[name] = values
+        return design_batch(**params)
+
+    @staticmethod
+    def grid_size(grid):
+        return int(np.prod([len(values) for values in grid.values()], dtype=np.int64))
+
+    def sweep_grid(self, base_params, grid, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Lazily evaluate the cartesian product of the values in `grid`.
+
+        grid maps parameter names to the values to sweep (in SI units, like
+        base_params); every other parameter is taken from base_params, and an
+        empty grid yields the base point alone. The grid is walked in C order,
+        the last parameter varying fastest, and one BatchDesign of at most
+        chunk_size points is yielded per step, so memory is bounded by the
+        chunk size rather than by the grid size.
+        """
+        unknown = set(grid) - set(PARAM_NAMES)
+        if unknown:
+            raise ValueError(f"Cannot sweep unknown parameters: {sorted(unknown)}")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+
+        total = self.grid_size(grid)
+        bounds = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+        next_chunk = 0
+        if self._use_pool(total):
+            try:
+                for batch in self._parallel_chunks(base_params, grid, bounds):
+                    next_chunk += 1
+                    yield batch
+                return
+            except (OSError, BrokenProcessPool) as e:
+                self._fallback_to_serial(e)
+
+        for start, stop in bounds[next_chunk:]:
+            yield _grid_chunk(base_params, grid, start, stop)
+
+    def _parallel_chunks(self, base_params, grid, bounds):
+        """Yield grid chunks from the pool in order, keeping a bounded number in flight."""
+        pool = self._get_pool()
+        pending = deque()
+        queued = 0
+        try:
+            while pending or queued < len(bounds):
+                while queued < len(bounds) and len(pending) < 2 * self.max_workers:
+                    start, stop = bounds[queued]
+                    pending.append(pool.submit(_grid_chunk, base_params, grid, start, stop))
+                    queued += 1
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def measure_scaling(self, base_params, grid, worker_counts=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Time a full grid sweep for each worker count and report the speedup and
+        parallel efficiency (speedup / workers) relative to the serial run,
+        which is always measured first.
+        """
+        worker_counts = sorted(set(worker_counts or (2, self.max_workers)) | {1})
+        total = self.grid_size(grid)
+        report = []
+        serial_time = None
+        for workers in worker_counts:
+            sweep = DesignSweep('process' if workers > 1 else 'serial', workers, parallel_min_points=0)
+            with sweep:
+                start = time.perf_counter()
+                for _ in sweep.sweep_grid(base_params, grid, chunk_size):
+                    pass
+                elapsed = time.perf_counter() - start
+            if serial_time is None:
+                serial_time = elapsed
+            speedup = serial_time / elapsed
+            report.append({
+                'workers': workers,
+                'seconds': elapsed,
+                'points_per_second': total / elapsed,
+                'speedup': speedup,
+                'efficiency': speedup / workers
             })
+        return report
+
+    def sweep_rmes(self, base_params, rmes_values):
+        batch = self._evaluate(base_params, 'rmes', rmes_values)
+        results = SweepResult('rmes', {
+            'rmes': batch.params['rmes'],
+            'ic_min1': batch.ic_min1,
+            'ad1': batch.ad1(),
+            'pin1': batch.params['pin1'],
+            'dynamic_range': batch.dynamic_range()
+        }, batch)
 
         self.sweep_results['rmes_sweep'] = results
         return results
     
     def sweep_k(self, base_params, k_values):
-        results = []
-        for k in k_values:
-            params = base_params.copy()
-            params['k'] = k
-            design = CurrentMeasurementDesign(**params)
-            design.design()
-            results.append({
-                'k': k,
-                'design': design.to_dict(),
-                'max_voltage': max(ch['von_max'] for ch in design.channels.values()),
-                'gain_range': design.channels[1]['ad_rmes'] / design.channels[design.n_channels]['ad_rmes']
-            })
+        batch = self._evaluate(base_params, 'k', k_values)
+        results = SweepResult('k', {
+            'k': batch.params['k'],
+            'max_voltage': batch.max_voltage(),
+            'gain_range': batch.gain_range()
+        }, batch)
         self.sweep_results['overlap_sweep'] = results
         return results
     
     def sweep_r(self, base_params, r_values):
-        results = []
-        for r in r_values:
-            params = base_params.copy()
-            params['r'] = r
-            design = CurrentMeasurementDesign(**params)
-            design.design()
-            min_current, max_current = design.get_total_range()
-            results.append({
-                'r': r,
-                'dynamic_range': max_current / min_current,
-                'max_gain': design.channels[1]['ad_rmes'] / params['rmes'],
-                'channel_spacing': r
-            })
-        return results
+        batch = self._evaluate(base_params, 'r', r_values)
+        return SweepResult('r', {
+            'r': batch.params['r'],
+            'dynamic_range': batch.dynamic_range(),
+            'max_gain': batch.ad1(),
+            'channel_spacing': batch.params['r']
+        }, batch)
     
     def sweep_pin1(self, base_params, pin1_values):
-        results = []
-        for pin1 in pin1_values:
-            params = base_params.copy()
-            params['pin1'] = pin1
-            design = CurrentMeasurementDesign(**params)
-            design.design()
-            results.append({
-                'pin1': pin1,
-                'ic_min1': design.ic_min1,
-                'ad1': design.channels[1]['ad_rmes'] / params['rmes'],
-                'input_precision': pin1
-            })
-        return results
+        batch = self._evaluate(base_params, 'pin1', pin1_values)
+        return SweepResult('pin1', {
+            'pin1': batch.params['pin1'],
+            'ic_min1': batch.ic_min1,
+            'ad1': batch.ad1(),
+            'input_precision': batch.params['pin1']
+        }, batch)
     
     def sweep_vos(self, base_params, vos_values):
-        results = []
-        for vos in vos_values:
-            params = base_params.copy()
-            params['vos'] = vos * 1e-6 
-            design = CurrentMeasurementDesign(**params)
-            design.design()
-            results.append({
-                'vos': vos,
-                'ic_min1': design.ic_min1,
-                'ad1': design.channels[1]['ad_rmes'] / params['rmes'],
-                'min_current': design.ic_min1
-            })
-        return results
+        batch = self._evaluate(base_params, 'vos', vos_values, scale=1e-6)
+        return SweepResult('vos', {
+            'vos': np.asarray(vos_values, dtype=float),
+            'ic_min1': batch.ic_min1,
+            'ad1': batch.ad1(),
+            'min_current': batch.ic_min1
+        }, batch)
     
     def sweep_n_channels(self, base_params, n_values):
-        results = []
-        for n in n_values:
-            params = base_params.copy()
-            params['n_channels'] = n
-            design = CurrentMeasurementDesign(**params)
-            design.design()
-            min_current, max_current = design.get_total_range()
-            results.append({
-                'n_channels': n,
-                'dynamic_range': max_current / min_current,
-                'max_voltage': max(ch['von_max'] for ch in design.channels.values()),
-                'gain_range': design.channels[1]['ad_rmes'] / design.channels[n]['ad_rmes']
-            })
-        return results
-
+        batch = self._evaluate(base_params, 'n_channels', n_values)
+        return SweepResult('n_channels', {
+            'n_channels': batch.params['n_channels'],
+            'dynamic_range': batch.dynamic_range(),
+            'max_voltage': batch.max_voltage(),
+            'gain_range': batch.gain_range()
+        }, batch)
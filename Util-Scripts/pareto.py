@@ -0,0 +1,176 @@
+import numpy as np
+
+from parameters_optimizer_v2 import BatchDesign, SweepResult, PARAM_NAMES
+
+# Objective name -> True when larger is better.
+DEFAULT_OBJECTIVES = {
+    'dynamic_range': True,
+    'max_voltage': False,
+    'gain_range': False,
+    'ic_min1': False,
+}
+
+LEAF_SIZE = 32
+BRUTE_FORCE_PAIRS = 1 << 16
+BRUTE_FORCE_FRONT = 128
+
+
+def batch_objectives(batch: BatchDesign, objectives=DEFAULT_OBJECTIVES):
+    """(n_points, n_objectives) array of the named metrics of every design in batch."""
+    metrics = {
+        'dynamic_range': batch.dynamic_range,
+        'max_voltage': batch.max_voltage,
+        'gain_range': batch.gain_range,
+        'ic_min1': lambda: batch.ic_min1,
+        'ad1': batch.ad1,
+    }
+    return np.column_stack([metrics[name]() for name in objectives])
+
+
+def _weakly_dominated_brute(front, points, dims):
+    dominated = np.zeros(len(points), dtype=bool)
+    step = max(1, BRUTE_FORCE_PAIRS // max(1, len(points)))
+    for start in range(0, len(front), step):
+        other = front[None, start:start + step][..., dims]
+        dominated |= (other <= points[:, None, dims]).all(axis=2).any(axis=1)
+    return dominated
+
+
+def _weakly_dominated(front, points, dims):
+    """
+    Mask of the rows of points that some row of front is <= to on every
+    objective in dims. Splits on the median of the first objective in dims,
+    dropping that objective wherever one side is known to be smaller, so the
+    cost grows like n log^(d-1) n instead of n * len(front).
+    """
+    if len(front) == 0 or len(points) == 0:
+        return np.zeros(len(points), dtype=bool)
+    if len(dims) == 1:
+        return front[:, dims[0]].min() <= points[:, dims[0]]
+    if len(dims) == 2:
+        a, b = dims
+        order = np.argsort(front[:, a], kind='stable')
+        best_b = np.minimum.accumulate(front[order, b])
+        count = np.searchsorted(front[order, a], points[:, a], side='right')
+        dominated = np.zeros(len(points), dtype=bool)
+        has = count > 0
+        dominated[has] = best_b[count[has] - 1] <= points[has, b]
+        return dominated
+    if len(front) <= BRUTE_FORCE_FRONT or len(front) * len(points) <= BRUTE_FORCE_PAIRS:
+        return _weakly_dominated_brute(front, points, dims)
+
+    first, rest = dims[0], dims[1:]
+    values = np.concatenate([front[:, first], points[:, first]])
+    median = np.median(values)
+    if (values > median).any():
+        front_low, points_low = front[:, first] <= median, points[:, first] <= median
+    elif (values < median).any():
+        front_low, points_low = front[:, first] < median, points[:, first] < median
+    else:
+        return _weakly_dominated(front, points, rest)
+
+    dominated = np.empty(len(points), dtype=bool)
+    dominated[points_low] = _weakly_dominated(front[front_low], points[points_low], dims)
+    high = points[~points_low]
+    high_dominated = _weakly_dominated(front[front_low], high, rest)
+    open_ = ~high_dominated
+    high_dominated[open_] = _weakly_dominated(front[~front_low], high[open_], dims)
+    dominated[~points_low] = high_dominated
+    return dominated
+
+
+def _front_mask(points):
+    """Non-dominated mask of distinct, lexicographically sorted points (Kung's method)."""
+    if points.shape[1] <= 2:
+        # Sorted by the first objective, a point survives exactly when its last
+        # objective beats every point before it.
+        best_before = np.minimum.accumulate(np.concatenate(([np.inf], points[:-1, -1])))
+        return points[:, -1] < best_before
+    if len(points) <= LEAF_SIZE:
+        le = (points[None, :, :] <= points[:, None, :]).all(axis=2)
+        return ~np.tril(le, k=-1).any(axis=1)
+    mid = len(points) // 2
+    top = _front_mask(points[:mid])
+    bottom = _front_mask(points[mid:])
+    # Every top point is <= every bottom point on the first objective.
+    open_ = np.flatnonzero(bottom)
+    dims = list(range(1, points.shape[1]))
+    bottom[open_] = ~_weakly_dominated(points[:mid][top], points[mid:][open_], dims)
+    return np.concatenate([top, bottom])
+
+
+def non_dominated(values, maximize=None):
+    """
+    Indices of the non-dominated rows of an (n_points, n_objectives) array.
+
+    maximize is a sequence of booleans, one per objective, for the columns
+    where larger is better; the rest are minimized. Distinct rows are sorted
+    lexicographically so a row can only be dominated by rows before it, then
+    the front is built by divide and conquer, which is O(n log n) for two
+    objectives and O(n log^(d-1) n) beyond. Duplicate rows share a verdict
+    and rows with NaN are dropped.
+    """
+    values = np.asarray(values, dtype=float)
+    if maximize is not None:
+        values = np.where(np.asarray(maximize, dtype=bool), -values, values)
+
+    candidates = np.flatnonzero(~np.isnan(values).any(axis=1))
+    if len(candidates) == 0:
+        return candidates
+    points, inverse = np.unique(values[candidates], axis=0, return_inverse=True)
+    keep = _front_mask(points)[inverse.reshape(-1)]
+    return candidates[keep]
+
+
+class ParetoFront:
+    """
+    Running Pareto front over a stream of BatchDesign chunks, such as the
+    output of DesignSweep.sweep_grid(), so millions of candidate designs never
+    have to be held at once.
+    """
+
+    def __init__(self, objectives=DEFAULT_OBJECTIVES):
+        self.objectives = dict(objectives)
+        self.batch = None
+        self.values = None
+        self.seen = 0
+
+    def update(self, batch: BatchDesign):
+        values = batch_objectives(batch, self.objectives)
+        self.seen += len(batch)
+        if self.batch is not None:
+            batch = BatchDesign.concatenate([self.batch, batch])
+            values = np.concatenate([self.values, values])
+        keep = non_dominated(values, list(self.objectives.values()))
+        self.batch = batch.take(keep)
+        self.values = values[keep]
+        return self
+
+    def __len__(self):
+        return 0 if self.batch is None else len(self.batch)
+
+    def result(self) -> SweepResult:
+        """The front as a SweepResult with one column per objective and design parameter."""
+        if self.batch is None:
+            raise ValueError("No designs have been added to the front")
+        columns = {name: self.values[:, i] for i, name in enumerate(self.objectives)}
+        columns.update({name: self.batch.params[name] for name in PARAM_NAMES})
+        return SweepResult('pareto', columns, self.batch)
+
+
+def pareto_front(results, objectives=DEFAULT_OBJECTIVES) -> SweepResult:
+    """
+    Non-dominated designs of a sweep: a SweepResult, a BatchDesign or an
+    iterable of BatchDesign chunks.
+    """
+    if isinstance(results, SweepResult):
+        if results.batch is None:
+            raise ValueError("Pareto extraction needs sweep results with channel data")
+        results = [results.batch]
+    elif isinstance(results, BatchDesign):
+        results = [results]
+
+    front = ParetoFront(objectives)
+    for batch in results:
+        front.update(batch)
+    return front.result()
@@ -3,16 +3,31 @@ from tkinter import ttk
 from tkinter import scrolledtext
 import serial.tools.list_ports
 from serial import Serial
-import xml.etree.ElementTree as ET
-import csv
-import threading
 import datetime
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+from acquisition import AcquisitionEngine
+from capture_file import CaptureWriter
+from log_history import BoundedLog, HistoryViewer, LogHistory
+from stream_export import WRITERS, open_writer
+from spectrum_view import SpectrumView
+from streaming_stats import DEFAULT_WINDOW, SlidingStats
+from trigger import TriggerConfig, TriggerEngine
+from waveform_view import WaveformView
+
+POLL_INTERVAL_MS = 50      # UI refresh cadence, independent of the line rate
+MAX_TEXT_PER_POLL = 20000  # characters shown per refresh; older text in a burst is skipped
+MAX_LOG_LINES = 2000       # lines kept in the log widget, the rest is in the history file
+STATS_WINDOWS = ["100", "1000", "10000", "100000"]  # samples
+UNITS = {"voltage": "V", "current": "A"}
+BAUD_RATES = ["2400", "4800", "9600", "14400", "57600", "115200", "250000"]
+PROTOCOL_BAUD = {"Text": "9600", "Binary": "115200", "Burst": "250000"}  # the firmware's BAUD_RATE per output mode
 
 class SerialMonitor:
     def __init__(self, master):
         self.master = master
         self.master.title("Serial Monitor")
-        self.master.geometry("800x600")
+        self.master.geometry("1200x900")
 
         self.create_widgets()
 
@@ -28,7 +43,7 @@ class SerialMonitor:
         self.baud_combobox_label = ttk.Label(self.master, text="Select Baud Rate:")
         self.baud_combobox_label.grid(row=0, column=1, padx=10, pady=10)
 
-        self.baud_combobox = ttk.Combobox(self.master, values=["2400","4800","9600","14400", "115200"], state="readonly")
+        self.baud_combobox = ttk.Combobox(self.master, values=BAUD_RATES, state="readonly")
         self.baud_combobox.set("9600")
         self.baud_combobox.grid(row=0, column=2, padx=10, pady=10)
 
@@ -38,92 +53,273 @@ class SerialMonitor:
         self.disconnect_button = ttk.Button(self.master, text="Disconnect", command=self.disconnect, state=tk.DISABLED)
         self.disconnect_button.grid(row=0, column=4, padx=10, pady=10)
 
-        self.export_txt_button = ttk.Button(self.master, text="Export as TXT", command=self.export_txt, state=tk.DISABLED)
-        self.export_txt_button.grid(row=0, column=5, padx=10, pady=10)
+        # Exports stream to disk while connected; each button starts and stops one format.
+        self.exporters = {}
+        self.export_buttons = {}
+        for column, fmt in enumerate(WRITERS, start=5):
+            button = ttk.Button(self.master, text=f"Export as {fmt.upper()}",
+                                command=lambda fmt=fmt: self.toggle_export(fmt), state=tk.DISABLED)
+            button.grid(row=0, column=column, padx=10, pady=10)
+            self.export_buttons[fmt] = button
 
-        self.export_csv_button = ttk.Button(self.master, text="Export as CSV", command=self.export_csv, state=tk.DISABLED)
-        self.export_csv_button.grid(row=0, column=6, padx=10, pady=10)
+        self.protocol_combobox = ttk.Combobox(self.master, values=["Text", "Binary", "Burst"], state="readonly", width=8)
+        self.protocol_combobox.set("Text")
+        self.protocol_combobox.grid(row=0, column=9, padx=10, pady=10)
+        self.protocol_combobox.bind("<<ComboboxSelected>>", lambda event: self.select_protocol())
 
-        self.export_xml_button = ttk.Button(self.master, text="Export as XML", command=self.export_xml, state=tk.DISABLED)
-        self.export_xml_button.grid(row=0, column=7, padx=10, pady=10)
+        self.history_button = ttk.Button(self.master, text="History", command=self.show_history, state=tk.DISABLED)
+        self.history_button.grid(row=0, column=10, padx=10, pady=10)
 
         self.log_text = scrolledtext.ScrolledText(self.master, wrap=tk.WORD, width=80, height=20)
-        self.log_text.grid(row=1, column=0, columnspan=8, padx=10, pady=10)
+        self.log_text.grid(row=1, column=0, columnspan=11, padx=10, pady=10)
+        self.log_view = BoundedLog(self.log_text, MAX_LOG_LINES)
+
+        self.waveform = WaveformView()
+        self.waveform_canvas = FigureCanvasTkAgg(self.waveform.figure, master=self.master)
+        self.waveform_canvas.get_tk_widget().grid(row=2, column=0, columnspan=7, padx=10, pady=10, sticky="nsew")
+        self.waveform.attach(self.waveform_canvas)
+        self.spectrum = SpectrumView()
+        self.spectrum_canvas = FigureCanvasTkAgg(self.spectrum.figure, master=self.master)
+        self.spectrum_canvas.get_tk_widget().grid(row=2, column=7, columnspan=4, padx=10, pady=10, sticky="nsew")
+        self.spectrum.attach(self.spectrum_canvas)
+        self.master.rowconfigure(2, weight=1)
+        self.create_trigger_widgets()
+        self.create_stats_widgets()
+        self.history = None
+        self.capture = None
+        self.session = None
+        self.trigger = None
+        self.frame_writer = None
+
+    def create_trigger_widgets(self):
+        """Trigger controls below the waveform; triggered frames replace the rolling view."""
+        frame = ttk.Frame(self.master)
+        frame.grid(row=3, column=0, columnspan=11, padx=10, pady=(0, 10), sticky="w")
+
+        ttk.Label(frame, text="Trigger:").pack(side=tk.LEFT)
+        self.trigger_mode = ttk.Combobox(frame, values=["Off", "Auto", "Normal", "Single"], state="readonly", width=7)
+        self.trigger_mode.set("Off")
+        self.trigger_kind = ttk.Combobox(frame, values=["Rising", "Falling", "Level", "Window"], state="readonly", width=7)
+        self.trigger_kind.set("Rising")
+        self.trigger_source = ttk.Combobox(frame, values=["Voltage", "Current"], state="readonly", width=8)
+        self.trigger_source.set("Voltage")
+        for combobox in (self.trigger_mode, self.trigger_kind, self.trigger_source):
+            combobox.pack(side=tk.LEFT, padx=5)
+            combobox.bind("<<ComboboxSelected>>", lambda event: self.apply_trigger())
+
+        self.trigger_entries = {}
+        for name, label, default in (("level", "Level", "0.0"), ("upper", "Upper", "1.0"),
+                                     ("pre_samples", "Pre", "200"), ("post_samples", "Post", "800")):
+            ttk.Label(frame, text=f"{label}:").pack(side=tk.LEFT, padx=(10, 0))
+            entry = ttk.Entry(frame, width=8)
+            entry.insert(0, default)
+            entry.pack(side=tk.LEFT)
+            entry.bind("<Return>", lambda event: self.apply_trigger())
+            self.trigger_entries[name] = entry
+
+        self.arm_button = ttk.Button(frame, text="Arm", command=self.apply_trigger)
+        self.arm_button.pack(side=tk.LEFT, padx=10)
+        self.save_frames = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="Save frames", variable=self.save_frames,
+                        command=self.apply_trigger).pack(side=tk.LEFT)
+
+    def create_stats_widgets(self):
+        """Live statistics over a sliding window of the latest samples."""
+        frame = ttk.Frame(self.master)
+        frame.grid(row=4, column=0, columnspan=11, padx=10, pady=(0, 10), sticky="w")
+
+        ttk.Label(frame, text="Stats window:").pack(side=tk.LEFT)
+        self.stats_window = ttk.Combobox(frame, values=STATS_WINDOWS, state="readonly", width=7)
+        self.stats_window.set(str(DEFAULT_WINDOW))
+        self.stats_window.pack(side=tk.LEFT, padx=5)
+        self.stats_window.bind("<<ComboboxSelected>>", lambda event: self.reset_stats())
+        # Matches the firmware's SIGNALTYPEPIN: DC shows the level, AC the RMS and swing.
+        self.stats_mode = ttk.Combobox(frame, values=["DC", "AC"], state="readonly", width=4)
+        self.stats_mode.set("DC")
+        self.stats_mode.pack(side=tk.LEFT, padx=5)
+        self.stats_mode.bind("<<ComboboxSelected>>", lambda event: self.show_stats())
+
+        self.stats_text = tk.StringVar(value="")
+        ttk.Label(frame, textvariable=self.stats_text, font=("Courier", 9)).pack(side=tk.LEFT, padx=10)
+        self.stats = SlidingStats(DEFAULT_WINDOW)
+
+    def reset_stats(self):
+        self.stats = SlidingStats(int(self.stats_window.get()))
+        self.stats_text.set("")
+
+    def show_stats(self):
+        result = self.stats.result()
+        if result is None:
+            return
+        lines = []
+        for name, values in result.items():
+            unit = UNITS.get(name, "")
+            if self.stats_mode.get() == "AC":
+                line = "{name:<8} rms {rms:.4f} {unit}  p2p {p2p:.4f}  ac rms {std:.4f}  offset {mean:+.4f}"
+            else:
+                line = "{name:<8} mean {mean:+.4f} {unit}  std {std:.4f}  min {min:+.4f}  max {max:+.4f}"
+            lines.append(line.format(name=name.capitalize(), unit=unit, **values))
+        lines.append(f"over the last {result[next(iter(result))]['count']} samples")
+        self.stats_text.set("\n".join(lines))
 
     def populate_ports(self):
         ports = [port.device for port in serial.tools.list_ports.comports()]
-        self.port_combobox = ttk.Combobox(self.master, values=ports, state="readonly")
+        # Editable so a virtual port (e.g. serial_simulator.py's pty) can be typed in.
+        self.port_combobox = ttk.Combobox(self.master, values=ports)
         self.port_combobox.grid(row=0, column=0, padx=10, pady=10)
 
+    def select_protocol(self):
+        """Switch the baud rate to the one the firmware uses for the selected output mode."""
+        self.baud_combobox.set(PROTOCOL_BAUD[self.protocol_combobox.get()])
+
     def connect(self):
         port = self.port_combobox.get()
         baud = int(self.baud_combobox.get())
+        protocol = self.protocol_combobox.get().lower()
         try:
-            self.ser = Serial(port, baud, timeout=1)
-            self.log_text.delete(1.0, tk.END)
-            self.log_text.insert(tk.END, f"Connected to {port} at {baud} baud\n")
+            self.ser = Serial(port, baud, timeout=0.05)
+            self.engine = AcquisitionEngine(self.ser, protocol)
+            if self.history is not None:
+                self.history.close()
+            session = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+            self.session = session
+            self.history = LogHistory(f"serial_log_{session}.log")
+            self.capture = CaptureWriter(f"serial_capture_{session}.cap")
+            self.engine.add_sink(self.history)
+            self.engine.add_sink(self.capture)
+            self.log_view.clear()
+            self.waveform.clear()
+            self.spectrum.clear()
+            self.reset_stats()
+            self.log(f"Connected to {port} at {baud} baud ({protocol})\n")
+            self.log(f"Recording to {self.capture.path}\n")
+            self.history_button["state"] = tk.NORMAL
             self.disconnect_button["state"] = tk.NORMAL
             self.connect_button["state"] = tk.DISABLED
-            self.export_txt_button["state"] = tk.NORMAL
-            self.export_csv_button["state"] = tk.NORMAL
-            self.export_xml_button["state"] = tk.NORMAL
+            for button in self.export_buttons.values():
+                button["state"] = tk.NORMAL
 
             self.connection_active = True
+            self.apply_trigger()
 
-            self.thread = threading.Thread(target=self.read_from_port)
-            self.thread.start()
+            self.engine.start()
+            self.master.after(POLL_INTERVAL_MS, self.poll)
         except Exception as e:
-            self.log_text.insert(tk.END, f"Error: {str(e)}\n")
+            self.log(f"Error: {str(e)}\n")
 
     def disconnect(self):
-        self.connection_active = False  # Set the flag to False to stop the reading thread
+        self.connection_active = False  # Set the flag to False to stop the polling loop
+        if hasattr(self, 'engine'):
+            self.engine.stop()
         if hasattr(self, 'ser') and self.ser.is_open:
             self.ser.close()
         self.connect_button["state"] = tk.NORMAL
         self.disconnect_button["state"] = tk.DISABLED
-        self.export_txt_button["state"] = tk.DISABLED
-        self.export_csv_button["state"] = tk.DISABLED
-        self.export_xml_button["state"] = tk.DISABLED
-        self.log_text.insert(tk.END, "Disconnected\n")
-
-    def read_from_port(self):
-        while self.connection_active: 
-            try:
-                line = self.ser.readline().decode("utf-8")
-                if line:
-                    self.log_text.insert(tk.END, line)
-                    self.log_text.see(tk.END)
-            except Exception as e:
-                if self.connection_active:  # Only log errors if the connection is still active
-                    self.log_text.insert(tk.END, f"Error reading from port: {str(e)}\n")
-                break
-
-    def export_txt(self):
-        data = self.log_text.get(1.0, tk.END)
-        filename = f"serial_log_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.txt"
-        with open(filename, "w") as file:
-            file.write(data)
-        self.log_text.insert(tk.END, f"Log exported as TXT: {filename}\n")
-
-    def export_csv(self):
-        data = self.log_text.get(1.0, tk.END)
-        filename = f"serial_log_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
-        with open(filename, "w", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerows([line.split() for line in data.splitlines()])
-        self.log_text.insert(tk.END, f"Log exported as CSV: {filename}\n")
-
-    def export_xml(self):
-        data = self.log_text.get(1.0, tk.END)
-        filename = f"serial_log_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.xml"
-        root = ET.Element("LogData")
-        lines = data.splitlines()
-        for line in lines:
-            entry = ET.SubElement(root, "Entry")
-            ET.SubElement(entry, "Data").text = line
-        tree = ET.ElementTree(root)
-        tree.write(filename)
-        self.log_text.insert(tk.END, f"Log exported as XML: {filename}\n")
+        for fmt in list(self.exporters):
+            self.toggle_export(fmt)
+        self.stop_trigger()
+        for button in self.export_buttons.values():
+            button["state"] = tk.DISABLED
+        if self.capture is not None:
+            self.capture.close()
+            self.log(f"Capture saved: {self.capture.path} ({self.capture.count} samples)\n")
+            self.capture = None
+        self.log("Disconnected\n")
+        if hasattr(self, 'engine') and hasattr(self.engine.decoder, 'stats'):
+            stats = self.engine.decoder.stats()
+            self.log(", ".join(f"{name.replace('_', ' ')}: {value}" for name, value in stats.items()) + "\n")
+
+    def poll(self):
+        """Drain the acquisition engine in one batch; runs on the Tk thread."""
+        if not self.connection_active:
+            return
+        samples, text, missed = self.engine.drain(MAX_TEXT_PER_POLL)
+        if text:
+            self.log_view.append(text)
+        self.waveform.append(samples)
+        if len(samples):
+            self.stats.update(samples)
+            self.show_stats()
+        if self.trigger is not None:
+            frames = self.trigger.pop_frames()
+            if frames:
+                self.waveform.show_frame(frames[-1])
+        self.waveform.refresh()
+        self.spectrum.append(samples, gap=bool(missed))
+        self.spectrum.refresh()
+        if missed:
+            self.log(f"Display fell behind, {missed} samples skipped\n")
+        if self.engine.error is not None:
+            self.log(f"Error reading from port: {str(self.engine.error)}\n")
+            self.disconnect()
+            return
+        self.master.after(POLL_INTERVAL_MS, self.poll)
+
+    def stop_trigger(self):
+        if self.trigger is not None:
+            self.engine.remove_sink(self.trigger)
+            self.trigger = None
+        self.close_frame_writer()
+
+    def close_frame_writer(self):
+        if self.frame_writer is not None:
+            self.frame_writer.close()
+            self.log(f"Trigger frames saved: {self.frame_writer.path} ({self.frame_writer.samples} samples)\n")
+            self.frame_writer = None
+
+    def apply_trigger(self):
+        """(Re)arm the trigger from the controls, or return to the rolling view when it is off."""
+        mode = self.trigger_mode.get().lower()
+        if mode == "off" or not self.connection_active:
+            self.stop_trigger()
+            self.waveform.show_live()
+            return
+        try:
+            values = {name: entry.get() for name, entry in self.trigger_entries.items()}
+            config = TriggerConfig(kind=self.trigger_kind.get().lower(), source=self.trigger_source.get().lower(),
+                                   mode=mode, level=float(values["level"]), upper=float(values["upper"]),
+                                   pre_samples=int(values["pre_samples"]), post_samples=int(values["post_samples"]))
+        except ValueError as e:
+            self.log(f"Trigger not armed: {str(e)}\n")
+            return
+        if self.trigger is not None:
+            self.engine.remove_sink(self.trigger)
+        # The frame file stays open across re-arms for the rest of the session.
+        if not self.save_frames.get():
+            self.close_frame_writer()
+        elif self.frame_writer is None:
+            self.frame_writer = open_writer('npy', f"serial_frames_{self.session}.npy")
+            self.log(f"Saving trigger frames to {self.frame_writer.path}\n")
+        self.trigger = TriggerEngine(config)
+        if self.frame_writer is not None:
+            self.trigger.add_sink(self.frame_writer)
+        self.engine.add_sink(self.trigger)
+
+    def log(self, message):
+        """Status message to the log view and, once connected, the history file."""
+        self.log_view.append(message)
+        if self.history is not None:
+            self.history.append(message)
+
+    def show_history(self):
+        if self.history is not None:
+            HistoryViewer(self.master, self.history)
+
+    def toggle_export(self, fmt):
+        """Start streaming every decoded chunk to a new fmt file, or finish the running one."""
+        writer = self.exporters.pop(fmt, None)
+        button = self.export_buttons[fmt]
+        if writer is None:
+            writer = open_writer(fmt)
+            self.exporters[fmt] = writer
+            self.engine.add_sink(writer)
+            button["text"] = f"Stop {fmt.upper()}"
+            self.log(f"Exporting {fmt.upper()} to {writer.path}\n")
+        else:
+            self.engine.remove_sink(writer)
+            writer.close()
+            button["text"] = f"Export as {fmt.upper()}"
+            self.log(f"Log exported as {fmt.upper()}: {', '.join(writer.paths)} ({writer.samples} samples)\n")
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,449 @@
+import re
+import time
+from itertools import chain
+from typing import Tuple
+
+import numpy as np
+
+# Constants mirrored from arduino_as_an_oscilloscope.ino
+MAX_VOLTAGE = 5.0
+MAX_MAPPING_VALUE = 1024.0
+RSHUNT = 1.0
+CHANNEL_GAINS = (920.0, 115.0, 14.40, 1.8)
+RANGE_MAX_VOLTAGE = 2.3   # amplified shunt voltage window autoSetRange() aims for
+RANGE_MIN_VOLTAGE = 0.23
+HYSTERESIS_MAX_VOLTAGE = 4.5  # band a reading may leave before predictive ranging switches
+HYSTERESIS_MIN_VOLTAGE = 0.2
+
+# Binary frame: sync word, sequence, channel, three little-endian 10-bit ADC
+# codes (A1, A0, A4) and a CRC-8 over everything after the sync word.
+SYNC = b'\xa5\x5a'
+FRAME_SIZE = 11
+PAYLOAD = slice(2, 10)
+FLAG_OUT_OF_RANGE = 0x80
+CHANNEL_MASK = 0x0F
+MAX_LINE = 4096  # longest partial line carried over before it is treated as garbage
+
+# Burst: sync word, burst sequence, sample count, mean sample period in us
+# (u16 LE), then one u32 LE word per sample holding the raw A1, A0 and A4
+# codes (10 bits each) and the channel in the top two bits, and a CRC-8 over
+# everything after the sync word.
+BURST_SYNC = b'\xa5\x5b'
+BURST_HEADER_SIZE = 6
+BURST_SIZE = 64  # samples per burst sent by the firmware
+CODE_MASK = 0x3FF
+
+SAMPLE_DTYPE = np.dtype([
+    ('timestamp', 'f8'),  # host receive time (s)
+    ('sequence', 'i4'),   # frame sequence number, -1 for text lines
+    ('channel', 'i1'),    # active gain channel, -1 when unknown
+    ('flags', 'u1'),      # FLAG_OUT_OF_RANGE when autoranging found no channel
+    ('voltage', 'f8'),    # V
+    ('current', 'f8'),    # A
+])
+
+# One reading line; the separators never match a newline, so a match cannot span lines.
+TEXT_LINE = re.compile(rb'Voltage[ \t]*=[ \t]*(\S+)[ \t]+Current\[A\][ \t]*=[ \t]*(\S+)')
+
+
+def _crc8_table(poly=0x07):
+    table = np.zeros(256, dtype=np.uint8)
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[byte] = crc
+    return table
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(data) -> int:
+    """CRC-8 (polynomial 0x07, initial value 0), as computed by the firmware."""
+    crc = 0
+    for byte in bytes(data):
+        crc = int(CRC8_TABLE[crc ^ byte])
+    return crc
+
+
+_crc8_positions = CRC8_TABLE[None, :]
+
+
+def _crc8_position_table(length):
+    """Row p: CRC-8 of each byte value followed by p zero bytes."""
+    global _crc8_positions
+    while len(_crc8_positions) < length:
+        grown = np.empty((2 * len(_crc8_positions), 256), dtype=np.uint8)
+        grown[:len(_crc8_positions)] = _crc8_positions
+        for p in range(len(_crc8_positions), len(grown)):
+            grown[p] = CRC8_TABLE[grown[p - 1]]
+        _crc8_positions = grown
+    return _crc8_positions
+
+
+def crc8_rows(rows: np.ndarray) -> np.ndarray:
+    """
+    CRC-8 of every row of a (n, k) uint8 array. Many short rows (frames) take
+    one pass per column; few long rows (bursts) use the CRC's linearity and
+    XOR together a per-position table lookup of every byte.
+    """
+    n, k = rows.shape
+    if k > n:
+        table = _crc8_position_table(k)
+        return np.bitwise_xor.reduce(table[np.arange(k - 1, -1, -1), rows], axis=1)
+    crc = np.zeros(n, dtype=np.uint8)
+    for column in range(k):
+        crc = CRC8_TABLE[crc ^ rows[:, column]]
+    return crc
+
+
+def scale_voltage(codes):
+    """ADC codes to volts, like scaleVoltage() in the firmware."""
+    return np.asarray(codes, dtype=float) * MAX_VOLTAGE / MAX_MAPPING_VALUE
+
+
+def scale_current(codes, channels):
+    """Amplified shunt ADC codes to amps using the gain of each sample's channel."""
+    gains = np.asarray(CHANNEL_GAINS)[np.asarray(channels) & CHANNEL_MASK]
+    return scale_voltage(codes) / (gains * RSHUNT)
+
+
+def encode_frames(sequence, channel, v_plus, v_minus, current_code, flags=0) -> bytes:
+    """Binary frames for arrays of readings, the inverse of BinaryFrameDecoder."""
+    sequence, channel, v_plus, v_minus, current_code, flags = np.broadcast_arrays(
+        sequence, channel, v_plus, v_minus, current_code, flags)
+    frames = np.empty((sequence.size, FRAME_SIZE), dtype=np.uint8)
+    frames[:, 0], frames[:, 1] = SYNC
+    frames[:, 2] = np.ravel(sequence) & 0xFF
+    frames[:, 3] = (np.ravel(channel) & CHANNEL_MASK) | np.where(np.ravel(flags), FLAG_OUT_OF_RANGE, 0)
+    for offset, codes in ((4, v_plus), (6, v_minus), (8, current_code)):
+        codes = np.ravel(codes).astype(np.uint16)
+        frames[:, offset] = codes & 0xFF
+        frames[:, offset + 1] = codes >> 8
+    frames[:, 10] = crc8_rows(frames[:, PAYLOAD])
+    return frames.tobytes()
+
+
+def pack_burst_words(channel, v_plus, v_minus, current_code) -> np.ndarray:
+    channel, v_plus, v_minus, current_code = (np.asarray(a, dtype=np.uint32) for a in
+                                              np.broadcast_arrays(channel, v_plus, v_minus, current_code))
+    return ((v_plus & CODE_MASK) | ((v_minus & CODE_MASK) << 10) | ((current_code & CODE_MASK) << 20) |
+            ((channel & 0x03) << 30))
+
+
+def unpack_burst_words(words):
+    """(channel, v_plus, v_minus, current_code) arrays from burst sample words."""
+    words = np.asarray(words, dtype=np.uint32)
+    return ((words >> 30).astype(np.int8), (words & CODE_MASK).astype(np.int32),
+            ((words >> 10) & CODE_MASK).astype(np.int32), ((words >> 20) & CODE_MASK).astype(np.int32))
+
+
+def encode_bursts(words, sequence=0, period_us=0, burst_size=BURST_SIZE) -> bytes:
+    """Bursts of burst_size sample words (the last one possibly shorter), the inverse of BurstDecoder."""
+    words = np.asarray(words, dtype='<u4')
+    bursts = []
+    full = len(words) // burst_size * burst_size
+    for block in (words[:full].reshape(-1, burst_size), words[full:].reshape(1, -1)):
+        if block.size == 0:
+            continue
+        n = len(block)
+        rows = np.empty((n, BURST_HEADER_SIZE + 4 * block.shape[1] + 1), dtype=np.uint8)
+        rows[:, 0], rows[:, 1] = BURST_SYNC
+        rows[:, 2] = (sequence + len(bursts) + np.arange(n)) & 0xFF
+        rows[:, 3] = block.shape[1]
+        rows[:, 4], rows[:, 5] = period_us & 0xFF, (period_us >> 8) & 0xFF
+        rows[:, BURST_HEADER_SIZE:-1] = block.view(np.uint8).reshape(n, -1)
+        rows[:, -1] = crc8_rows(rows[:, 2:-1])
+        bursts.extend(rows)
+    return b''.join(row.tobytes() for row in bursts)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return float('nan')
+
+
+def parse_text_block(block: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Voltage and current arrays of every reading line in a block of complete
+    lines. All lines are matched in one regex pass over the block and the
+    captured fields go straight into a float array with np.fromiter, with no
+    per-line Python code. Lines with a value that is not a finite number
+    (Arduino prints "nan", "inf" and "ovf") are dropped, whichever way the
+    block was parsed.
+    """
+    matches = TEXT_LINE.findall(block)
+    if not matches:
+        return np.empty(0), np.empty(0)
+    try:
+        values = np.fromiter(map(float, chain.from_iterable(matches)), float, 2 * len(matches)).reshape(-1, 2)
+    except ValueError:
+        values = np.array([[_to_float(v) for v in row] for row in matches])
+    finite = np.isfinite(values).all(axis=1)
+    if not finite.all():
+        values = values[finite]
+    return values[:, 0], values[:, 1]
+
+
+TEXT_FORMAT = " Serial  <<  Voltage = %.4f       Current[A] = %.4f\n"
+
+
+def format_samples(samples) -> str:
+    """Samples as text in the firmware's own output format, formatted in one % operation."""
+    values = np.column_stack([samples['voltage'], samples['current']]).ravel().tolist()
+    return (TEXT_FORMAT * len(samples)) % tuple(values)
+
+
+class TextLineDecoder:
+    """
+    Decoder for the firmware's text output. A partial trailing line is kept
+    until the next chunk completes it; every complete line is passed on to
+    the log and the ones holding a reading become samples, parsed a whole
+    chunk at a time by parse_text_block().
+    """
+    name = 'text'
+
+    def __init__(self):
+        self._pending = b''
+        self.lines = 0
+
+    def feed(self, data: bytes, timestamp=None) -> Tuple[np.ndarray, str]:
+        timestamp = time.time() if timestamp is None else timestamp
+        data = self._pending + data
+        end = data.rfind(b'\n') + 1
+        self._pending = data[end:][-MAX_LINE:]
+        block = data[:end]
+
+        self.lines += block.count(b'\n')
+        voltage, current = parse_text_block(block)
+
+        samples = np.zeros(len(voltage), dtype=SAMPLE_DTYPE)
+        samples['timestamp'] = timestamp
+        samples['sequence'] = -1
+        samples['channel'] = -1
+        samples['voltage'] = voltage
+        samples['current'] = current
+        return samples, block.decode('utf-8', errors='replace')
+
+
+class BinaryFrameDecoder:
+    """
+    Decoder for the firmware's binary framing mode.
+
+    Sync words are located with one vectorized search, CRCs of all candidate
+    frames are checked together, and a trailing partial frame is carried over
+    to the next chunk. Bytes that belong to no valid frame are dropped and
+    counted, as are CRC failures and gaps in the sequence numbers. A frame
+    that passes its CRC but names a channel the firmware does not have is
+    dropped and counted as a channel error, so its sample shows up as lost.
+    """
+    name = 'binary'
+
+    def __init__(self):
+        self._pending = b''
+        self.frames = 0
+        self.crc_errors = 0
+        self.channel_errors = 0
+        self.dropped_bytes = 0
+        self.lost_frames = 0
+        self._last_sequence = None
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'crc_errors': self.crc_errors,
+            'channel_errors': self.channel_errors,
+            'dropped_bytes': self.dropped_bytes,
+            'lost_frames': self.lost_frames,
+        }
+
+    def _frame_starts(self, buffer):
+        """Start offsets of complete frames with a valid CRC, without overlaps."""
+        candidates = np.flatnonzero((buffer[:-1] == SYNC[0]) & (buffer[1:] == SYNC[1]))
+        candidates = candidates[candidates + FRAME_SIZE <= len(buffer)]
+        if len(candidates) == 0:
+            return candidates
+
+        frames = buffer[candidates[:, None] + np.arange(FRAME_SIZE)]
+        valid = crc8_rows(frames[:, PAYLOAD]) == frames[:, 10]
+        starts = candidates[valid]
+
+        if len(starts) > 1 and (np.diff(starts) < FRAME_SIZE).any():
+            # A sync word inside a payload happened to pass the CRC; keep the
+            # first frame of every overlapping run.
+            kept = []
+            next_free = 0
+            for start in starts.tolist():
+                if start >= next_free:
+                    kept.append(start)
+                    next_free = start + FRAME_SIZE
+            starts = np.array(kept, dtype=candidates.dtype)
+
+        covered = np.zeros(len(buffer), dtype=bool)
+        if len(starts):
+            covered[(starts[:, None] + np.arange(FRAME_SIZE)).ravel()] = True
+        self.crc_errors += int((~valid & ~covered[candidates]).sum())
+        return starts
+
+    def feed(self, data: bytes, timestamp=None) -> Tuple[np.ndarray, str]:
+        timestamp = time.time() if timestamp is None else timestamp
+        buffer = np.frombuffer(self._pending + data, dtype=np.uint8)
+        starts = self._frame_starts(buffer)
+
+        # Keep a possibly incomplete frame at the end for the next chunk.
+        consumed = int(starts[-1]) + FRAME_SIZE if len(starts) else 0
+        keep_from = max(consumed, len(buffer) - FRAME_SIZE + 1, 0)
+        self.dropped_bytes += keep_from - len(starts) * FRAME_SIZE
+        self._pending = buffer[keep_from:].tobytes()
+
+        frames = buffer[starts[:, None] + np.arange(FRAME_SIZE)]
+        samples = self._decode(frames, timestamp)
+        return samples, format_samples(samples)
+
+    def _decode(self, frames, timestamp):
+        valid = (frames[:, 3] & CHANNEL_MASK) < len(CHANNEL_GAINS)
+        if not valid.all():
+            self.channel_errors += int((~valid).sum())
+            frames = frames[valid]
+        samples = np.zeros(len(frames), dtype=SAMPLE_DTYPE)
+        if len(frames) == 0:
+            return samples
+        words = frames[:, 4:10].astype(np.int32)
+        v_plus = words[:, 0] | (words[:, 1] << 8)
+        v_minus = words[:, 2] | (words[:, 3] << 8)
+        current_code = words[:, 4] | (words[:, 5] << 8)
+        channel = frames[:, 3] & CHANNEL_MASK
+        sequence = frames[:, 2].astype(np.int32)
+
+        samples['timestamp'] = timestamp
+        samples['sequence'] = sequence
+        samples['channel'] = channel
+        samples['flags'] = frames[:, 3] & FLAG_OUT_OF_RANGE
+        samples['voltage'] = scale_voltage(v_plus - v_minus)
+        samples['current'] = scale_current(current_code, channel)
+
+        if self._last_sequence is not None:
+            sequence = np.concatenate(([self._last_sequence], sequence))
+        self.lost_frames += int(((np.diff(sequence) - 1) % 256).sum())
+        self._last_sequence = int(sequence[-1])
+        self.frames += len(frames)
+        return samples
+
+
+class BurstDecoder:
+    """
+    Decoder for the firmware's raw-ADC burst mode.
+
+    The board sends unscaled codes, so all the scaling happens here with the
+    firmware's own constants. Bursts have a variable length given in their
+    header; candidates are checked a group of equal lengths at a time and an
+    incomplete burst is carried over to the next chunk. The board does not
+    send its out-of-range flag; it is set here for current codes outside the
+    hysteresis band the firmware's predictive ranging keeps readings in.
+    """
+    name = 'burst'
+
+    def __init__(self):
+        self._pending = b''
+        self.bursts = 0
+        self.frames = 0
+        self.crc_errors = 0
+        self.dropped_bytes = 0
+        self.lost_bursts = 0
+        self.sample_period = None  # s, as measured by the board
+        self._last_sequence = None
+
+    def stats(self):
+        return {
+            'bursts': self.bursts,
+            'frames': self.frames,
+            'crc_errors': self.crc_errors,
+            'dropped_bytes': self.dropped_bytes,
+            'lost_bursts': self.lost_bursts,
+            'sample_period': self.sample_period,
+        }
+
+    def _burst_starts(self, buffer):
+        """Start offsets and sizes of complete valid bursts, and the first incomplete candidate."""
+        candidates = np.flatnonzero((buffer[:-1] == BURST_SYNC[0]) & (buffer[1:] == BURST_SYNC[1]))
+        has_header = candidates + BURST_HEADER_SIZE <= len(buffer)
+        sizes = np.full(len(candidates), len(buffer) + 1)
+        sizes[has_header] = BURST_HEADER_SIZE + 4 * buffer[candidates[has_header] + 3].astype(int) + 1
+        complete = candidates + sizes <= len(buffer)
+
+        valid = np.zeros(len(candidates), dtype=bool)
+        for size in np.unique(sizes[complete]):
+            group = np.flatnonzero(complete & (sizes == size))
+            rows = buffer[candidates[group, None] + np.arange(size)]
+            valid[group] = crc8_rows(rows[:, 2:-1]) == rows[:, -1]
+
+        starts, lengths = [], []
+        next_free = 0
+        for start, size in zip(candidates[valid].tolist(), sizes[valid].tolist()):
+            if start >= next_free:
+                starts.append(start)
+                lengths.append(size)
+                next_free = start + size
+        covered = np.zeros(len(buffer), dtype=bool)
+        for start, size in zip(starts, lengths):
+            covered[start:start + size] = True
+        self.crc_errors += int((complete & ~valid & ~covered[candidates]).sum())
+        incomplete = candidates[~complete & (candidates >= next_free)]
+        return starts, lengths, next_free, int(incomplete[0]) if len(incomplete) else None
+
+    def feed(self, data: bytes, timestamp=None) -> Tuple[np.ndarray, str]:
+        timestamp = time.time() if timestamp is None else timestamp
+        buffer = np.frombuffer(self._pending + data, dtype=np.uint8)
+        starts, lengths, consumed, incomplete = self._burst_starts(buffer)
+
+        # Keep an incomplete burst, or a last byte that may begin a sync word.
+        keep_from = incomplete if incomplete is not None else max(consumed, len(buffer) - 1, 0)
+        self.dropped_bytes += keep_from - sum(lengths)
+        self._pending = buffer[keep_from:].tobytes()
+
+        samples = self._decode(buffer, starts, lengths, timestamp)
+        return samples, format_samples(samples)
+
+    def _decode(self, buffer, starts, lengths, timestamp):
+        if not starts:
+            return np.zeros(0, dtype=SAMPLE_DTYPE)
+        words = np.concatenate([buffer[s + BURST_HEADER_SIZE:s + n - 1].view('<u4') for s, n in zip(starts, lengths)])
+        channel, v_plus, v_minus, current_code = unpack_burst_words(words)
+
+        samples = np.zeros(len(words), dtype=SAMPLE_DTYPE)
+        samples['timestamp'] = timestamp
+        samples['sequence'] = self.frames + np.arange(len(words))
+        samples['channel'] = channel
+        code_volts = scale_voltage(current_code)
+        out_of_range = (code_volts < HYSTERESIS_MIN_VOLTAGE) | (code_volts > HYSTERESIS_MAX_VOLTAGE)
+        samples['flags'] = np.where(out_of_range, FLAG_OUT_OF_RANGE, 0)
+        samples['voltage'] = scale_voltage(v_plus - v_minus)
+        samples['current'] = scale_current(current_code, channel)
+
+        sequence = np.array([buffer[s + 2] for s in starts], dtype=np.int32)
+        if self._last_sequence is not None:
+            sequence = np.concatenate(([self._last_sequence], sequence))
+        self.lost_bursts += int(((np.diff(sequence) - 1) % 256).sum())
+        self._last_sequence = int(sequence[-1])
+        last = starts[-1]
+        self.sample_period = (int(buffer[last + 4]) | int(buffer[last + 5]) << 8) * 1e-6
+        self.bursts += len(starts)
+        self.frames += len(words)
+        return samples
+
+
+DECODERS = {
+    TextLineDecoder.name: TextLineDecoder,
+    BinaryFrameDecoder.name: BinaryFrameDecoder,
+    BurstDecoder.name: BurstDecoder,
+}
+
+
+def make_decoder(protocol='text'):
+    try:
+        return DECODERS[protocol]()
+    except KeyError:
+        raise ValueError(f"Unknown protocol {protocol!r}, expected one of {sorted(DECODERS)}")
@@ -0,0 +1,238 @@
+"""
+Virtual Arduino for running the serial tools without hardware.
+
+FirmwareSimulator produces the byte stream of arduino_as_an_oscilloscope.ino,
+in its text, binary or burst output format, for a synthetic input signal, and
+serves it on a Linux pty so SerialMonitor, AcquisitionEngine or
+MultiPortReader can open it like a real port. Current readings go through a
+model of the firmware's autoranging (autorange_model.py), so step waveforms make the board switch
+gain channels (and report out-of-range readings) the way the hardware does.
+Noise is added to the ADC codes and dropped or corrupted bytes can be
+injected into the stream.
+
+    python serial_simulator.py --protocol binary --rate 5000 --waveform steps
+
+generate() returns the same bytes without a pty, for benchmarks and tests;
+test_serial_simulator.py stress tests the acquisition engine against it.
+"""
+import argparse
+import os
+import select
+import sys
+import threading
+import time
+
+import numpy as np
+
+from autorange_model import RANGINGS, adc_codes, channel_codes
+from serial_protocol import (BURST_SIZE, TEXT_FORMAT, encode_bursts, encode_frames, pack_burst_words,
+                             scale_current, scale_voltage)
+
+PROTOCOLS = ('text', 'binary', 'burst')
+WAVEFORMS = ('dc', 'sine', 'steps')
+STEP_CURRENTS = (1e-3, 1e-2, 0.1, 1.0)  # A; one step per gain channel
+WRITE_INTERVAL = 0.01  # s between writes to the pty
+MAX_BURST = 0.25       # s of samples generated at once after the reader stalled
+
+
+class FirmwareSimulator:
+    """
+    Synthetic board: signal model, firmware ranging and output formatting.
+
+    The signal is a voltage (V, differential between A1 and A0) and a shunt
+    current (A). 'dc' holds both at the given values, 'sine' swings the
+    voltage through +-voltage and the current between 0 and current at
+    frequency, and 'steps' cycles the current through STEP_CURRENTS, one
+    step per gain channel, changing every 1 / frequency seconds. ranging
+    is 'predictive' (the firmware's PREDICTIVE_RANGING default) or 'scan'.
+    """
+
+    def __init__(self, protocol='text', rate=1000.0, waveform='sine', voltage=2.0, current=0.01,
+                 frequency=5.0, noise=0.0, drop_rate=0.0, corrupt_rate=0.0, seed=None, ranging='predictive'):
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unknown protocol {protocol!r}, expected one of {PROTOCOLS}")
+        if waveform not in WAVEFORMS:
+            raise ValueError(f"Unknown waveform {waveform!r}, expected one of {WAVEFORMS}")
+        self.protocol = protocol
+        self.rate = float(rate)
+        self.waveform = waveform
+        self.voltage = voltage
+        self.current = current
+        self.frequency = frequency
+        self.noise = noise
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self.rng = np.random.default_rng(seed)
+
+        self.samples = 0          # readings generated
+        self.bytes_written = 0
+        self.bytes_dropped = 0
+        self.bytes_corrupted = 0
+        self.ranging = RANGINGS[ranging]()
+        self._burst = np.empty(0, dtype=np.uint32)  # burst mode readings not sent yet
+        self._burst_sequence = 0
+
+        self.master = self.slave = None
+        self._thread = None
+        self._running = False
+
+    def signal(self, t):
+        """True voltage and current at times t."""
+        t = np.asarray(t, dtype=float)
+        if self.waveform == 'dc':
+            return np.full(t.shape, self.voltage), np.full(t.shape, self.current)
+        if self.waveform == 'sine':
+            phase = np.sin(2 * np.pi * self.frequency * t)
+            return self.voltage * phase, self.current * (1 + phase) / 2
+        step = (t * self.frequency).astype(np.int64) % len(STEP_CURRENTS)
+        return self.voltage * (step + 1) / len(STEP_CURRENTS), np.asarray(STEP_CURRENTS)[step]
+
+    def generate(self, n) -> bytes:
+        """The firmware output for the next n readings, with errors injected."""
+        n = int(n)
+        if n <= 0:
+            return b''
+        t = (self.samples + np.arange(n)) / self.rate
+        voltage, current = self.signal(t)
+        v_plus = adc_codes(np.maximum(voltage, 0), self.noise, self.rng)
+        v_minus = adc_codes(np.maximum(-voltage, 0), self.noise, self.rng)
+        codes = channel_codes(current, self.noise, self.rng)
+        mux, gain_channel, ok, _ = self.ranging.step(codes)
+        current_code = codes[mux, np.arange(n)]
+
+        if self.protocol == 'binary':
+            data = encode_frames(self.samples + np.arange(n), mux, v_plus, v_minus, current_code, ~ok)
+        elif self.protocol == 'burst':
+            # Readings leave the board BURST_SIZE at a time.
+            words = np.concatenate([self._burst, pack_burst_words(mux, v_plus, v_minus, current_code)])
+            full = len(words) // BURST_SIZE * BURST_SIZE
+            data = encode_bursts(words[:full], self._burst_sequence, min(round(1e6 / self.rate), 0xFFFF))
+            self._burst, self._burst_sequence = words[full:], self._burst_sequence + full // BURST_SIZE
+        else:
+            values = np.column_stack([scale_voltage(v_plus - v_minus), scale_current(current_code, gain_channel)])
+            data = ((TEXT_FORMAT.replace('\n', '\r\n') * n) % tuple(values.ravel().tolist())).encode()
+        self.samples += n
+        return self._inject_errors(data)
+
+    def _inject_errors(self, data):
+        if not (self.drop_rate or self.corrupt_rate):
+            return data
+        buffer = np.frombuffer(data, dtype=np.uint8).copy()
+        if self.corrupt_rate:
+            corrupt = np.flatnonzero(self.rng.random(len(buffer)) < self.corrupt_rate)
+            buffer[corrupt] ^= (1 << self.rng.integers(0, 8, len(corrupt))).astype(np.uint8)
+            self.bytes_corrupted += len(corrupt)
+        if self.drop_rate:
+            keep = self.rng.random(len(buffer)) >= self.drop_rate
+            self.bytes_dropped += int((~keep).sum())
+            buffer = buffer[keep]
+        return buffer.tobytes()
+
+    def open(self) -> str:
+        """Create the pty and return the device path to connect to."""
+        import pty
+        import tty
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        return self.port
+
+    @property
+    def port(self):
+        return os.ttyname(self.slave) if self.slave is not None else None
+
+    def start(self):
+        """Stream readings to the pty at the configured rate on a background thread."""
+        if self.master is None:
+            self.open()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                os.close(fd)
+        self.master = self.slave = None
+
+    def _run(self):
+        # Like the firmware blocking in Serial.write(), a stalled reader slows
+        # the board down: readings that fall more than MAX_BURST behind are
+        # never taken rather than sent late.
+        start = time.perf_counter()
+        due_total = 0
+        while self._running:
+            due = int((time.perf_counter() - start) * self.rate) - due_total
+            due_total += due
+            self._write(self.generate(min(due, max(1, int(self.rate * MAX_BURST)))))
+            time.sleep(WRITE_INTERVAL)
+
+    def _write(self, data):
+        # Finish the chunk after stop() too, unless the reader has stopped draining the pty.
+        view = memoryview(data)
+        while view:
+            _, writable, _ = select.select([], [self.master], [], 0.1)
+            if not writable and not self._running:
+                break
+            if writable:
+                try:
+                    written = os.write(self.master, view)
+                except BlockingIOError:
+                    continue
+                view = view[written:]
+                self.bytes_written += written
+
+    def stats(self):
+        return {
+            'samples': self.samples,
+            'bytes_written': self.bytes_written,
+            'bytes_dropped': self.bytes_dropped,
+            'bytes_corrupted': self.bytes_corrupted,
+            'channel_changes': self.ranging.channel_changes,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate the oscilloscope firmware on a pty.")
+    parser.add_argument('--protocol', choices=PROTOCOLS, default='text')
+    parser.add_argument('--rate', type=float, default=1000.0, help="readings per second")
+    parser.add_argument('--waveform', choices=WAVEFORMS, default='sine')
+    parser.add_argument('--voltage', type=float, default=2.0, help="V")
+    parser.add_argument('--current', type=float, default=0.01, help="A")
+    parser.add_argument('--frequency', type=float, default=5.0, help="Hz")
+    parser.add_argument('--noise', type=float, default=0.0, help="ADC noise, LSB rms")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="probability of dropping each byte")
+    parser.add_argument('--corrupt-rate', type=float, default=0.0, help="probability of flipping a bit in each byte")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--ranging', choices=sorted(RANGINGS), default='predictive',
+                        help="firmware ranging strategy (PREDICTIVE_RANGING)")
+    parser.add_argument('--seconds', type=float, help="stop after this long (default: run until interrupted)")
+    args = parser.parse_args(argv)
+
+    simulator = FirmwareSimulator(args.protocol, args.rate, args.waveform, args.voltage, args.current,
+                                  args.frequency, args.noise, args.drop_rate, args.corrupt_rate, args.seed,
+                                  args.ranging)
+    print(f"Simulated board on {simulator.start()} ({args.protocol}, {args.rate:g} readings/s)")
+    try:
+        if args.seconds:
+            time.sleep(args.seconds)
+        else:
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    simulator.close()
+    print(simulator.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import time
+from collections import deque
+
+import numpy as np
+import matplotlib.pyplot as plt
+from numpy.lib.stride_tricks import sliding_window_view
+
+SEGMENT_SIZE = 512     # samples per FFT segment
+OVERLAP = 0.5          # fraction of a segment shared with the next one
+SEGMENTS = 8           # segments averaged, the latest (SEGMENTS - 1) * hop + SEGMENT_SIZE samples
+MIN_REDRAW = 0.25      # s between spectrum redraws
+POWER_FLOOR = 1e-20    # keeps log scales finite for empty bins
+
+
+class SpectrumAnalyzer:
+    """
+    Welch power spectral density of the latest samples, updated as chunks
+    arrive.
+
+    New samples are cut into Hann-windowed, mean-removed segments at every
+    hop; only segments completed by the new chunk go through rfft, and the
+    power spectra of the last `segments` of them are kept. result() averages
+    those and scales them to a one-sided PSD using the sample rate estimated
+    from the host timestamps the segments span. Segments on either side of a
+    gap are still averaged, but the rate is taken over each contiguous run
+    of segments so the lost samples' time is never counted. The result is
+    cached until a new segment completes, so redraws without new data cost
+    nothing.
+    """
+
+    def __init__(self, segment_size=SEGMENT_SIZE, overlap=OVERLAP, segments=SEGMENTS, fields=('voltage', 'current')):
+        self.segment_size = int(segment_size)
+        self.hop = max(1, int(round(self.segment_size * (1 - overlap))))
+        self.fields = tuple(fields)
+        self.window = np.hanning(self.segment_size + 1)[:-1]  # periodic Hann
+        self._window_power = float((self.window ** 2).sum())
+        self._spectra = deque(maxlen=segments)  # (fields, bins) |rfft|^2 per segment
+        self._spans = deque(maxlen=segments)    # (run, first, last timestamp) per segment
+        self._run = 0                           # bumped at every gap
+        self._tail = None
+        self._result = None
+        self.version = 0  # counts completed segments, to tell when result() changed
+
+    def clear(self):
+        self._spectra.clear()
+        self._spans.clear()
+        self._tail = None
+        self._result = None
+
+    def update(self, samples, gap=False):
+        """Add a chunk; gap=True when samples were lost before it, so no segment spans the hole."""
+        if gap:
+            self._tail = None
+            self._run += 1
+        if len(samples) == 0:
+            return
+        buffer = samples if self._tail is None else np.concatenate([self._tail, samples])
+        n_segments = (len(buffer) - self.segment_size) // self.hop + 1
+        if n_segments <= 0:
+            self._tail = buffer
+            return
+        # Only the segments that can still be averaged are transformed.
+        first = max(0, n_segments - self._spectra.maxlen)
+        starts = np.arange(first, n_segments) * self.hop
+        values = np.stack([sliding_window_view(np.asarray(buffer[name], dtype=float), self.segment_size)[starts]
+                           for name in self.fields], axis=1)
+        values -= values.mean(axis=2, keepdims=True)
+        power = np.abs(np.fft.rfft(values * self.window, axis=2)) ** 2
+        timestamps = buffer['timestamp']
+        for segment, start in zip(power, starts):
+            self._spectra.append(segment)
+            self._spans.append((self._run, timestamps[start], timestamps[start + self.segment_size - 1]))
+        self._tail = buffer[n_segments * self.hop:]
+        self._result = None
+        self.version += len(starts)
+
+    def sample_rate(self):
+        """Samples per second over the segments held, from their host timestamps, runs split at gaps."""
+        if not self._spans:
+            return None
+        runs = {}  # run: [first, last, segments]
+        for run, first, last in self._spans:
+            if run in runs:
+                runs[run][1:] = last, runs[run][2] + 1
+            else:
+                runs[run] = [first, last, 1]
+        intervals = sum((n - 1) * self.hop + self.segment_size - 1 for _, _, n in runs.values())
+        duration = sum(last - first for first, last, _ in runs.values())
+        return intervals / duration if duration > 0 else None
+
+    def result(self):
+        """(frequencies, {field: psd}, sample_rate), or None until a segment with a usable time span is in."""
+        if self._result is None and self._spectra:
+            rate = self.sample_rate()
+            if rate is None:
+                return None
+            psd = np.mean(self._spectra, axis=0) / (rate * self._window_power)
+            psd[:, 1:-1] *= 2  # one-sided
+            frequencies = np.fft.rfftfreq(self.segment_size, 1.0 / rate)
+            self._result = frequencies, dict(zip(self.fields, psd)), rate
+        return self._result
+
+
+class SpectrumView:
+    """
+    Voltage and current spectra for the serial monitor, one axis each, in
+    dB re 1 unit^2/Hz. The plot is only redrawn when the analyzer has
+    completed a segment since the last redraw, and at most every
+    MIN_REDRAW seconds.
+    """
+
+    def __init__(self, figure=None, analyzer=None):
+        self.figure = figure or plt.Figure(figsize=(5, 4))
+        self.analyzer = analyzer or SpectrumAnalyzer()
+        self.canvas = None
+        self.draw_time = 0.0
+        self._drawn_version = -1
+        self._last_draw = 0.0
+
+        self.axes = dict(zip(self.analyzer.fields, self.figure.subplots(len(self.analyzer.fields), 1, sharex=True)))
+        self.lines = {}
+        self.readouts = {}
+        for name, ax in self.axes.items():
+            self.readouts[name] = ax.text(0.99, 0.95, '', transform=ax.transAxes, ha='right', va='top', fontsize=8)
+            ax.set_ylabel(f'{name.capitalize()} [dB/Hz]')
+            ax.grid(True, alpha=0.3)
+            self.lines[name], = ax.plot([], [], 'b-' if name == 'voltage' else 'r-', lw=1)
+        ax.set_xlabel('Frequency [Hz]')
+        self.figure.tight_layout()
+
+    def attach(self, canvas):
+        self.canvas = canvas
+
+    def append(self, samples, gap=False):
+        self.analyzer.update(samples, gap)
+
+    def clear(self):
+        self.analyzer.clear()
+        self._drawn_version = -1
+        for line in self.lines.values():
+            line.set_data([], [])
+        for readout in self.readouts.values():
+            readout.set_text('')
+        if self.canvas is not None:
+            self.canvas.draw_idle()
+
+    def refresh(self, force=False):
+        if self.canvas is None or self.analyzer.version == self._drawn_version:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_draw < MIN_REDRAW:
+            return
+        result = self.analyzer.result()
+        if result is None:
+            return
+        frequencies, psd, rate = result
+        for name, line in self.lines.items():
+            db = 10 * np.log10(np.maximum(psd[name], POWER_FLOOR))
+            line.set_data(frequencies, db)
+            ax = self.axes[name]
+            ax.set_xlim(0, frequencies[-1])
+            finite = db[1:] if len(db) > 1 else db
+            ax.set_ylim(finite.min() - 5, finite.max() + 5)
+            peak = frequencies[1 + np.argmax(psd[name][1:])] if len(frequencies) > 1 else 0.0
+            self.readouts[name].set_text(f'peak {peak:.4g} Hz  (fs {rate:.4g} Hz)')
+        self.canvas.draw()
+        self._drawn_version = self.analyzer.version
+        self._last_draw = now
+        self.draw_time = time.perf_counter() - now
@@ -0,0 +1,178 @@
+import abc
+import os
+import threading
+import time
+
+import numpy as np
+
+from serial_protocol import SAMPLE_DTYPE
+
+FLUSH_INTERVAL = 1.0            # seconds between flushes of buffered output
+MAX_FILE_BYTES = 256 * 1024 ** 2  # rotate to a new file beyond this size
+BUFFER_SIZE = 1 << 16
+
+
+class StreamWriter(abc.ABC):
+    """
+    Base class for exporters that append decoded chunks to a file as they
+    arrive, as AcquisitionEngine sinks. Output is buffered and flushed every
+    flush_interval seconds, and once a file passes max_bytes it is finalized
+    and writing continues in name_001.ext, name_002.ext and so on.
+    """
+    extension = ''
+    mode = 'w'
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, max_bytes=MAX_FILE_BYTES):
+        self.base, ext = os.path.splitext(path)
+        self.extension = ext or self.extension
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.paths = []
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._open()
+
+    @property
+    def path(self):
+        return self.paths[-1]
+
+    def _open(self):
+        index = len(self.paths)
+        path = self.base + (f'_{index:03d}' if index else '') + self.extension
+        kwargs = {} if 'b' in self.mode else {'newline': '', 'encoding': 'utf-8'}
+        self._file = open(path, self.mode, buffering=BUFFER_SIZE, **kwargs)
+        self.paths.append(path)
+        self._last_flush = time.monotonic()
+        self._size = 0
+        self._start()
+
+    def _finish_file(self):
+        self._finish()
+        self._file.close()
+        self._file = None
+
+    def _start(self):
+        """Write the file header."""
+
+    def _finish(self):
+        """Write the file footer."""
+
+    @abc.abstractmethod
+    def _write(self, samples, text):
+        """Write one chunk, returning the number of characters or bytes written."""
+
+    def write(self, samples, text=''):
+        with self._lock:
+            if self._file is None:
+                return
+            self._size += self._write(samples, text)
+            self.samples += len(samples)
+            if self._size >= self.max_bytes:
+                self._finish_file()
+                self._open()
+            elif time.monotonic() - self._last_flush >= self.flush_interval:
+                self._file.flush()
+                self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._finish_file()
+
+
+class TxtWriter(StreamWriter):
+    """The raw log text, as the firmware sent it."""
+    extension = '.txt'
+
+    def _write(self, samples, text):
+        return self._file.write(text)
+
+
+class CsvWriter(StreamWriter):
+    """One row per decoded sample."""
+    extension = '.csv'
+    FORMATS = {'timestamp': '%.6f', 'sequence': '%d', 'channel': '%d', 'flags': '%d',
+               'voltage': '%.6g', 'current': '%.6g'}
+
+    def _start(self):
+        self._file.write(','.join(SAMPLE_DTYPE.names) + '\n')
+
+    def _write(self, samples, text):
+        if len(samples) == 0:
+            return 0
+        columns = np.column_stack([samples[name].astype(float) for name in SAMPLE_DTYPE.names])
+        fmt = ','.join(self.FORMATS[name] for name in SAMPLE_DTYPE.names) + '\n'
+        return self._file.write(''.join(fmt % tuple(row) for row in columns.tolist()))
+
+
+class XmlWriter(StreamWriter):
+    """
+    Incrementally written XML: the root element is opened with the file and
+    closed when it is finalized, so no tree is ever built in memory.
+    """
+    extension = '.xml'
+
+    def _start(self):
+        self._file.write('<?xml version="1.0" encoding="utf-8"?>\n<LogData>\n')
+
+    def _finish(self):
+        self._file.write('</LogData>\n')
+
+    def _write(self, samples, text):
+        return self._file.write(''.join(
+            f'<Sample timestamp="{t:.6f}" channel="{c}" voltage="{v:.6g}" current="{i:.6g}"/>\n'
+            for t, c, v, i in zip(samples['timestamp'].tolist(), samples['channel'].tolist(),
+                                  samples['voltage'].tolist(), samples['current'].tolist())))
+
+
+class NpyWriter(StreamWriter):
+    """
+    A .npy file of SAMPLE_DTYPE records that np.load() or np.load(mmap_mode='r')
+    can open. The header is written with room to spare and rewritten with the
+    final record count when the file is finalized.
+    """
+    extension = '.npy'
+    mode = 'w+b'
+    MAGIC = b'\x93NUMPY\x01\x00'
+
+    def _header(self, count):
+        return repr({'descr': np.lib.format.dtype_to_descr(SAMPLE_DTYPE),
+                     'fortran_order': False, 'shape': (count,)})
+
+    def _start(self):
+        # Reserve space for the largest count a file can hold.
+        longest = len(self._header(10 ** 19))
+        self._header_size = -(-(len(self.MAGIC) + 2 + longest + 1) // 64) * 64
+        self._records = 0
+        self._write_header()
+
+    def _write_header(self):
+        header = self._header(self._records)
+        header = header.ljust(self._header_size - len(self.MAGIC) - 2 - 1) + '\n'
+        self._file.seek(0)
+        self._file.write(self.MAGIC + len(header).to_bytes(2, 'little') + header.encode('latin1'))
+        self._file.seek(0, os.SEEK_END)
+
+    def _finish(self):
+        self._write_header()
+
+    def _write(self, samples, text):
+        self._records += len(samples)
+        return self._file.write(np.ascontiguousarray(samples, dtype=SAMPLE_DTYPE).tobytes())
+
+
+WRITERS = {
+    'txt': TxtWriter,
+    'csv': CsvWriter,
+    'xml': XmlWriter,
+    'npy': NpyWriter,
+}
+
+
+def open_writer(fmt, path=None, **kwargs):
+    """A StreamWriter for fmt ('txt', 'csv', 'xml' or 'npy'), named after the current time by default."""
+    cls = WRITERS[fmt]
+    if path is None:
+        path = f"serial_log_{time.strftime('%Y%m%d%H%M%S')}{cls.extension}"
+    return cls(path, **kwargs)
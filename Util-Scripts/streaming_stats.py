@@ -0,0 +1,136 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+DEFAULT_WINDOW = 1000   # samples
+MAX_BLOCKS = 256        # small chunks are merged so a window holds about this many blocks at most
+SPLIT_BLOCK = 4096      # large chunks are split into blocks of at most max(this, 2 * window / MAX_BLOCKS)
+
+
+class _Block:
+    """Raw values of one chunk (fields x samples) and their per-field summary."""
+    __slots__ = ('values', 'count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, values, summary=None):
+        self.values = values
+        self.count = values.shape[-1]
+        if summary is None:
+            summary = _summarise(values)
+        self.mean, self.m2, self.min, self.max = summary
+
+
+def _summarise(values):
+    """Mean, M2, min and max along the last axis."""
+    mean = values.mean(axis=-1)
+    m2 = ((values - mean[..., None]) ** 2).sum(axis=-1)
+    return mean, m2, values.min(axis=-1), values.max(axis=-1)
+
+
+def _split(values, size):
+    """Blocks of at most `size` samples covering values, the full-size ones summarised in one pass."""
+    n = values.shape[1]
+    full = n // size * size
+    blocks = []
+    if full:
+        pieces = values[:, :full].reshape(len(values), -1, size)
+        summary = _summarise(pieces)
+        blocks.extend(_Block(pieces[:, i], [column[:, i] for column in summary])
+                      for i in range(pieces.shape[1]))
+    if full < n:
+        blocks.append(_Block(values[:, full:]))
+    return blocks
+
+
+class SlidingStats:
+    """
+    Mean, RMS, min/max, peak-to-peak and standard deviation of the last
+    `window` samples of each field, updated a chunk at a time.
+
+    The window is a queue of blocks of at most max_block samples, each
+    summarised once (count, mean, Welford's M2, min, max) with vectorized
+    operations; a large chunk is split into several. Old blocks are dropped
+    whole and only the oldest block is trimmed and re-summarised when the
+    window cuts through it, so an update costs O(chunk + max_block) however
+    large the window is and whatever size the earlier chunks had. result()
+    merges the block summaries with Chan's parallel form of Welford's
+    update, in O(blocks), and is cached until new samples arrive. std and rms are population
+    values (ddof=0), so for an AC signal std is the RMS of its AC part and
+    mean its DC offset.
+
+    Can be added to an AcquisitionEngine as a sink or fed from the UI.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, fields=('voltage', 'current')):
+        self.window = int(window)
+        self.fields = tuple(fields)
+        self.min_block = max(1, self.window // MAX_BLOCKS)
+        self.max_block = max(SPLIT_BLOCK, 2 * self.min_block)
+        self._blocks = deque()
+        self._count = 0
+        self._result = None
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self._count = 0
+            self._result = None
+
+    def write(self, samples, text=''):
+        self.update(samples)
+
+    def update(self, samples):
+        if len(samples) == 0:
+            return
+        samples = samples[-self.window:]
+        values = np.vstack([np.asarray(samples[name], dtype=float) for name in self.fields])
+        with self._lock:
+            last = self._blocks[-1] if self._blocks else None
+            if last is not None and last.count < self.min_block and values.shape[1] < self.max_block:
+                # Coalesce small chunks (e.g. text lines) to keep the block count bounded.
+                self._blocks.pop()
+                self._count -= last.count
+                values = np.hstack([last.values, values])
+            self._blocks.extend(_split(values, self.max_block))
+            self._count += values.shape[1]
+
+            while self._count - self._blocks[0].count >= self.window:
+                self._count -= self._blocks.popleft().count
+            excess = self._count - self.window
+            if excess > 0:
+                oldest = self._blocks.popleft()
+                self._blocks.appendleft(_Block(oldest.values[:, excess:]))
+                self._count -= excess
+            self._result = None
+
+    def _merge(self):
+        counts = np.array([block.count for block in self._blocks], dtype=float)
+        means = np.array([block.mean for block in self._blocks])
+        m2 = np.array([block.m2 for block in self._blocks])
+        total = counts.sum()
+        mean = (counts[:, None] * means).sum(axis=0) / total
+        # Chan et al.: M2 = sum(M2_i) + sum(n_i * (mean_i - mean)^2)
+        m2 = m2.sum(axis=0) + (counts[:, None] * (means - mean) ** 2).sum(axis=0)
+        variance = m2 / total
+        low = np.min([block.min for block in self._blocks], axis=0)
+        high = np.max([block.max for block in self._blocks], axis=0)
+        return {
+            name: {
+                'count': int(total),
+                'mean': float(mean[i]),
+                'rms': float(np.sqrt(mean[i] ** 2 + variance[i])),
+                'min': float(low[i]),
+                'max': float(high[i]),
+                'p2p': float(high[i] - low[i]),
+                'std': float(np.sqrt(variance[i])),
+            }
+            for i, name in enumerate(self.fields)
+        }
+
+    def result(self):
+        """{field: {stat: value}} over the current window, or None before any samples."""
+        with self._lock:
+            if self._result is None and self._blocks:
+                self._result = self._merge()
+            return self._result
@@ -0,0 +1,182 @@
+import time
+
+import numpy as np
+import pytest
+
+from acquisition import MAX_SPREAD, AcquisitionEngine, SampleRing
+from serial_protocol import SAMPLE_DTYPE, encode_frames
+
+
+def numbered(start, stop):
+    """Samples whose sequence field is their absolute position."""
+    samples = np.zeros(stop - start, dtype=SAMPLE_DTYPE)
+    samples['sequence'] = np.arange(start, stop)
+    return samples
+
+
+class FakePort:
+    def __init__(self, chunks=(), error=None):
+        self.chunks = list(chunks)
+        self.error = error
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size):
+        if self.chunks:
+            return self.chunks.pop(0)
+        if self.error is not None:
+            raise self.error
+        time.sleep(0.001)
+        return b''
+
+
+@pytest.mark.parametrize('chunk', [1, 7, 100, 250, 1000])
+def test_ring_wraparound_keeps_the_newest_samples(chunk):
+    ring = SampleRing(100)
+    for start in range(0, 1234, chunk):
+        ring.write(numbered(start, min(start + chunk, 1234)))
+    assert ring.total == 1234 and len(ring) == 100 and ring.oldest == 1134
+    assert ring.latest(100)['sequence'].tolist() == list(range(1134, 1234))
+    assert ring.latest(30)['sequence'].tolist() == list(range(1204, 1234))
+    assert ring.latest(500)['sequence'].tolist() == list(range(1134, 1234))
+
+
+def test_ring_before_it_fills():
+    ring = SampleRing(100)
+    assert len(ring.latest(10)) == 0 and ring.read_since(0)[1:] == (0, 0)
+    ring.write(numbered(0, 40))
+    assert len(ring) == 40 and ring.oldest == 0
+    assert ring.latest(100)['sequence'].tolist() == list(range(40))
+
+
+def test_read_since_follows_a_cursor_across_the_wrap():
+    ring = SampleRing(64)
+    cursor, seen = 0, []
+    for start in range(0, 1000, 37):
+        ring.write(numbered(start, start + 37))
+        samples, cursor, missed = ring.read_since(cursor)
+        assert missed == 0
+        seen.extend(samples['sequence'].tolist())
+    assert seen == list(range(1036)) and cursor == ring.total
+
+
+@pytest.mark.parametrize('written', [65, 200, 1000])
+def test_read_since_counts_overwritten_samples_as_missed(written):
+    ring = SampleRing(64)
+    ring.write(numbered(0, 10))
+    _, cursor, _ = ring.read_since(0)
+    for start in range(10, 10 + written, 50):
+        ring.write(numbered(start, min(start + 50, 10 + written)))
+    samples, cursor, missed = ring.read_since(cursor)
+    assert missed == written - 64
+    assert samples['sequence'].tolist() == list(range(10 + written - 64, 10 + written))
+    assert cursor == 10 + written
+
+
+def test_chunk_larger_than_the_ring():
+    ring = SampleRing(64)
+    ring.write(numbered(0, 10))
+    ring.write(numbered(10, 300))
+    assert ring.total == 300
+    assert ring.latest(64)['sequence'].tolist() == list(range(236, 300))
+    samples, _, missed = ring.read_since(0)
+    assert missed == 236 and samples['sequence'][0] == 236
+
+
+@pytest.mark.parametrize('written', [50, 100, 130, 1234])
+def test_latest_from_finds_the_first_sample_at_or_after_a_value(written):
+    ring = SampleRing(100)
+    for start in range(0, written, 30):
+        chunk = numbered(start, min(start + 30, written))
+        chunk['timestamp'] = chunk['sequence'] // 2  # runs of equal timestamps
+        ring.write(chunk)
+    held = ring.latest(ring.capacity)
+    for value in np.arange(-1, written // 2 + 2, 0.5):
+        expected = held[np.searchsorted(held['timestamp'], value):]
+        np.testing.assert_array_equal(ring.latest_from('timestamp', value), expected)
+
+
+def frames(start, n):
+    return encode_frames(np.arange(start, start + n), 1, 600, 100, 300)
+
+
+def test_timestamps_are_spread_back_to_the_previous_chunk():
+    engine = AcquisitionEngine(FakePort(), 'binary')
+    first = engine.process(frames(0, 4), timestamp=10.0)
+    # Nothing to spread back to: the first chunk shares its receive time.
+    assert first['timestamp'].tolist() == [10.0] * 4
+    second = engine.process(frames(4, 4), timestamp=10.2)
+    np.testing.assert_allclose(second['timestamp'], [10.05, 10.1, 10.15, 10.2])
+    # A gap longer than max_spread is a pause in the stream, not slow samples.
+    third = engine.process(frames(8, 2), timestamp=10.2 + MAX_SPREAD + 0.1)
+    assert (third['timestamp'] == 10.2 + MAX_SPREAD + 0.1).all()
+
+
+@pytest.mark.parametrize('max_spread, spread', [(0.05, False), (0.5, True)])
+def test_max_spread_is_configurable(max_spread, spread):
+    engine = AcquisitionEngine(FakePort(), 'binary', max_spread=max_spread)
+    engine.process(frames(0, 2), timestamp=1.0)
+    samples = engine.process(frames(2, 2), timestamp=1.1)
+    assert samples['timestamp'].tolist() == ([1.05, 1.1] if spread else [1.1, 1.1])
+
+
+def test_clock_going_backwards_is_not_spread():
+    engine = AcquisitionEngine(FakePort(), 'binary')
+    engine.process(frames(0, 2), timestamp=5.0)
+    assert engine.process(frames(2, 2), timestamp=4.9)['timestamp'].tolist() == [4.9, 4.9]
+
+
+def test_drain_reports_overflow_between_drains():
+    engine = AcquisitionEngine(FakePort(), 'binary', capacity=100)
+    engine.process(frames(0, 30), timestamp=1.0)
+    samples, _, missed = engine.drain()
+    assert len(samples) == 30 and missed == 0
+    for start in range(30, 280, 50):
+        engine.process(frames(start, 50), timestamp=1.0 + start * 1e-3)
+    samples, _, missed = engine.drain()
+    assert missed == 150 and samples['sequence'].tolist() == [i & 0xFF for i in range(180, 280)]
+    assert engine.decoder.lost_frames == 0  # the decoder saw everything; only the UI fell behind
+
+
+def test_drain_trims_text_at_a_line_boundary():
+    engine = AcquisitionEngine(FakePort(), 'text')
+    lines = [f" Serial  <<  Voltage = {i}.0000       Current[A] = 0.0100\n".encode() for i in range(10)]
+    engine.process(b''.join(lines), timestamp=1.0)
+    samples, text, _ = engine.drain(max_text=3 * len(lines[0]) - 1)
+    assert len(samples) == 10
+    assert text == ''.join(line.decode() for line in lines[8:])
+    assert engine.drain()[1] == ''
+
+
+def test_sinks_get_every_chunk():
+    class Sink:
+        def __init__(self):
+            self.chunks = []
+
+        def write(self, samples, text):
+            self.chunks.append(samples['sequence'].tolist())
+
+    engine = AcquisitionEngine(FakePort(), 'binary')
+    sink = Sink()
+    engine.add_sink(sink)
+    engine.process(frames(0, 3), timestamp=1.0)
+    engine.process(frames(3, 2), timestamp=1.1)
+    engine.remove_sink(sink)
+    engine.process(frames(5, 2), timestamp=1.2)
+    assert sink.chunks == [[0, 1, 2], [3, 4]]
+
+
+def test_reader_thread_reads_until_the_port_fails():
+    port = FakePort([frames(0, 100)[i:i + 64] for i in range(0, 1100, 64)], error=OSError("unplugged"))
+    engine = AcquisitionEngine(port, 'binary')
+    engine.start()
+    deadline = time.time() + 2
+    while engine.running and time.time() < deadline:
+        time.sleep(0.01)
+    engine.stop()
+    assert not engine.running and str(engine.error) == "unplugged"
+    assert engine.bytes_read == 1100
+    samples, _, _ = engine.drain()
+    assert samples['sequence'].tolist() == list(range(100))
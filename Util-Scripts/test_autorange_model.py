@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from autorange_model import PredictiveRanging, channel_codes, comparison_signals, model_autorange
+from serial_protocol import CHANNEL_GAINS
+
+N_SAMPLES = 200_000
+MAX_PREDICTIVE_PROBES = len(CHANNEL_GAINS) - 1
+# Signals that never jump a decade between readings, so a range change never starts from a saturated or zero code.
+SMOOTH = ('dc', 'sine', 'boundary', 'sweep', 'walk')
+
+
+@pytest.fixture(scope='module')
+def summaries():
+    return {
+        name: {ranging: model_autorange(current, noise=0.5, seed=0, ranging=ranging).summary()
+               for ranging in ('scan', 'predictive')}
+        for name, current in comparison_signals(N_SAMPLES).items()
+    }
+
+
+@pytest.mark.parametrize('signal', ['dc', 'sine', 'steps', 'boundary', 'sweep', 'walk'])
+def test_predictive_needs_fewer_probes(summaries, signal):
+    scan, predictive = summaries[signal]['scan'], summaries[signal]['predictive']
+    assert predictive['probes_per_sample'] < scan['probes_per_sample']
+    assert predictive['max_probes'] <= min(scan['max_probes'], MAX_PREDICTIVE_PROBES)
+
+
+@pytest.mark.parametrize('signal', SMOOTH)
+def test_predictive_changes_range_in_one_probe(summaries, signal):
+    assert summaries[signal]['predictive']['max_probes'] <= 1
+
+
+@pytest.mark.parametrize('start', range(len(CHANNEL_GAINS)))
+def test_predictive_probe_bound_over_full_range(start):
+    # Every current from far below channel 0's range to far above channel 3's, from each starting channel.
+    codes = channel_codes(np.logspace(-6, 1, 20001))
+    probes = [PredictiveRanging(start)._set_range(codes[:, i])[1] for i in range(codes.shape[1])]
+    assert max(probes) <= MAX_PREDICTIVE_PROBES
@@ -0,0 +1,137 @@
+import os
+
+import numpy as np
+import pytest
+
+from capture_file import CAPTURE_DTYPE, Capture, CaptureWriter, as_samples
+from serial_protocol import SAMPLE_DTYPE
+
+STRIDE = 64
+
+
+def stream(n, seed=0):
+    """Samples with non-decreasing timestamps, including runs of equal ones as in spread-less chunks."""
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(n, dtype=SAMPLE_DTYPE)
+    samples['timestamp'] = 1000.0 + np.cumsum(rng.choice([0.0, 1e-3, 2e-3], n))
+    samples['channel'] = rng.integers(0, 4, n)
+    samples['voltage'] = rng.uniform(-5, 5, n)
+    samples['current'] = rng.uniform(0, 0.2, n)
+    return samples
+
+
+@pytest.fixture
+def capture(tmp_path):
+    """A 5000-sample capture written in uneven chunks; (Capture, samples written)."""
+    samples = stream(5000)
+    path = str(tmp_path / "session.cap")
+    writer = CaptureWriter(path, index_stride=STRIDE)
+    cuts = [0, 1, 63, 64, 65, 200, 1000, 1001, 4000, 5000]
+    for start, stop in zip(cuts[:-1], cuts[1:]):
+        writer.write(samples[start:stop])
+    writer.write(samples[:0])
+    writer.close()
+    assert writer.count == len(samples)
+    return Capture(path), samples
+
+
+def test_records_round_trip_through_a_memmap(capture):
+    capture, samples = capture
+    assert len(capture) == len(samples) and isinstance(capture.records, np.memmap)
+    for name in CAPTURE_DTYPE.names:
+        np.testing.assert_array_equal(capture.records[name], samples[name])
+    assert (capture.start_time, capture.end_time) == (samples['timestamp'][0], samples['timestamp'][-1])
+
+
+def test_sparse_index_holds_every_stride_th_timestamp(capture):
+    capture, samples = capture
+    on_disk = np.fromfile(capture.path + '.idx', dtype='<f8')
+    np.testing.assert_array_equal(on_disk, samples['timestamp'][::STRIDE])
+    np.testing.assert_array_equal(capture.index, on_disk)
+
+
+def test_locate_matches_a_full_search(capture):
+    capture, samples = capture
+    timestamps = samples['timestamp']
+    probes = np.concatenate([timestamps[::37], timestamps[::STRIDE], timestamps[STRIDE - 1::STRIDE],
+                             timestamps[::53] + 5e-4, [timestamps[0] - 1, timestamps[-1], timestamps[-1] + 1]])
+    for t in probes:
+        assert capture.locate(t) == np.searchsorted(timestamps, t, side='left'), t
+
+
+@pytest.mark.parametrize('start, stop', [(None, None), (1001.0, 1002.5), (None, 1000.5), (1003.0, None),
+                                         (0.0, 1.0), (1002.0, 1001.0)])
+def test_window_is_a_view_of_the_matching_records(capture, start, stop):
+    capture, samples = capture
+    t = samples['timestamp']
+    mask = np.ones(len(t), dtype=bool)
+    if start is not None:
+        mask &= t >= start
+    if stop is not None:
+        mask &= t < stop
+    window = capture.window(start, stop)
+    np.testing.assert_array_equal(window['timestamp'], t[mask])
+    if len(window):
+        assert np.shares_memory(window, capture.records)
+
+
+def test_chunks_and_replay(capture):
+    capture, samples = capture
+    sizes = [len(chunk) for chunk in capture.chunks(size=1500)]
+    assert sizes == [1500, 1500, 1500, 500]
+
+    class Sink:
+        def __init__(self):
+            self.chunks = []
+
+        def write(self, samples, text):
+            self.chunks.append(samples)
+
+    sink = Sink()
+    capture.replay(sink, size=700, start=1002.0)
+    replayed = np.concatenate(sink.chunks)
+    expected = as_samples(capture.window(1002.0))
+    assert replayed.dtype == SAMPLE_DTYPE and (replayed['sequence'] == -1).all()
+    np.testing.assert_array_equal(replayed, expected)
+
+
+@pytest.mark.parametrize('damage', ['missing', 'truncated'])
+def test_damaged_index_is_rebuilt(capture, damage):
+    capture, samples = capture
+    index_path = capture.path + '.idx'
+    if damage == 'missing':
+        os.remove(index_path)
+    else:
+        with open(index_path, 'r+b') as f:
+            f.truncate(8 * 10)
+    reopened = Capture(capture.path)
+    np.testing.assert_array_equal(reopened.index, samples['timestamp'][::STRIDE])
+    assert reopened.locate(samples['timestamp'][3000]) == np.searchsorted(samples['timestamp'],
+                                                                          samples['timestamp'][3000])
+
+
+def test_capture_still_being_written(tmp_path):
+    path = str(tmp_path / "live.cap")
+    samples = stream(300)
+    writer = CaptureWriter(path, index_stride=STRIDE, flush_interval=0.0)
+    writer.write(samples)
+    capture = Capture(path)
+    np.testing.assert_array_equal(capture.timestamps, samples['timestamp'])
+    writer.close()
+    writer.write(samples)  # ignored once closed
+    assert len(Capture(path)) == 300
+
+
+def test_empty_capture(tmp_path):
+    path = str(tmp_path / "empty.cap")
+    CaptureWriter(path).close()
+    capture = Capture(path)
+    assert len(capture) == 0 and len(capture.window(0, 1)) == 0 and np.isnan(capture.start_time)
+    assert list(capture.chunks()) == []
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "not_a_capture.cap"
+    path.write_bytes(b'\0' * 256)
+    with pytest.raises(ValueError):
+        Capture(str(path))
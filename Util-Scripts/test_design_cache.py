@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from parameters_optimizer_v2 import BATCH_ARRAYS, PARAM_NAMES, DesignCache, DesignSweep
+
+BASE_PARAMS = {
+    'vos': 50e-6,
+    'pin1': 0.2,
+    'rmes': 0.1,
+    'delta_ic1': 2.5e-3,
+    'kp': 0.0048828,
+    'von_min': 0.024414,
+    'k': 0.8,
+    'r': 10.0,
+    'n_channels': 4
+}
+
+
+def assert_same_rows(batch, expected):
+    """Equal designs row by row; channel columns past every row's n_channels may differ in width."""
+    assert len(batch) == len(expected)
+    for name in PARAM_NAMES:
+        np.testing.assert_array_equal(batch.params[name], expected.params[name])
+    for name in BATCH_ARRAYS:
+        actual, wanted = getattr(batch, name), getattr(expected, name)
+        if actual.ndim == 2:
+            width = min(actual.shape[1], wanted.shape[1])
+            assert np.isnan(actual[:, width:]).all() and np.isnan(wanted[:, width:]).all()
+            actual, wanted = actual[:, :width], wanted[:, :width]
+        np.testing.assert_array_equal(actual, wanted)
+
+
+@pytest.fixture
+def sweeps():
+    cache = DesignCache(sweep_maxsize=10000)
+    return cache, DesignSweep(cache=cache), DesignSweep()
+
+
+def test_overlapping_range_only_evaluates_new_points(sweeps):
+    cache, cached, plain = sweeps
+    first = np.linspace(0.05, 0.5, 1000)
+    second = np.concatenate([first[500:], np.linspace(0.6, 1.0, 500)])
+    cached.sweep_rmes(BASE_PARAMS, first)
+    hits, misses = cache.hits, cache.misses
+    result = cached.sweep_rmes(BASE_PARAMS, second)
+    assert (cache.hits - hits, cache.misses - misses) == (500, 500)
+    assert_same_rows(result.batch, plain.sweep_rmes(BASE_PARAMS, second).batch)
+
+
+def test_rerun_after_toggling_an_input_is_served_from_cache(sweeps):
+    cache, cached, plain = sweeps
+    values = np.logspace(np.log10(0.5), np.log10(0.95), 200)
+    cached.sweep_k(BASE_PARAMS, values)
+    cached.sweep_k({**BASE_PARAMS, 'r': 8.0}, values)
+    hits = cache.hits
+    result = cached.sweep_k(BASE_PARAMS, values)
+    assert cache.hits - hits == len(values)
+    assert_same_rows(result.batch, plain.sweep_k(BASE_PARAMS, values).batch)
+
+
+def test_rows_from_several_blocks_keep_sweep_order(sweeps):
+    cache, cached, plain = sweeps
+    cached.sweep_n_channels(BASE_PARAMS, [6, 7, 8])
+    cached.sweep_n_channels(BASE_PARAMS, [2, 3])
+    values = [8, 2, 5, 7, 3, 6, 4]
+    assert_same_rows(cached.sweep_n_channels(BASE_PARAMS, values).batch,
+                     plain.sweep_n_channels(BASE_PARAMS, values).batch)
+
+
+def test_resize_evicts_both_caches():
+    cache = DesignCache(maxsize=10, sweep_maxsize=1000)
+    sweep = DesignSweep(cache=cache)
+    sweep.sweep_rmes(BASE_PARAMS, np.linspace(0.05, 0.5, 800))
+    for rmes in (0.1, 0.2, 0.3):
+        cache.get(**{**BASE_PARAMS, 'rmes': rmes})
+    cache.resize(2, sweep_maxsize=100)
+    stats = cache.stats()
+    assert (stats['size'], stats['points'], stats['sweep_maxsize']) == (2, 100, 100)
+    # The most recently used points survive.
+    hits = cache.hits
+    sweep.sweep_rmes(BASE_PARAMS, np.linspace(0.05, 0.5, 800)[-100:])
+    assert cache.hits - hits == 100
+
+
+def test_evicted_rows_are_compacted_away():
+    cache = DesignCache(sweep_maxsize=100)
+    cached, plain = DesignSweep(cache=cache), DesignSweep()
+    values = np.linspace(0.05, 0.5, 5000)
+    cached.sweep_rmes(BASE_PARAMS, values)
+    # Only the last 100 rows of the 5000-row block are live, so it is copied down to them.
+    assert cache.stats()['points'] == 100
+    assert cache._stored_rows == 100
+    hits = cache.hits
+    result = cached.sweep_rmes(BASE_PARAMS, values[-100:])
+    assert cache.hits - hits == 100
+    assert_same_rows(result.batch, plain.sweep_rmes(BASE_PARAMS, values[-100:]).batch)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import parameters_optimizer_v2
+from parameters_optimizer_v2 import DesignSweep
+from test_design_cache import BASE_PARAMS, assert_same_rows
+
+
+class BrokenPool:
+    def __init__(self, *args, **kwargs):
+        raise OSError("no semaphores")
+
+
+@pytest.fixture
+def broken_pool(monkeypatch):
+    monkeypatch.setattr(parameters_optimizer_v2, 'ProcessPoolExecutor', BrokenPool)
+
+
+def test_sweep_falls_back_to_serial_with_a_warning(broken_pool):
+    values = np.linspace(0.05, 0.5, 400)
+    sweep = DesignSweep(executor='process', max_workers=4, parallel_min_points=1)
+    with pytest.warns(RuntimeWarning, match="falling back to serial"):
+        result = sweep.sweep_rmes(BASE_PARAMS, values)
+    assert sweep.executor == 'serial'
+    assert_same_rows(result.batch, DesignSweep().sweep_rmes(BASE_PARAMS, values).batch)
+
+
+def test_grid_falls_back_to_serial_with_a_warning(broken_pool):
+    grid = {'rmes': np.linspace(0.05, 0.5, 30), 'k': np.linspace(0.5, 0.9, 20)}
+    sweep = DesignSweep(executor='process', max_workers=4, parallel_min_points=1)
+    with pytest.warns(RuntimeWarning, match="no semaphores"):
+        chunks = list(sweep.sweep_grid(BASE_PARAMS, grid, chunk_size=128))
+    expected = list(DesignSweep().sweep_grid(BASE_PARAMS, grid, chunk_size=128))
+    assert [len(c) for c in chunks] == [len(c) for c in expected]
+    for batch, wanted in zip(chunks, expected):
+        assert_same_rows(batch, wanted)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from log_history import BoundedLog, LogHistory
+
+
+def log_text(n):
+    return ''.join(f"line {i}: Voltage = {i * 0.001:.4f}   µA\n" for i in range(n))
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = LogHistory(str(tmp_path / "serial.log"))
+    yield history
+    history.close()
+
+
+def append_in_pieces(history, text, seed=0):
+    """Append text in random pieces, splitting lines anywhere."""
+    rng = np.random.default_rng(seed)
+    cuts = np.sort(rng.integers(0, len(text), 200))
+    for start, stop in zip(np.concatenate(([0], cuts)), np.concatenate((cuts, [len(text)]))):
+        history.append(text[start:stop])
+
+
+def test_any_window_of_lines_reads_back(history):
+    text = log_text(3000)  # past the initial offset index size
+    append_in_pieces(history, text)
+    lines = text.splitlines(keepends=True)
+    assert len(history) == 3000
+    for start, count in [(0, 1), (0, 50), (1023, 3), (1500, 700), (2990, 50), (2999, 1)]:
+        assert history.read_lines(start, count) == ''.join(lines[start:start + count])
+
+
+def test_out_of_range_windows(history):
+    history.append(log_text(10))
+    assert history.read_lines(10, 5) == ''
+    assert history.read_lines(20, 5) == ''
+    assert history.read_lines(-3, 2) == ''.join(log_text(10).splitlines(keepends=True)[:2])
+    assert history.read_lines(5, 0) == ''
+
+
+def test_unterminated_last_line_counts_until_completed(history):
+    history.append("first\nsecond\npart")
+    assert len(history) == 3
+    assert history.read_lines(2, 1) == "part"
+    history.append("ial\nthird\n")
+    assert len(history) == 4
+    assert history.read_lines(1, 3) == "second\npartial\nthird\n"
+
+
+def test_sink_writes_and_reading_after_close(history):
+    history.write(np.zeros(3), "a\nb\n")
+    history.write(np.zeros(0), "")
+    history.flush()
+    with open(history.path, encoding='utf-8') as f:
+        assert f.read() == "a\nb\n"
+    history.close()
+    # The viewer can still page through a closed session's file.
+    assert history.read_lines(1, 1) == "b\n"
+
+
+def test_bounded_log_keeps_the_newest_lines():
+    tk = pytest.importorskip('tkinter')
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    try:
+        widget = tk.Text(root)
+        log = BoundedLog(widget, max_lines=100)
+        for start in range(0, 1000, 37):
+            log.append(''.join(f"{i}\n" for i in range(start, min(start + 37, 1000))))
+        lines = widget.get('1.0', 'end-1c').splitlines()
+        assert len(lines) <= 100 and lines[-1] == "999"
+        assert lines == [str(i) for i in range(1000 - len(lines), 1000)]
+        log.clear()
+        assert widget.get('1.0', 'end-1c') == ''
+    finally:
+        root.destroy()
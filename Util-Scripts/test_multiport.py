@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from multiport import MultiPortReader
+from serial_protocol import encode_frames
+
+pty = pytest.importorskip('pty')
+
+
+class FakePort:
+    """A port without fileno(), so the reader has to poll it."""
+
+    def __init__(self, data=b'', error=None):
+        self.data = data
+        self.error = error
+        self.closed = False
+
+    @property
+    def in_waiting(self):
+        return len(self.data) or self.error is not None
+
+    def read(self, size):
+        if self.error is not None:
+            raise self.error
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def boards():
+    """A reader on n pty-backed ports; yields (reader, master fds)."""
+    opened, readers = [], []
+
+    def open_boards(n):
+        reader = MultiPortReader()
+        masters = []
+        for i in range(n):
+            master, slave = pty.openpty()
+            opened.extend((master, slave))
+            masters.append(master)
+            reader.add_port(f"board{i}", os.ttyname(slave), protocol='binary')
+        reader.start()
+        readers.append(reader)
+        return reader, masters
+
+    yield open_boards
+    for reader in readers:
+        reader.stop()
+    for fd in opened:
+        os.close(fd)
+
+
+def board(master, rate, seconds, pauses=(), written=None):
+    """Write frames every 10 ms for `seconds`, going quiet for each of pauses (s) in turn every 0.2 s."""
+    sequence = 0
+    end = time.time() + seconds
+    pauses = list(pauses)
+    next_pause = time.time() + 0.2
+    while time.time() < end:
+        n = max(1, int(rate * 0.01))
+        os.write(master, encode_frames(np.arange(sequence, sequence + n), 1, 512, 0, 300))
+        sequence += n
+        if pauses and time.time() >= next_pause:
+            time.sleep(pauses.pop(0))
+            next_pause = time.time() + 0.2
+        time.sleep(0.01)
+    if written is not None:
+        written.append(sequence)
+
+
+def test_merged_stream_stays_ordered_with_a_bursty_port(boards):
+    n_ports, seconds = 4, 1.5
+    reader, masters = boards(n_ports)
+    # The last board goes quiet for longer than max_latency now and then, the others write every 10 ms.
+    pauses = (0.15, 0.25, 0.4, 0.3)
+    written = [[] for _ in masters]
+    writers = [threading.Thread(target=board, args=(master, 2000 * (i + 1), seconds,
+                                                    pauses if i == n_ports - 1 else (), written[i]))
+               for i, master in enumerate(masters)]
+    for writer in writers:
+        writer.start()
+
+    chunks = []
+    end = time.time() + seconds + 0.5
+    while time.time() < end:
+        chunks.append(reader.merged())
+        time.sleep(0.05)
+    for writer in writers:
+        writer.join()
+    time.sleep(0.2)
+    chunks.append(reader.merged(now=time.time() + 1))
+    merged = np.concatenate(chunks)
+
+    assert (np.diff(merged['timestamp']) >= 0).all()
+    stats = reader.stats()
+    for i, (name, count) in enumerate(zip(reader.streams, written)):
+        port = merged[merged['port'] == i]
+        assert len(port) == stats[name]['samples'] == count[0]
+        # Every port's frames come out in the order they were sent.
+        np.testing.assert_array_equal(port['sequence'], np.arange(count[0]) & 0xFF)
+        assert stats[name]['error'] is None
+
+
+def test_polled_port_is_read():
+    reader = MultiPortReader(poll_interval=0.001)
+    port = FakePort(encode_frames(np.arange(20), 0, 600, 100, 200))
+    reader.add_port('fake', port, protocol='binary')
+    reader.start()
+    try:
+        deadline = time.time() + 2
+        while reader.stats()['fake']['samples'] < 20 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        reader.stop()
+    merged = reader.merged(now=time.time() + 1)
+    assert merged['sequence'].tolist() == list(range(20))
+    assert port.closed
+
+
+def test_failed_port_does_not_hold_back_the_others():
+    reader = MultiPortReader(max_latency=10.0)
+    good = reader.add_port('good', FakePort(encode_frames(np.arange(5), 0, 600, 100, 200)), protocol='binary')
+    bad = reader.add_port('bad', FakePort(error=OSError("device unplugged")), protocol='binary')
+    good.read_available()
+    bad.read_available()
+    now = time.time()
+    # The failed port is left out of the watermark; counted as quiet it would hold everything back max_latency.
+    merged = reader.merged(now=now)
+    assert len(merged) == 5 and (merged['port'] == good.index).all()
+    assert reader.stats()['bad']['error'] == "device unplugged"
+
+
+def test_ports_cannot_be_added_while_running():
+    reader = MultiPortReader()
+    reader.add_port('fake', FakePort(), protocol='binary')
+    reader.start()
+    try:
+        with pytest.raises(RuntimeError):
+            reader.add_port('late', FakePort())
+    finally:
+        reader.stop()
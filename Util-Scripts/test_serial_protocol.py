@@ -0,0 +1,249 @@
+import numpy as np
+import pytest
+
+from serial_protocol import (CHANNEL_GAINS, FLAG_OUT_OF_RANGE, FRAME_SIZE, MAX_LINE, SAMPLE_DTYPE,
+                             BinaryFrameDecoder, BurstDecoder, TextLineDecoder, encode_bursts, encode_frames,
+                             format_samples, pack_burst_words, parse_text_block, scale_voltage)
+
+# Text output captured from the board at 9600 baud, with the range switch
+# messages the firmware prints between readings.
+RECORDED_TEXT = (
+    b' Serial  <<  Voltage = 2.0117       Current[A] = 0.0108\r\n'
+    b' Serial  <<  Voltage = 2.0068       Current[A] = 0.0109\r\n'
+    b'Channel 2 selected\r\n'
+    b' Serial  <<  Voltage = -0.0049       Current[A] = 0.1042\r\n'
+)
+RECORDED_TEXT_READINGS = [(2.0117, 0.0108), (2.0068, 0.0109), (-0.0049, 0.1042)]
+
+# Three frames captured from the board: sequence 7..9 on channels 0, 1 and 3,
+# raw codes (A1, A0, A4) = (600, 100, 512), (700, 100, 300), (1023, 0, 40).
+RECORDED_FRAMES = bytes.fromhex(
+    'a55a070058026400000219'
+    'a55a0801bc0264002c0179'
+    'a55a0903ff0300002800e2')
+RECORDED_READINGS = [
+    # sequence, channel, voltage code, current code
+    (7, 0, 500, 512),
+    (8, 1, 600, 300),
+    (9, 3, 1023, 40),
+]
+
+# Two bursts captured from the board at 350 us per sample: burst 5 with the
+# readings above plus (1023, 0, 40) on channel 2 and (512, 0, 1000) on
+# channel 3, then a short burst 6 repeating the first two.
+RECORDED_BURSTS = bytes.fromhex(
+    'a55b05045e0158920120bc92c152ff038082000280fe6e'
+    'a55b06025e0158920120bc92c152f4')
+RECORDED_BURST_READINGS = [
+    # channel, voltage code, current code
+    (0, 500, 512),
+    (1, 600, 300),
+    (2, 1023, 40),
+    (3, 512, 1000),
+    (0, 500, 512),
+    (1, 600, 300),
+]
+BURST_HEADER = 6
+
+
+def decode(stream, sizes=None, decoder_class=BinaryFrameDecoder):
+    """Feed a byte stream in chunks of the given sizes (all at once by default); (samples, decoder)."""
+    decoder = decoder_class()
+    sizes = sizes or [len(stream)]
+    chunks, offset = [], 0
+    for size in sizes:
+        chunks.append(decoder.feed(stream[offset:offset + size], timestamp=1.0)[0])
+        offset += size
+    if offset < len(stream):
+        chunks.append(decoder.feed(stream[offset:], timestamp=1.0)[0])
+    return np.concatenate(chunks) if chunks else np.zeros(0, SAMPLE_DTYPE), decoder
+
+
+def test_recorded_frames_decode_to_the_board_readings():
+    samples, decoder = decode(RECORDED_FRAMES)
+    sequence, channel, voltage_code, current_code = np.array(RECORDED_READINGS).T
+    np.testing.assert_array_equal(samples['sequence'], sequence)
+    np.testing.assert_array_equal(samples['channel'], channel)
+    np.testing.assert_allclose(samples['voltage'], scale_voltage(voltage_code))
+    np.testing.assert_allclose(samples['current'], scale_voltage(current_code) / np.take(CHANNEL_GAINS, channel))
+    assert decoder.stats() == {'frames': 3, 'crc_errors': 0, 'channel_errors': 0, 'dropped_bytes': 0,
+                               'lost_frames': 0}
+
+
+@pytest.mark.parametrize('sizes', [
+    [1] * len(RECORDED_FRAMES),    # byte by byte
+    [FRAME_SIZE - 1, 2, 5, 3],     # every frame split somewhere
+    [1, FRAME_SIZE, FRAME_SIZE],   # split through the sync word
+])
+def test_frames_split_across_reads(sizes):
+    whole, _ = decode(RECORDED_FRAMES)
+    split, decoder = decode(RECORDED_FRAMES, sizes)
+    np.testing.assert_array_equal(split, whole)
+    assert decoder.stats()['dropped_bytes'] == 0
+
+
+def test_split_long_stream_matches_one_read():
+    n = 2000
+    rng = np.random.default_rng(3)
+    stream = encode_frames(np.arange(n), rng.integers(0, 4, n), rng.integers(0, 1024, n), rng.integers(0, 1024, n),
+                           rng.integers(0, 1024, n))
+    whole, _ = decode(stream)
+    split, decoder = decode(stream, rng.integers(1, 64, len(stream) // 20).tolist())
+    assert len(whole) == n
+    np.testing.assert_array_equal(split, whole)
+    assert (decoder.frames, decoder.lost_frames, decoder.dropped_bytes) == (n, 0, 0)
+
+
+def test_crc_failure_drops_the_frame_and_shows_as_lost():
+    stream = bytearray(RECORDED_FRAMES)
+    stream[FRAME_SIZE + 6] ^= 0x01  # one bit of the middle frame's A0 code
+    samples, decoder = decode(bytes(stream))
+    assert samples['sequence'].tolist() == [7, 9]
+    assert (decoder.crc_errors, decoder.lost_frames, decoder.dropped_bytes) == (1, 1, FRAME_SIZE)
+
+
+def test_garbage_between_frames_is_dropped():
+    garbage = b'\x00\xa5\x13\xa5\x5a\x01'
+    stream = RECORDED_FRAMES[:FRAME_SIZE] + garbage + RECORDED_FRAMES[FRAME_SIZE:]
+    samples, decoder = decode(stream, [4] * 10)
+    assert samples['sequence'].tolist() == [7, 8, 9]
+    assert decoder.dropped_bytes == len(garbage)
+
+
+def test_channel_without_a_gain_is_counted_not_raised():
+    # Channels 4..15 fit the channel nibble and can pass the CRC, but have no gain.
+    stream = encode_frames([1, 2, 3, 4], [2, len(CHANNEL_GAINS), 15, 1], 700, 100, 300)
+    samples, decoder = decode(stream)
+    assert samples['sequence'].tolist() == [1, 4]
+    assert samples['channel'].tolist() == [2, 1]
+    assert np.isfinite(samples['current']).all()
+    assert (decoder.frames, decoder.channel_errors, decoder.crc_errors, decoder.lost_frames) == (2, 2, 0, 2)
+
+
+@pytest.mark.parametrize('sequence, lost', [
+    ([10, 11, 12, 13], 0),
+    ([10, 11, 15, 16], 3),
+    ([254, 255, 0, 1], 0),    # the 8-bit counter wraps
+    ([250, 251, 2, 3], 6),
+])
+def test_sequence_gaps(sequence, lost):
+    stream = encode_frames(sequence, 0, 512, 0, 100)
+    # The gap is also found when it falls between two reads.
+    for sizes in (None, [2 * FRAME_SIZE]):
+        samples, decoder = decode(stream, sizes)
+        assert samples['sequence'].tolist() == sequence
+        assert decoder.lost_frames == lost
+
+
+def test_recorded_bursts_decode_to_the_board_readings():
+    samples, decoder = decode(RECORDED_BURSTS, decoder_class=BurstDecoder)
+    channel, voltage_code, current_code = np.array(RECORDED_BURST_READINGS).T
+    np.testing.assert_array_equal(samples['channel'], channel)
+    np.testing.assert_array_equal(samples['sequence'], np.arange(6))
+    np.testing.assert_allclose(samples['voltage'], scale_voltage(voltage_code))
+    np.testing.assert_allclose(samples['current'], scale_voltage(current_code) / np.take(CHANNEL_GAINS, channel))
+    # Codes outside the predictive ranging band (0.2..4.5 V) are flagged on the host.
+    assert (samples['flags'] == FLAG_OUT_OF_RANGE).tolist() == [False, False, True, True, False, False]
+    assert decoder.stats() == {'bursts': 2, 'frames': 6, 'crc_errors': 0, 'dropped_bytes': 0, 'lost_bursts': 0,
+                               'sample_period': pytest.approx(350e-6)}
+
+
+@pytest.mark.parametrize('sizes', [
+    [1] * len(RECORDED_BURSTS),    # byte by byte
+    [BURST_HEADER - 1, 3, 20, 1],  # split in the header, in a word and before the CRC
+    [1, 22, 3],                    # split through the sync words
+])
+def test_bursts_split_across_reads(sizes):
+    whole, _ = decode(RECORDED_BURSTS, decoder_class=BurstDecoder)
+    split, decoder = decode(RECORDED_BURSTS, sizes, decoder_class=BurstDecoder)
+    np.testing.assert_array_equal(split, whole)
+    assert (decoder.bursts, decoder.dropped_bytes) == (2, 0)
+
+
+def test_burst_crc_failure_drops_the_burst():
+    words = pack_burst_words(np.arange(12) % 4, np.arange(12), 0, 300)
+    stream = bytearray(encode_bursts(words, sequence=5, period_us=350, burst_size=4))
+    size = BURST_HEADER + 4 * 4 + 1
+    stream[size + BURST_HEADER + 5] ^= 0x10  # a bit of the second burst's second word
+    samples, decoder = decode(bytes(stream), [7, 9, 30], decoder_class=BurstDecoder)
+    np.testing.assert_allclose(samples['voltage'], scale_voltage([0, 1, 2, 3, 8, 9, 10, 11]))
+    assert (decoder.bursts, decoder.crc_errors, decoder.lost_bursts, decoder.dropped_bytes) == (2, 1, 1, size)
+
+
+def test_bursts_scale_like_frames_of_the_same_readings():
+    # All scaling of raw bursts happens on the host; it must match what the board sends as frames.
+    n = 5000
+    rng = np.random.default_rng(0)
+    channel, v_plus, v_minus, current = (rng.integers(0, 4, n), rng.integers(0, 1024, n),
+                                         rng.integers(0, 1024, n), rng.integers(0, 1024, n))
+    sizes = [4096] * 20
+    frames, _ = decode(encode_frames(np.arange(n), channel, v_plus, v_minus, current), sizes)
+    raw, decoder = decode(encode_bursts(pack_burst_words(channel, v_plus, v_minus, current), period_us=350), sizes,
+                          decoder_class=BurstDecoder)
+    assert len(raw) == len(frames) == n
+    for name in ('channel', 'voltage', 'current'):
+        np.testing.assert_array_equal(raw[name], frames[name])
+    assert (decoder.crc_errors, decoder.dropped_bytes, decoder.lost_bursts) == (0, 0, 0)
+
+
+def test_burst_channels_always_have_a_gain():
+    # Burst words carry the channel in two bits, so there is no channel error to count.
+    decoder = BurstDecoder()
+    samples, _ = decoder.feed(encode_bursts(pack_burst_words(np.arange(8) % 4, 600, 100, 300), period_us=200))
+    assert samples['channel'].tolist() == [0, 1, 2, 3] * 2
+    assert decoder.stats()['frames'] == 8 and 'channel_errors' not in decoder.stats()
+
+
+def decode_text(stream, chunk):
+    """Feed a text stream in chunk-byte reads; (samples, log text, decoder)."""
+    decoder = TextLineDecoder()
+    results = [decoder.feed(stream[i:i + chunk], timestamp=1.0) for i in range(0, len(stream), chunk)]
+    samples = np.concatenate([samples for samples, _ in results])
+    return samples, ''.join(text for _, text in results), decoder
+
+
+@pytest.mark.parametrize('chunk', [
+    len(RECORDED_TEXT),
+    1,     # byte by byte
+    30,    # lines split inside their numbers
+    56,    # between the carriage return and the newline
+])
+def test_recorded_text_lines_split_across_reads(chunk):
+    samples, text, decoder = decode_text(RECORDED_TEXT, chunk)
+    np.testing.assert_array_equal(np.column_stack([samples['voltage'], samples['current']]), RECORDED_TEXT_READINGS)
+    assert (samples['sequence'] == -1).all() and (samples['channel'] == -1).all()
+    # Every complete line goes to the log, readings or not.
+    assert text == RECORDED_TEXT.decode() and decoder.lines == 4
+
+
+def test_block_parser_matches_formatted_readings():
+    n = 20000
+    rng = np.random.default_rng(0)
+    readings = np.zeros(n, dtype=[('voltage', 'f8'), ('current', 'f8')])
+    readings['voltage'] = rng.uniform(-5, 5, n)
+    readings['current'] = rng.uniform(0, 0.2, n)
+    stream = format_samples(readings).replace('\n', '\r\n').encode()
+    samples, _, _ = decode_text(stream, 4096)
+    np.testing.assert_array_equal(samples['voltage'], np.round(readings['voltage'], 4))
+    np.testing.assert_array_equal(samples['current'], np.round(readings['current'], 4))
+
+
+@pytest.mark.parametrize('bad', [
+    b'nan', b'inf', b'-inf',   # float() parses these, so the whole block takes the fast path
+    b'ovf', b'1.2.3',          # float() rejects these, so the block is parsed line by line
+])
+def test_non_finite_readings_are_dropped(bad):
+    block = (b' Serial  <<  Voltage = 1.0000       Current[A] = 0.0100\r\n'
+             b' Serial  <<  Voltage = ' + bad + b'       Current[A] = 0.0200\r\n'
+             b' Serial  <<  Voltage = 3.0000       Current[A] = ' + bad + b'\r\n'
+             b' Serial  <<  Voltage = 4.0000       Current[A] = 0.0400\r\n')
+    voltage, current = parse_text_block(block)
+    assert voltage.tolist() == [1.0, 4.0] and current.tolist() == [0.01, 0.04]
+
+
+def test_runaway_line_is_cut_to_max_line():
+    decoder = TextLineDecoder()
+    decoder.feed(b'x' * (3 * MAX_LINE), timestamp=1.0)
+    samples, text = decoder.feed(b' Serial  <<  Voltage = 1.0000       Current[A] = 0.0100\r\n', timestamp=1.0)
+    assert len(text) <= MAX_LINE + 60
+    assert samples['voltage'].tolist() == [1.0]
@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+import pytest
+
+from acquisition import AcquisitionEngine
+from serial_protocol import BURST_SIZE, BinaryFrameDecoder, BurstDecoder, TextLineDecoder
+from serial_simulator import STEP_CURRENTS, FirmwareSimulator
+
+DECODERS = {'text': TextLineDecoder, 'binary': BinaryFrameDecoder, 'burst': BurstDecoder}
+RATES = {'text': 1000, 'binary': 5000, 'burst': 20000}  # readings/s each format can carry
+
+
+def decode(simulator, n, chunk=997):
+    """Generate n readings and decode them in chunk-byte reads; (samples, decoder)."""
+    decoder = DECODERS[simulator.protocol]()
+    data = simulator.generate(n)
+    chunks = [decoder.feed(data[i:i + chunk], timestamp=1.0)[0] for i in range(0, len(data), chunk)]
+    return np.concatenate(chunks), decoder
+
+
+@pytest.mark.parametrize('protocol', DECODERS)
+def test_generated_stream_decodes_to_the_signal(protocol):
+    simulator = FirmwareSimulator(protocol, RATES[protocol], 'dc', voltage=2.0, current=0.01, seed=1)
+    samples, decoder = decode(simulator, 10 * BURST_SIZE)
+    assert len(samples) == simulator.samples == 10 * BURST_SIZE
+    np.testing.assert_allclose(samples['voltage'], 2.0, atol=5.0 / 1024)
+    np.testing.assert_allclose(samples['current'], 0.01, rtol=0.02)
+    if protocol == 'binary':
+        np.testing.assert_array_equal(samples['sequence'], np.arange(len(samples)) & 0xFF)
+    if protocol == 'burst':
+        assert decoder.sample_period == pytest.approx(1.0 / RATES[protocol])
+
+
+@pytest.mark.parametrize('protocol', ['binary', 'burst'])
+def test_steps_switch_gain_channels(protocol):
+    simulator = FirmwareSimulator(protocol, 1000, 'steps', frequency=10.0, seed=2)
+    samples, _ = decode(simulator, 1024)
+    assert simulator.ranging.channel_changes >= len(STEP_CURRENTS) - 1
+    assert set(samples['channel'].tolist()) == set(range(len(STEP_CURRENTS)))
+    # Away from the steps, where the board is still ranging, every current is read on a fitting channel.
+    settled = samples['flags'] == 0
+    assert settled.mean() > 0.9
+    np.testing.assert_allclose(samples['current'][settled],
+                               np.asarray(STEP_CURRENTS)[(np.flatnonzero(settled) // 100) % 4], rtol=0.05)
+
+
+@pytest.mark.parametrize('protocol', ['binary', 'burst'])
+def test_injected_errors_are_all_accounted_for(protocol):
+    n = 64 * BURST_SIZE
+    simulator = FirmwareSimulator(protocol, RATES[protocol], 'sine', noise=1.0, drop_rate=2e-4,
+                                  corrupt_rate=2e-4, seed=3)
+    samples, decoder = decode(simulator, n)
+    stats = decoder.stats()
+    assert simulator.bytes_dropped and simulator.bytes_corrupted
+    assert stats['crc_errors'] + stats['dropped_bytes'] > 0
+    lost = stats['lost_frames'] if protocol == 'binary' else stats['lost_bursts'] * BURST_SIZE
+    # Every reading either arrives or is counted lost; a loss at the very end has no later sequence to show it.
+    assert n - (1 if protocol == 'binary' else BURST_SIZE) <= len(samples) + lost <= n
+
+
+@pytest.mark.parametrize('lossy', [False, True], ids=['clean', 'lossy'])
+@pytest.mark.parametrize('protocol', DECODERS)
+def test_acquisition_engine_keeps_up_with_the_board(protocol, lossy):
+    """Stress test: the engine reads a simulated board on a pty at full rate."""
+    serial = pytest.importorskip('serial')
+    pytest.importorskip('pty')
+    simulator = FirmwareSimulator(protocol, RATES[protocol], 'steps', frequency=4.0, noise=0.5,
+                                  drop_rate=1e-4 if lossy else 0.0, seed=4)
+    port = serial.Serial(simulator.start(), 115200, timeout=0.05)
+    engine = AcquisitionEngine(port, protocol)
+    engine.start()
+    try:
+        time.sleep(0.5)
+        simulator.stop()
+        time.sleep(0.2)
+    finally:
+        engine.stop()
+        port.close()
+        simulator.close()
+
+    assert engine.error is None
+    sent = simulator.samples - len(simulator._burst)  # readings that left the board
+    received = engine.ring.total
+    stats = engine.decoder.stats() if hasattr(engine.decoder, 'stats') else {}
+    assert sent > 0.3 * RATES[protocol]
+    if not lossy:
+        assert received == sent
+        assert not any(stats.get(name) for name in ('crc_errors', 'dropped_bytes', 'lost_frames', 'lost_bursts'))
+    elif protocol == 'text':
+        # A dropped byte spoils at most the two lines around it.
+        assert sent - 2 * simulator.bytes_dropped <= received <= sent
+    else:
+        lost = stats['lost_frames'] if protocol == 'binary' else stats['lost_bursts'] * BURST_SIZE
+        assert sent - (1 if protocol == 'binary' else BURST_SIZE) <= received + lost <= sent
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from serial_protocol import SAMPLE_DTYPE
+from spectrum_view import SpectrumAnalyzer
+
+RATE = 1000.0
+FREQUENCY = 62.5
+
+
+def chunks(start, stop, size=100):
+    """Sine samples start..stop-1 at RATE in chunks, timestamped by sample index."""
+    for first in range(start, stop, size):
+        index = np.arange(first, min(first + size, stop))
+        samples = np.zeros(len(index), dtype=SAMPLE_DTYPE)
+        samples['timestamp'] = index / RATE
+        samples['voltage'] = np.sin(2 * np.pi * FREQUENCY * index / RATE)
+        yield samples
+
+
+def test_contiguous_stream_rate_and_peak():
+    analyzer = SpectrumAnalyzer()
+    for samples in chunks(0, 4000):
+        analyzer.update(samples)
+    frequencies, psd, rate = analyzer.result()
+    assert rate == pytest.approx(RATE)
+    assert frequencies[np.argmax(psd['voltage'])] == pytest.approx(FREQUENCY)
+
+
+@pytest.mark.parametrize('lost', [1, 700, 5000])
+def test_gap_is_not_counted_in_the_sample_rate(lost):
+    analyzer = SpectrumAnalyzer()
+    for samples in chunks(0, 1500):
+        analyzer.update(samples)
+    for i, samples in enumerate(chunks(1500 + lost, 3000 + lost)):
+        analyzer.update(samples, gap=i == 0)
+    frequencies, psd, rate = analyzer.result()
+    assert len({run for run, _, _ in analyzer._spans}) == 2
+    assert rate == pytest.approx(RATE)
+    assert frequencies[np.argmax(psd['voltage'])] == pytest.approx(FREQUENCY)
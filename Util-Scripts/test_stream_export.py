@@ -0,0 +1,144 @@
+import csv
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+
+from serial_protocol import SAMPLE_DTYPE, format_samples
+from stream_export import CsvWriter, NpyWriter, StreamWriter, TxtWriter, XmlWriter, open_writer
+
+
+def make_chunks(n_chunks=20, size=50):
+    rng = np.random.default_rng(0)
+    chunks = []
+    for k in range(n_chunks):
+        samples = np.zeros(size, dtype=SAMPLE_DTYPE)
+        samples['timestamp'] = 1.7e9 + (k * size + np.arange(size)) * 1e-3
+        samples['sequence'] = (k * size + np.arange(size)) & 0xFF
+        samples['channel'] = rng.integers(0, 4, size)
+        samples['flags'] = np.where(rng.random(size) < 0.1, 0x80, 0)
+        samples['voltage'] = rng.uniform(-5, 5, size)
+        samples['current'] = rng.uniform(0, 0.2, size)
+        chunks.append(samples)
+    return chunks
+
+
+def write_all(writer, chunks):
+    for samples in chunks:
+        writer.write(samples, format_samples(samples))
+    writer.close()
+    return np.concatenate(chunks)
+
+
+def read_npy(paths):
+    return np.concatenate([np.load(path) for path in paths])
+
+
+def read_csv(paths):
+    rows = []
+    for path in paths:
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            assert next(reader) == list(SAMPLE_DTYPE.names)
+            rows.extend(reader)
+    return np.array(rows, dtype=float)
+
+
+def read_xml(paths):
+    return [sample.attrib for path in paths for sample in ET.parse(path).getroot()]
+
+
+def test_npy_round_trip(tmp_path):
+    writer = NpyWriter(str(tmp_path / "log.npy"))
+    samples = write_all(writer, make_chunks())
+    loaded = np.load(writer.path)
+    assert loaded.dtype == SAMPLE_DTYPE
+    np.testing.assert_array_equal(loaded, samples)
+    np.testing.assert_array_equal(np.load(writer.path, mmap_mode='r')[-50:], samples[-50:])
+
+
+def test_csv_round_trip(tmp_path):
+    writer = CsvWriter(str(tmp_path / "log.csv"))
+    samples = write_all(writer, make_chunks())
+    rows = read_csv(writer.paths)
+    assert len(rows) == len(samples) == writer.samples
+    for column, name in enumerate(SAMPLE_DTYPE.names):
+        if name in ('voltage', 'current'):
+            np.testing.assert_allclose(rows[:, column], samples[name], rtol=1e-5)
+        elif name == 'timestamp':
+            np.testing.assert_allclose(rows[:, column], samples[name], atol=1e-6)
+        else:
+            np.testing.assert_array_equal(rows[:, column], samples[name])
+
+
+def test_xml_round_trip(tmp_path):
+    writer = XmlWriter(str(tmp_path / "log.xml"))
+    samples = write_all(writer, make_chunks())
+    elements = read_xml(writer.paths)
+    assert [int(e['channel']) for e in elements] == samples['channel'].tolist()
+    np.testing.assert_allclose([float(e['voltage']) for e in elements], samples['voltage'], rtol=1e-5)
+    np.testing.assert_allclose([float(e['timestamp']) for e in elements], samples['timestamp'], atol=1e-6)
+
+
+def test_txt_keeps_the_log_text(tmp_path):
+    chunks = make_chunks(3)
+    writer = TxtWriter(str(tmp_path / "log.txt"))
+    write_all(writer, chunks)
+    with open(writer.path, encoding='utf-8') as f:
+        assert f.read() == ''.join(format_samples(samples) for samples in chunks)
+
+
+@pytest.mark.parametrize('writer_class, read', [
+    (NpyWriter, read_npy),
+    (CsvWriter, read_csv),
+    (XmlWriter, read_xml),
+])
+def test_rotation_finalizes_every_file(tmp_path, writer_class, read):
+    writer = writer_class(str(tmp_path / "log"), max_bytes=4000)
+    samples = write_all(writer, make_chunks())
+    names = [os.path.basename(path) for path in writer.paths]
+    ext = writer_class.extension
+    assert len(names) > 3
+    assert names[:3] == [f"log{ext}", f"log_001{ext}", f"log_002{ext}"]
+    # Each file is complete on its own and together they hold every sample once.
+    assert len(read(writer.paths)) == len(samples)
+    assert all(len(read([path])) for path in writer.paths[:-1])
+
+
+def test_output_is_flushed_while_writing(tmp_path):
+    writer = NpyWriter(str(tmp_path / "log.npy"), flush_interval=0.0)
+    chunk = make_chunks(1)[0]
+    writer.write(chunk)
+    with open(writer.path, 'rb') as f:
+        data = f.read()
+    # The header still says 0 records until close, but the records are on disk.
+    assert data.endswith(chunk.tobytes())
+    writer.close()
+    assert len(np.load(writer.path)) == len(chunk)
+
+
+def test_writes_after_close_are_ignored(tmp_path):
+    writer = CsvWriter(str(tmp_path / "log.csv"))
+    write_all(writer, make_chunks(2))
+    writer.write(make_chunks(1)[0])
+    writer.close()
+    assert writer.samples == 100 and len(read_csv(writer.paths)) == 100
+
+
+def test_writers_must_implement_write():
+    class Incomplete(StreamWriter):
+        extension = '.bin'
+
+    with pytest.raises(TypeError):
+        Incomplete('unused.bin')
+    with pytest.raises(TypeError):
+        StreamWriter('unused.txt')
+
+
+def test_open_writer_names_the_file_by_format(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    writer = open_writer('csv')
+    writer.close()
+    assert writer.path.startswith('serial_log_') and writer.path.endswith('.csv')
+    assert os.path.exists(tmp_path / writer.path)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import streaming_stats
+from serial_protocol import SAMPLE_DTYPE
+from streaming_stats import SlidingStats
+
+
+def make_samples(n, rng):
+    samples = np.zeros(n, dtype=SAMPLE_DTYPE)
+    samples['voltage'] = 2.5 + rng.normal(0, 0.1, n) + np.sin(np.arange(n) / 50)
+    samples['current'] = rng.uniform(-1e-3, 1e-3, n)
+    return samples
+
+
+def expected(values):
+    return {
+        'count': len(values),
+        'mean': values.mean(),
+        'rms': np.sqrt((values ** 2).mean()),
+        'min': values.min(),
+        'max': values.max(),
+        'p2p': np.ptp(values),
+        'std': values.std(),
+    }
+
+
+@pytest.mark.parametrize('window, sizes', [
+    (1000, [1] * 3000),                 # text lines, coalesced
+    (1000, [5000, 3, 700, 1, 1200]),    # chunks larger than the window
+    (100000, [100000, 50, 50, 20000, 7, 130000, 1]),
+    (100000, [37] * 500 + [9000] * 20),
+])
+def test_matches_numpy_over_the_window(window, sizes):
+    rng = np.random.default_rng(window + len(sizes))
+    stats = SlidingStats(window)
+    history = []
+    for size in sizes:
+        chunk = make_samples(size, rng)
+        history.append(chunk)
+        stats.update(chunk)
+    latest = np.concatenate(history)[-window:]
+    result = stats.result()
+    for name in stats.fields:
+        for stat, value in expected(latest[name]).items():
+            assert result[name][stat] == pytest.approx(value, rel=1e-9, abs=1e-12), (name, stat)
+
+
+def test_block_count_stays_bounded():
+    rng = np.random.default_rng(1)
+    stats = SlidingStats(100000)
+    for size in rng.integers(1, 20000, 300):
+        stats.update(make_samples(size, rng))
+        assert len(stats._blocks) <= streaming_stats.MAX_BLOCKS + 2 * stats.window // stats.max_block + 2
+
+
+@pytest.mark.parametrize('window', [10 ** 5, 10 ** 6])
+def test_small_update_after_large_chunk_does_not_rescan_window(window, monkeypatch):
+    rng = np.random.default_rng(2)
+    stats = SlidingStats(window)
+    stats.update(make_samples(window, rng))
+
+    summarised = []
+    summarise = streaming_stats._summarise
+    monkeypatch.setattr(streaming_stats, '_summarise',
+                        lambda values: summarised.append(values.size // len(values)) or summarise(values))
+    chunk = 50
+    for _ in range(100):
+        summarised.clear()
+        stats.update(make_samples(chunk, rng))
+        # The new chunk, at most one small block it is merged into, and the trimmed oldest block.
+        assert sum(summarised) <= chunk + stats.min_block + stats.max_block
+    assert stats.max_block < window / 20
+    assert stats.result()['voltage']['count'] == window
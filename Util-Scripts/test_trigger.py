@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from serial_protocol import SAMPLE_DTYPE
+from trigger import TriggerConfig, TriggerEngine, trigger_points
+
+
+def sine(rate, seconds, frequency):
+    """A sine (a flat line for frequency 0) sampled at rate, timestamped from t = 100 s."""
+    n = int(rate * seconds)
+    samples = np.zeros(n, dtype=SAMPLE_DTYPE)
+    samples['timestamp'] = 100.0 + np.arange(n) / rate
+    samples['voltage'] = np.sin(2 * np.pi * frequency * np.arange(n) / rate)
+    return samples
+
+
+def run(config, samples, chunk):
+    """Feed samples in chunks; return the engine."""
+    engine = TriggerEngine(config)
+    for start in range(0, len(samples), chunk):
+        engine.write(samples[start:start + chunk])
+    return engine
+
+
+@pytest.mark.parametrize('kind, level, upper, expected', [
+    ('rising', 0.5, 0.0, [2, 6]),
+    ('falling', 0.5, 0.0, [4]),
+    ('level', 0.5, 0.0, [2, 3, 6]),
+    ('window', 0.2, 0.8, [2]),        # leaving upwards
+    ('window', 1.0, 0.25, [4]),       # leaving downwards, bounds in either order
+])
+def test_trigger_points(kind, level, upper, expected):
+    values = np.array([0.0, 0.3, 0.9, 0.9, 0.1, 0.3, 0.6])
+    hits = trigger_points(values, np.nan, TriggerConfig(kind, level, upper))
+    assert hits.tolist() == expected
+
+
+def test_trigger_points_use_the_previous_chunk():
+    config = TriggerConfig('rising', 0.5)
+    assert trigger_points(np.array([0.7, 0.8]), 0.2, config).tolist() == [0]
+    assert trigger_points(np.array([0.7, 0.8]), np.nan, config).tolist() == []
+
+
+@pytest.mark.parametrize('chunk', [250, 1, 37, 20000])
+def test_rising_edges_give_one_full_frame_per_period(chunk):
+    # Rising edges of a 1 Hz sine at 2 kS/s at 1..9 s; the one at t = 0 has no sample before it.
+    config = TriggerConfig('rising', 0.0, mode='normal')
+    samples = sine(2000, 10, 1.0)
+    engine = run(config, samples, chunk)
+    frames = engine.pop_frames()
+    assert engine.triggers == len(frames) == 9 and not engine.forced
+    for frame in frames:
+        assert len(frame.samples) == config.pre_samples + config.post_samples
+        assert frame.trigger_index == config.pre_samples
+        assert abs(frame.samples['voltage'][frame.trigger_index]) < 0.02
+        assert frame.times[frame.trigger_index] == 0.0
+        # A frame is the stream's own contiguous samples, however it was chunked.
+        start = np.searchsorted(samples['timestamp'], frame.samples['timestamp'][0])
+        np.testing.assert_array_equal(frame.samples, samples[start:start + len(frame.samples)])
+
+
+def test_frames_go_to_the_sinks():
+    class Sink:
+        def __init__(self):
+            self.frames = []
+
+        def write(self, samples, text):
+            self.frames.append(samples)
+
+    sink = Sink()
+    engine = TriggerEngine(TriggerConfig('rising', 0.0, mode='normal'))
+    engine.add_sink(sink)
+    for chunk in np.array_split(sine(2000, 3, 1.0), 10):
+        engine.write(chunk)
+    frames = engine.pop_frames()
+    assert len(sink.frames) == len(frames) == 2
+    assert all(np.array_equal(a, f.samples) for a, f in zip(sink.frames, frames))
+    assert engine.pop_frames() == []
+
+
+def test_auto_mode_forces_frames_auto_timeout_apart_at_low_rates():
+    # A flat line at 9600-baud text rates (~150 S/s, 37 samples per read): forced
+    # frames must stay auto_timeout apart, not come every chunk.
+    config = TriggerConfig('rising', 0.5, mode='auto')
+    frames = run(config, sine(150, 10, 0.0), 37).pop_frames()
+    ends = np.array([f.samples['timestamp'][-1] for f in frames])
+    assert all(f.forced for f in frames)
+    assert 1 <= len(ends) <= 10 and (np.diff(ends) >= config.auto_timeout).all()
+
+
+def test_auto_mode_does_not_force_while_triggering():
+    config = TriggerConfig('rising', 0.0, mode='auto', auto_timeout=2.0)
+    engine = run(config, sine(2000, 10, 1.0), 250)
+    assert engine.triggers == 9 and engine.forced == 0
+
+
+def test_single_shot_disarms_until_rearmed():
+    config = TriggerConfig('falling', 0.0, mode='single')
+    samples = sine(2000, 4, 5.0)
+    engine = run(config, samples[:4000], 100)
+    assert engine.triggers == 1 and not engine.armed
+    engine.arm()
+    for start in range(4000, len(samples), 100):
+        engine.write(samples[start:start + 100])
+    assert engine.triggers == 2 and not engine.armed
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'kind': 'sideways'},
+    {'mode': 'sometimes'},
+    {'source': 'power'},
+    {'post_samples': 0},
+    {'pre_samples': -1},
+])
+def test_invalid_config(kwargs):
+    with pytest.raises(ValueError):
+        TriggerConfig(**kwargs)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from serial_protocol import SAMPLE_DTYPE
+from trigger import TriggerFrame
+from waveform_view import WaveformView, minmax_decimate
+
+RATE = 20000.0
+
+
+def stream(start, n):
+    index = np.arange(start, start + n)
+    samples = np.zeros(n, dtype=SAMPLE_DTYPE)
+    samples['timestamp'] = 1000.0 + index / RATE
+    samples['voltage'] = np.sin(2 * np.pi * 3 * index / RATE)
+    samples['current'] = 0.01 * (index % 1000 == 0)  # one-sample spikes the decimation has to keep
+    return samples
+
+
+@pytest.fixture
+def view():
+    view = WaveformView(span=2.0, capacity=1 << 18)
+    view.attach(FigureCanvasAgg(view.figure))
+    return view
+
+
+def test_minmax_decimate_keeps_peaks():
+    x = np.linspace(0, 1, 100001)
+    y = np.zeros_like(x)
+    y[12345] = 5.0
+    y[54321] = -3.0
+    dx, dy = minmax_decimate(x, y, 0.0, 1.0, 200)
+    assert len(dx) == len(dy) <= 400
+    assert dy.max() == 5.0 and dy.min() == -3.0
+    few = x[:100]
+    assert minmax_decimate(few, y[:100], 0.0, 1.0, 200)[0] is few  # already small enough
+
+
+def test_refresh_plots_the_visible_span(view):
+    samples = stream(0, 200000)  # 10 s, more than the 2 s span
+    for chunk in np.array_split(samples, 50):
+        view.append(chunk)
+    view.refresh()
+
+    t = samples['timestamp'] - samples['timestamp'][-1]
+    visible = t >= -view.span
+    x, voltage = minmax_decimate(t[visible], samples['voltage'][visible].astype('f4'), -view.span, 0.0,
+                                 view._pixel_width())
+    line_x, line_y = view.voltage_line.get_data()
+    np.testing.assert_allclose(line_x, x)
+    np.testing.assert_array_equal(line_y, voltage)
+    assert view.current_line.get_data()[1].max() == pytest.approx(0.01)
+    assert line_x.min() >= -view.span and line_x.max() <= 0.0
+
+
+def test_refresh_copies_only_the_visible_span(view, monkeypatch):
+    view.append(stream(0, view.ring.capacity))  # a full ring, 13 s at RATE
+    copied = []
+    copy = view.ring._copy
+    monkeypatch.setattr(view.ring, '_copy', lambda start, stop: copied.append(stop - start) or copy(start, stop))
+    for k in range(5):
+        view.append(stream(view.ring.total, 1000))
+        view.refresh()
+    # The newest sample plus 2 s of samples per refresh, rather than the whole ring.
+    assert max(copied) <= view.span * RATE + 2
+    assert sum(copied) < view.ring.capacity
+
+
+def test_refresh_without_samples_or_changes(view):
+    view.refresh()
+    assert len(view.voltage_line.get_data()[0]) == 0
+    view.append(stream(0, 10))
+    view.refresh()
+    drawn = view.voltage_line.get_data()
+    view.refresh()  # nothing new: the lines are left alone
+    assert view.voltage_line.get_data()[0] is drawn[0]
+
+
+def test_triggered_frame_replaces_the_rolling_view(view):
+    samples = stream(0, 1000)
+    view.append(samples)
+    view.show_frame(TriggerFrame(samples[100:600], 200, float(samples['timestamp'][300])))
+    view.refresh()
+    x, _ = view.voltage_line.get_data()
+    assert x.min() == pytest.approx(-200 / RATE) and x.max() == pytest.approx(299 / RATE)
+    assert view.trigger_marks[0].get_visible()
+    view.show_live()
+    view.refresh()
+    assert view.ax_current.get_xlim() == (-view.span, 0) and not view.trigger_marks[0].get_visible()
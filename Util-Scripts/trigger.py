@@ -0,0 +1,183 @@
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+from serial_protocol import SAMPLE_DTYPE
+
+KINDS = ('rising', 'falling', 'level', 'window')
+MODES = ('auto', 'normal', 'single')
+MAX_QUEUED_FRAMES = 16
+
+
+@dataclass
+class TriggerConfig:
+    kind: str = 'rising'       # rising/falling edge through level, level (at or above), window (leaving [level, upper])
+    level: float = 0.0
+    upper: float = 0.0         # upper bound of the window trigger
+    source: str = 'voltage'    # 'voltage' or 'current'
+    mode: str = 'auto'         # auto: force a frame after auto_timeout without a trigger; normal: re-arm; single: one frame
+    pre_samples: int = 200     # samples kept before the trigger point
+    post_samples: int = 800    # samples captured from the trigger point on
+    auto_timeout: float = 0.5  # seconds of sample time before auto mode forces a frame
+
+    def __post_init__(self):
+        if self.kind not in KINDS:
+            raise ValueError(f"Unknown trigger kind {self.kind!r}, expected one of {KINDS}")
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown trigger mode {self.mode!r}, expected one of {MODES}")
+        if self.source not in ('voltage', 'current'):
+            raise ValueError(f"Unknown trigger source {self.source!r}")
+        if self.post_samples < 1 or self.pre_samples < 0:
+            raise ValueError("Trigger frames need post_samples >= 1 and pre_samples >= 0")
+
+
+@dataclass
+class TriggerFrame:
+    samples: np.ndarray   # SAMPLE_DTYPE records around the trigger
+    trigger_index: int    # position of the trigger point in samples
+    trigger_time: float   # timestamp of the trigger point
+    forced: bool = False  # True when auto mode timed out rather than triggered
+
+    @property
+    def times(self):
+        """Sample times relative to the trigger point."""
+        return self.samples['timestamp'] - self.trigger_time
+
+
+def trigger_points(values, previous, config: TriggerConfig):
+    """
+    Indices where the trigger condition fires in one chunk of source values,
+    evaluated for all samples at once. previous is the last value of the
+    chunk before (NaN at the start of a stream).
+    """
+    before = np.concatenate(([previous], values[:-1]))
+    if config.kind == 'rising':
+        hits = (before < config.level) & (values >= config.level)
+    elif config.kind == 'falling':
+        hits = (before > config.level) & (values <= config.level)
+    elif config.kind == 'level':
+        hits = values >= config.level
+    else:
+        low, high = sorted((config.level, config.upper))
+        inside = (before >= low) & (before <= high)
+        hits = inside & ((values < low) | (values > high))
+    return np.flatnonzero(hits)
+
+
+class TriggerEngine:
+    """
+    Host-side trigger on the decoded sample stream, usable as an
+    AcquisitionEngine sink.
+
+    Each chunk is scanned for trigger points with one vectorized comparison.
+    A trigger captures pre_samples of history and post_samples after it,
+    waiting for later chunks when needed. The next trigger is only accepted
+    once the frame is complete. Finished frames are queued for the UI
+    (pop_frames) and passed to every frame sink as sink.write(samples, '').
+    """
+
+    def __init__(self, config: TriggerConfig):
+        self.config = config
+        self.armed = True
+        self.sinks = []
+        self.triggers = 0
+        self.forced = 0
+        self._frames = deque(maxlen=MAX_QUEUED_FRAMES)
+        self._history = np.empty(0, dtype=SAMPLE_DTYPE)
+        # Auto mode keeps a whole frame of history so it can force one at any chunk.
+        self._keep = config.pre_samples + (config.post_samples if config.mode == 'auto' else 0)
+        self._previous = np.nan
+        self._count = 0               # samples seen
+        self._next_allowed = 0        # first sample index a new trigger may start at
+        self._pending = None          # (samples so far, trigger index, trigger time, forced) of an open frame
+        self._last_frame_time = None
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def arm(self):
+        """Re-arm after a single-shot capture."""
+        self.armed = True
+
+    def pop_frames(self):
+        frames = []
+        while self._frames:
+            frames.append(self._frames.popleft())
+        return frames
+
+    def _emit(self, samples, trigger_index, trigger_time, forced):
+        frame = TriggerFrame(samples, trigger_index, trigger_time, forced)
+        # auto_timeout runs from the end of the frame, not its trigger point,
+        # which is post_samples earlier and would force a frame per chunk at low rates.
+        self._last_frame_time = float(samples['timestamp'][-1])
+        self._frames.append(frame)
+        for sink in list(self.sinks):
+            sink.write(samples, '')
+        if forced:
+            self.forced += 1
+        else:
+            self.triggers += 1
+            if self.config.mode == 'single':
+                self.armed = False
+
+    def _finish_pending(self, samples):
+        """Extend an open frame with the start of a new chunk, emitting it once complete."""
+        frame, trigger_index, trigger_time, forced = self._pending
+        needed = trigger_index + self.config.post_samples - len(frame)
+        frame = np.concatenate([frame, samples[:needed]])
+        if len(frame) - trigger_index < self.config.post_samples:
+            self._pending = (frame, trigger_index, trigger_time, forced)
+        else:
+            self._pending = None
+            self._emit(frame, trigger_index, trigger_time, forced)
+
+    def write(self, samples, text=''):
+        if len(samples) == 0:
+            return
+        with self._lock:
+            self._process(samples)
+
+    def _process(self, samples):
+        config = self.config
+        if self._pending is not None:
+            self._finish_pending(samples)
+
+        data = np.concatenate([self._history, samples])
+        offset = len(self._history)  # data index of samples[0]
+        values = samples[config.source]
+
+        if self.armed and self._pending is None:
+            hits = trigger_points(values, self._previous, config)
+            hits = hits[hits >= self._next_allowed - self._count]
+            while len(hits):
+                hit = int(hits[0])
+                start = max(0, offset + hit - config.pre_samples)
+                stop = offset + hit + config.post_samples
+                trigger_index = offset + hit - start
+                trigger_time = float(samples['timestamp'][hit])
+                self._next_allowed = self._count + hit + config.post_samples
+                if stop <= len(data):
+                    self._emit(data[start:stop], trigger_index, trigger_time, False)
+                else:
+                    self._pending = (data[start:], trigger_index, trigger_time, False)
+                    break
+                if not self.armed:
+                    break
+                hits = hits[hits >= self._next_allowed - self._count]
+
+        if (config.mode == 'auto' and self._pending is None and
+                len(data) >= config.pre_samples + config.post_samples):
+            now = float(samples['timestamp'][-1])
+            if self._last_frame_time is None:
+                self._last_frame_time = float(samples['timestamp'][0])
+            if now - self._last_frame_time >= config.auto_timeout:
+                frame = data[len(data) - config.pre_samples - config.post_samples:]
+                self._emit(frame, config.pre_samples, float(frame['timestamp'][config.pre_samples]), True)
+
+        self._history = data[len(data) - self._keep:] if len(data) > self._keep else data
+        self._previous = values[-1]
+        self._count += len(samples)
+
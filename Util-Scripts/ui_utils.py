@@ -1,12 +1,14 @@
 from dataclasses import dataclass
 from typing import List, Callable, Optional
 
+import numpy as np
+
 @dataclass
 class Curve:
     x_key: str
     y_key: str
     scale_y: float = 1.0
-    plot_type: str = "plot"       # plot, semilogy, loglog
+    plot_type: str = "plot"       # plot, semilogy, loglog, scatter
     color: str = "b"
     label: Optional[str] = None
     linestyle: str = "-"
@@ -21,6 +23,13 @@ class PlotSpec:
     curves: List[Curve]
 
 class SweepPlotter:
+    @staticmethod
+    def column(results, key):
+        """Column of a columnar SweepResult, or gathered from a list of row dicts."""
+        if hasattr(results, 'column'):
+            return np.asarray(results.column(key))
+        return np.array([r[key] for r in results])
+
     def plot(self, ax, results, spec: PlotSpec):
         ax.grid(True, alpha=0.3)
         ax.set_title(spec.title)
@@ -35,8 +44,8 @@ class SweepPlotter:
             ax2.set_ylabel(spec.y2_label)
 
         for c in spec.curves:
-            x = [r[c.x_key] for r in results]
-            y = [r[c.y_key] * c.scale_y for r in results]
+            x = self.column(results, c.x_key)
+            y = self.column(results, c.y_key) * c.scale_y
 
             target = ax2 if c.secondary_axis else ax
 
@@ -46,6 +55,8 @@ class SweepPlotter:
                 target.semilogy(x, y, color=c.color, label=c.label, linestyle=c.linestyle)
             elif c.plot_type == "loglog":
                 target.loglog(x, y, color=c.color, label=c.label, linestyle=c.linestyle)
+            elif c.plot_type == "scatter":
+                target.scatter(x, y, color=c.color, label=c.label, s=8)
 
         ax.legend(loc="upper left")
         if ax2:
@@ -199,3 +210,18 @@ def get_rmes_spec():
                   color="r", label="A_d1", secondary_axis=True)
         ]
     )
+
+
+def get_pareto_spec():
+    return PlotSpec(
+        title="Pareto Front: Dynamic Range vs Output Voltage",
+        x_label="Maximum Voltage (V)",
+        y1_label="Dynamic Range",
+        y2_label="Gain Range",
+        curves=[
+            Curve("max_voltage", "dynamic_range", plot_type="scatter",
+                  color="g", label="Dynamic Range"),
+            Curve("max_voltage", "gain_range", plot_type="scatter",
+                  color="orange", label="Gain Range", secondary_axis=True)
+        ]
+    )
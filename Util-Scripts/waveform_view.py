@@ -0,0 +1,179 @@
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from acquisition import SampleRing
+
+DEFAULT_SPAN = 10.0        # seconds of signal on screen
+VIEW_CAPACITY = 1 << 18    # samples kept for the view
+Y_MARGIN = 0.1             # headroom added when the y range has to change
+Y_SHRINK = 0.25            # rescale when the data fills less than this of the axis
+
+VIEW_DTYPE = np.dtype([('timestamp', 'f8'), ('voltage', 'f4'), ('current', 'f4')])
+
+
+def minmax_decimate(x, y, x0, x1, n_bins):
+    """
+    Reduce sorted samples to the minimum and maximum of every one of n_bins
+    equal-width bins over [x0, x1). Each non-empty bin becomes a vertical
+    segment, so peaks survive and the output never exceeds 2 * n_bins points,
+    whatever the input size. Returns (x, y) ready for Line2D.set_data.
+    """
+    if len(x) <= 2 * n_bins:
+        return x, y
+    edges = np.searchsorted(x, np.linspace(x0, x1, n_bins + 1))
+    starts = edges[:-1]
+    nonempty = starts < edges[1:]
+    starts = starts[nonempty]
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    positions = x[starts]
+    return np.repeat(positions, 2), np.column_stack([lows, highs]).ravel()
+
+
+class WaveformView:
+    """
+    Live voltage and current traces for the serial monitor.
+
+    New samples are appended to a private ring; each refresh decimates the
+    visible span to one min/max pair per horizontal pixel and updates two
+    persistent Line2D artists. Redraws blit the lines over a cached
+    background, and only a change of y range triggers a full canvas draw, so
+    the frame cost depends on the plot width rather than the sample rate.
+    Time runs from -span to 0 (now) so the axes never have to move.
+
+    show_frame() freezes the view on a triggered frame instead, with time
+    measured from the trigger point; show_live() returns to the rolling view.
+    """
+
+    def __init__(self, figure=None, span=DEFAULT_SPAN, capacity=VIEW_CAPACITY):
+        self.figure = figure or plt.Figure(figsize=(10, 4))
+        self.span = span
+        self.ring = SampleRing(capacity, VIEW_DTYPE)
+        self.canvas = None
+        self._background = None
+        self._dirty = False
+        self._frame = None
+        self.draw_time = 0.0
+
+        self.ax_voltage, self.ax_current = self.figure.subplots(2, 1, sharex=True)
+        self.ax_voltage.set_ylabel('Voltage [V]')
+        self.ax_current.set_ylabel('Current [A]')
+        self.ax_current.set_xlabel('Time [s]')
+        self.ax_current.set_xlim(-span, 0)
+        for ax in (self.ax_voltage, self.ax_current):
+            ax.grid(True, alpha=0.3)
+        self.voltage_line, = self.ax_voltage.plot([], [], 'b-', lw=1, animated=True)
+        self.current_line, = self.ax_current.plot([], [], 'r-', lw=1, animated=True)
+        self.trigger_marks = [ax.axvline(0, color='k', ls='--', lw=0.8, visible=False)
+                              for ax in (self.ax_voltage, self.ax_current)]
+        self.figure.tight_layout()
+
+    def attach(self, canvas):
+        """Use canvas (e.g. a FigureCanvasTkAgg of self.figure) for drawing and blitting."""
+        self.canvas = canvas
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        self.ax_voltage.draw_artist(self.voltage_line)
+        self.ax_current.draw_artist(self.current_line)
+
+    def append(self, samples):
+        if len(samples):
+            points = np.empty(len(samples), dtype=VIEW_DTYPE)
+            for name in VIEW_DTYPE.names:
+                points[name] = samples[name]
+            self.ring.write(points)
+            self._dirty = True
+
+    def clear(self):
+        self.ring = SampleRing(self.ring.capacity, VIEW_DTYPE)
+        self._dirty = True
+
+    def show_frame(self, frame):
+        """Display a trigger.TriggerFrame until the next frame or show_live()."""
+        self._frame = frame
+        self._dirty = True
+
+    def show_live(self):
+        if self._frame is None:
+            return
+        self._frame = None
+        self.ax_current.set_xlim(-self.span, 0)
+        self._background = None
+        self._dirty = True
+
+    def _set_marks(self, visible):
+        """Show or hide the trigger point marker; True if that changed the background."""
+        changed = self.trigger_marks[0].get_visible() != visible
+        for mark in self.trigger_marks:
+            mark.set_visible(visible)
+        return changed
+
+    def _pixel_width(self):
+        return max(1, int(self.ax_voltage.bbox.width))
+
+    def _fit(self, ax, y):
+        """Move the y limits if the data left them or shrank well inside them."""
+        finite = y[np.isfinite(y)]
+        if len(finite) == 0:
+            return False
+        low, high = finite.min(), finite.max()
+        lim_low, lim_high = ax.get_ylim()
+        if low >= lim_low and high <= lim_high and (high - low) >= Y_SHRINK * (lim_high - lim_low):
+            return False
+        pad = max(high - low, abs(high), 1e-9) * Y_MARGIN
+        ax.set_ylim(low - pad, high + pad)
+        return True
+
+    def refresh(self):
+        """Redraw if new samples arrived since the last refresh."""
+        if not self._dirty or self.canvas is None:
+            return
+        self._dirty = False
+        start = time.perf_counter()
+
+        if self._frame is not None:
+            samples = self._frame.samples
+            t = self._frame.times
+            x0, x1 = (t[0], t[-1]) if len(t) > 1 and t[-1] > t[0] else (-1e-3, 1e-3)
+            rescaled = self._set_marks(True)
+            if self.ax_current.get_xlim() != (x0, x1):
+                self.ax_current.set_xlim(x0, x1)
+                rescaled = True
+        else:
+            # Only the visible span is copied out of the ring, not the whole ring.
+            samples = self.ring.latest(1)
+            if len(samples):
+                now = samples['timestamp'][-1]
+                samples = self.ring.latest_from('timestamp', now - self.span)
+                t = samples['timestamp'] - now
+            else:
+                t = samples['timestamp']
+            x0, x1 = -self.span, 0.0
+            rescaled = self._set_marks(False)
+
+        if len(samples):
+            n_bins = self._pixel_width()
+            x, voltage = minmax_decimate(t, samples['voltage'], x0, x1, n_bins)
+            _, current = minmax_decimate(t, samples['current'], x0, x1, n_bins)
+            self.voltage_line.set_data(x, voltage)
+            self.current_line.set_data(x, current)
+            rescaled = self._fit(self.ax_voltage, voltage) or rescaled
+            rescaled = self._fit(self.ax_current, current) or rescaled
+        else:
+            self.voltage_line.set_data([], [])
+            self.current_line.set_data([], [])
+
+        if rescaled or self._background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_lines()
+            self.canvas.blit(self.figure.bbox)
+        self.draw_time = time.perf_counter() - start
@@ -26,9 +26,49 @@ const int MAX_CHANNEL = 4;
 const float RANGE_MAX_VOLTAGE = 2.3;
 const float RANGE_MIN_VOLTAGE = 0.23;
 
+// Ranging. With PREDICTIVE_RANGING the channel is kept until a reading
+// leaves the wider hysteresis band, and the next channel is predicted from
+// that reading and the channelGains ratios instead of scanning up from
+// channel 0, so a range change usually costs one probe and noise around a
+// range boundary cannot make the channel oscillate.
+const bool PREDICTIVE_RANGING = true;
+const float HYSTERESIS_MAX_VOLTAGE = 4.5;  // still clear of ADC saturation
+const float HYSTERESIS_MIN_VOLTAGE = 0.2;
+const float SWITCH_MAX_VOLTAGE = PREDICTIVE_RANGING ? HYSTERESIS_MAX_VOLTAGE : RANGE_MAX_VOLTAGE;
+const float SWITCH_MIN_VOLTAGE = PREDICTIVE_RANGING ? HYSTERESIS_MIN_VOLTAGE : RANGE_MIN_VOLTAGE;
+
 const unsigned long SETTLING_TIME = 1; // in microseconds, since multiplexter used has a propagation of 12nS.
 int measurementCount =0;
 
+// Output format. Text prints a line per reading; binary sends an 11 byte frame:
+// 0xA5 0x5A, sequence, channel (bit 7 set when out of range), A1, A0 and A4
+// as little-endian 10-bit codes, CRC-8 (poly 0x07) over bytes 2..9.
+// Decoded on the host by Util-Scripts/serial_protocol.py.
+const bool BINARY_OUTPUT = false;
+// Burst output takes precedence: raw ADC codes are buffered with no float
+// math or formatting and sent BURST_SIZE at a time as 0xA5 0x5B, burst
+// sequence, sample count, mean sample period in microseconds (16-bit LE),
+// one 32-bit LE word per sample (A1 | A0 << 10 | A4 << 20 | channel << 30)
+// and CRC-8 over everything after the sync bytes. All scaling is done by
+// the host.
+const bool BURST_OUTPUT = false;
+const long BAUD_RATE = BURST_OUTPUT ? 250000 : (BINARY_OUTPUT ? 115200 : 9600);
+const byte SYNC_BYTE_1 = 0xA5;
+const byte SYNC_BYTE_2 = 0x5A;
+const byte BURST_SYNC_BYTE_2 = 0x5B;
+const byte OUT_OF_RANGE_FLAG = 0x80;
+const int FRAME_SIZE = 11;
+const int BURST_SIZE = 64;
+const int BURST_HEADER_SIZE = 6;
+// The switching thresholds as ADC codes, so burst sampling compares integers.
+const float SWITCH_MAX_CODE = SWITCH_MAX_VOLTAGE * maxMappingValue / maxVoltage;
+const float SWITCH_MIN_CODE = SWITCH_MIN_VOLTAGE * maxMappingValue / maxVoltage;
+
+int selectedChannel = START_CHANNEL;
+bool channelInRange = true;
+byte frameSequence = 0;
+byte burstSequence = 0;
+
 
 double calculateCurrentSensitivity(float currentGain) {
   return (maxVoltage / maxMappingValue) / (currentGain * RSHUNT);
@@ -55,6 +95,7 @@ void writeAddress(int high, int pinNumber) {
 }
 
 void setInputChannel(int number) {   
+  selectedChannel = number;
   writeAddress((number >> 2) & 1, CHANNEL_MSB_PIN);
   writeAddress((number >> 1) & 1, CHANNEL_MID_PIN);
   writeAddress(number & 1, CHANNEL_LSB_PIN);
@@ -88,10 +129,116 @@ int autoSetRange() {
   return -1;
 }
 
+// The highest-gain channel that keeps a reading of code on channel below
+// RANGE_MAX_VOLTAGE. A zero reading is taken as one count and a saturated
+// one as full scale, the bounds of what they could be.
+int predictChannel(int channel, int code) {
+  float shuntVoltage = scaleVoltage(code > 0 ? code : 1) / channelGains[channel];
+  for (int candidate = 0; candidate < MAX_CHANNEL; candidate++) {
+    if (shuntVoltage * channelGains[candidate] <= RANGE_MAX_VOLTAGE) {
+      return candidate;
+    }
+  }
+  return MAX_CHANNEL - 1;
+}
+
+int predictiveSetRange(int code) {
+  int channel = selectedChannel;
 
+  for (int probe = 0; probe < MAX_CHANNEL; probe++) {
+    int nextChannel = predictChannel(channel, code);
+    if (nextChannel == channel) {
+      return -1;  // already on the best channel, the signal is beyond the ranges
+    }
+    setInputChannel(nextChannel);
+    delayMicroseconds(SETTLING_TIME);
+    code = analogRead(ANALOG_READ_PIN);
+    channel = nextChannel;
+
+    float voltage = scaleVoltage(code);
+    if (voltage >= HYSTERESIS_MIN_VOLTAGE && voltage <= HYSTERESIS_MAX_VOLTAGE) {
+      return channel;
+    }
+  }
+
+  return -1;
+}
+
+int setRange(int code) {
+  return PREDICTIVE_RANGING ? predictiveSetRange(code) : autoSetRange();
+}
+
+byte crc8(const byte *data, int length, byte crc = 0) {
+  for (int i = 0; i < length; i++) {
+    crc ^= data[i];
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+void putCode(byte *frame, int offset, int code) {
+  frame[offset] = code & 0xFF;
+  frame[offset + 1] = (code >> 8) & 0x03;
+}
+
+void sendBinaryFrame(int vPlus, int vMinus, int currentCode) {
+  byte frame[FRAME_SIZE];
+  frame[0] = SYNC_BYTE_1;
+  frame[1] = SYNC_BYTE_2;
+  frame[2] = frameSequence++;
+  frame[3] = selectedChannel | (channelInRange ? 0 : OUT_OF_RANGE_FLAG);
+  putCode(frame, 4, vPlus);
+  putCode(frame, 6, vMinus);
+  putCode(frame, 8, currentCode);
+  frame[10] = crc8(frame + 2, FRAME_SIZE - 3);
+  Serial.write(frame, FRAME_SIZE);
+}
+
+void sendBurst(const uint32_t *samples, int count, unsigned int periodMicros) {
+  byte header[BURST_HEADER_SIZE];
+  header[0] = SYNC_BYTE_1;
+  header[1] = BURST_SYNC_BYTE_2;
+  header[2] = burstSequence++;
+  header[3] = count;
+  header[4] = periodMicros & 0xFF;
+  header[5] = periodMicros >> 8;
+  // AVR is little-endian, so the sample words go out as stored.
+  const byte *payload = (const byte *)samples;
+  byte crc = crc8(header + 2, BURST_HEADER_SIZE - 2);
+  crc = crc8(payload, count * 4, crc);
+  Serial.write(header, BURST_HEADER_SIZE);
+  Serial.write(payload, count * 4);
+  Serial.write(crc);
+}
+
+void acquireBurst() {
+  static uint32_t samples[BURST_SIZE];
+  unsigned long start = micros();
+
+  for (int i = 0; i < BURST_SIZE; i++) {
+    int currentCode = analogRead(ANALOG_READ_PIN);
+    if (currentCode > SWITCH_MAX_CODE || currentCode < SWITCH_MIN_CODE) {
+      int currentChannel = setRange(currentCode);
+      channelInRange = currentChannel >= 0;
+      if (channelInRange) {
+        currentGain = channelGains[currentChannel];
+      }
+      currentCode = analogRead(ANALOG_READ_PIN);
+    }
+    uint32_t vPlus = analogRead(A1);
+    uint32_t vMinus = analogRead(A0);
+    samples[i] = vPlus | (vMinus << 10) | ((uint32_t)currentCode << 20) | ((uint32_t)(selectedChannel & 0x03) << 30);
+  }
+
+  unsigned long period = (micros() - start) / BURST_SIZE;
+  sendBurst(samples, BURST_SIZE, period > 0xFFFF ? 0xFFFF : period);
+  measurementCount++;  // a burst counts as one measurement for the trigger pin
+}
 
 void setup() {
-  Serial.begin(9600);
+  Serial.begin(BAUD_RATE);
 
   pinMode(MEASUREMENT_TRIGGER_PIN, INPUT_PULLUP);
   pinMode(SIGNALTYPEPIN, INPUT_PULLUP); // Default to measuring dc signals. 
@@ -116,17 +263,33 @@ void loop() {
       }
   }
 
+  if (BURST_OUTPUT) {
+    acquireBurst();
+    return;
+  }
+
   double currentSensitivity = calculateCurrentSensitivity(currentGain) * 1e6;
 
-  float scaledVoltage2 = scaleVoltage(analogRead(A4)) * 1000;
+  int rangeCode = analogRead(A4);
+  float scaledVoltage2 = scaleVoltage(rangeCode) * 1000;
 
 
-  if (scaledVoltage2 > RANGE_MAX_VOLTAGE * 1000 || scaledVoltage2 < RANGE_MIN_VOLTAGE * 1000) {
-    int currentChannel = autoSetRange();
+  if (scaledVoltage2 > SWITCH_MAX_VOLTAGE * 1000 || scaledVoltage2 < SWITCH_MIN_VOLTAGE * 1000) {
+    int currentChannel = setRange(rangeCode);
+    channelInRange = currentChannel >= 0;
     if (currentChannel >=0) {
       currentGain = channelGains[currentChannel];
       currentSensitivity = calculateCurrentSensitivity(currentGain) * 1e6;
-      float scaledVoltage2 = scaleVoltage(analogRead(A4)) * 1000;
+      scaledVoltage2 = scaleVoltage(analogRead(A4)) * 1000;
+    }
+  } else {
+    channelInRange = true;
+  }
+
+  if (BINARY_OUTPUT) {
+    sendBinaryFrame(analogRead(A1), analogRead(A0), analogRead(A4));
+    measurementCount++;
+    return;
   }
 
   float vPlus = scaleVoltage(analogRead(A1));